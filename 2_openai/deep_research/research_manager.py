@@ -1,10 +1,17 @@
-from agents import Runner, trace, gen_trace_id
+from agents import Runner, trace, gen_trace_id, set_default_openai_client
+from openai import AsyncOpenAI
 from search_agent import search_agent
 from planner_agent import planner_agent, WebSearchItem, WebSearchPlan
 from writer_agent import writer_agent, ReportData
 from email_agent import email_agent
 import asyncio
 
+from shared.replay_cache import REPLAY_MODE, async_http_client
+
+# All the agents use the SDK's default client; route it through the replay cache when recording or replaying
+if REPLAY_MODE != "passthrough":
+    set_default_openai_client(AsyncOpenAI(http_client=async_http_client()), use_for_tracing=False)
+
 class ResearchManager:
 
     async def run(self, query: str):
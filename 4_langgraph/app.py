@@ -2,25 +2,29 @@ import gradio as gr
 from sidekick import Sidekick
 
 
-async def setup():
-    sidekick = Sidekick()
+async def setup(session_id):
+    sidekick = Sidekick(session_id)
     await sidekick.setup()
-    return sidekick
+    history = await sidekick.history()
+    return sidekick, sidekick.sidekick_id, history
 
 async def process_message(sidekick, message, success_criteria, history):
     results = await sidekick.run_superstep(message, success_criteria, history)
     return results, sidekick
     
-async def reset():
+async def reset(sidekick):
+    if sidekick:
+        sidekick.cleanup()
+        await sidekick.forget()
     new_sidekick = Sidekick()
     await new_sidekick.setup()
-    return "", "", None, new_sidekick
+    return "", "", None, new_sidekick, new_sidekick.sidekick_id
 
 def free_resources(sidekick):
     print("Cleaning up")
     try:
         if sidekick:
-            sidekick.free_resources()
+            sidekick.cleanup()
     except Exception as e:
         print(f"Exception during cleanup: {e}")
 
@@ -28,6 +32,8 @@ def free_resources(sidekick):
 with gr.Blocks(title="Sidekick", theme=gr.themes.Default(primary_hue="emerald")) as ui:
     gr.Markdown("## Sidekick Personal Co-Worker")
     sidekick = gr.State(delete_callback=free_resources)
+    # Remembered by the user's browser, so the conversation carries on after a reload or a restart of the app
+    session_id = gr.BrowserState(None, storage_key="sidekick_session")
     
     with gr.Row():
         chatbot = gr.Chatbot(label="Sidekick", height=300, type="messages")
@@ -40,11 +46,11 @@ with gr.Blocks(title="Sidekick", theme=gr.themes.Default(primary_hue="emerald"))
         reset_button = gr.Button("Reset", variant="stop")
         go_button = gr.Button("Go!", variant="primary")
         
-    ui.load(setup, [], [sidekick])
+    ui.load(setup, [session_id], [sidekick, session_id, chatbot])
     message.submit(process_message, [sidekick, message, success_criteria, chatbot], [chatbot, sidekick])
     success_criteria.submit(process_message, [sidekick, message, success_criteria, chatbot], [chatbot, sidekick])
     go_button.click(process_message, [sidekick, message, success_criteria, chatbot], [chatbot, sidekick])
-    reset_button.click(reset, [], [message, success_criteria, chatbot, sidekick])
+    reset_button.click(reset, [sidekick], [message, success_criteria, chatbot, sidekick, session_id])
 
     
 ui.launch(inbrowser=True)
\ No newline at end of file
@@ -0,0 +1,95 @@
+"""
+Check that Sidekick sessions don't hold each other up: time one session's request, then N sessions' requests at once.
+The model is the offline stub in ../stub_llm, with a fixed delay per call, so the timings are all orchestration, and
+the checkpoints go to a throwaway database rather than memory.db.
+Since the worker and evaluator await the model rather than blocking the event loop, N sessions should take about
+as long as one.
+Run with: uv run benchmark_sessions.py [--sessions 10] [--latency fixed:0.5]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import httpx
+from langchain.agents import Tool
+
+PORT = 8910
+STUB_SERVER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "stub_llm", "stub_server.py")
+
+# The evaluator always passes the work, so each request is: worker calls a tool, worker answers, evaluator accepts
+SCRIPT = {
+    "rules": [
+        {
+            "match": "You are evaluating",
+            "json": {"feedback": "Looks good", "success_criteria_met": True, "user_input_needed": False},
+        }
+    ]
+}
+
+
+def lookup(query: str) -> str:
+    return f"Some facts about {query}"
+
+
+async def make_session():
+    from sidekick import Sidekick
+
+    sidekick = Sidekick()
+    await sidekick.setup(tools=[Tool(name="lookup", func=lookup, description="Look up facts about something")])
+    return sidekick
+
+
+async def timed(sidekick) -> float:
+    start = time.perf_counter()
+    await sidekick.run_superstep("Tell me about otters", "A short answer", [])
+    return time.perf_counter() - start
+
+
+async def main(args):
+    from checkpoints import close
+
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+        json.dump(SCRIPT, f)
+    server = subprocess.Popen(
+        [sys.executable, STUB_SERVER, "--port", str(args.port), "--latency", args.latency, "--script", f.name],
+        stderr=subprocess.DEVNULL,
+    )
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{args.port}/v1"
+    os.environ.setdefault("OPENAI_API_KEY", "stub")
+    try:
+        async with httpx.AsyncClient() as client:
+            for _ in range(100):
+                try:
+                    await client.get(f"{os.environ['OPENAI_BASE_URL']}/models")
+                    break
+                except httpx.TransportError:
+                    await asyncio.sleep(0.1)
+        sessions = [await make_session() for _ in range(args.sessions)]
+        await timed(sessions[0])
+        one = await timed(sessions[0])
+        start = time.perf_counter()
+        durations = await asyncio.gather(*[timed(sidekick) for sidekick in sessions])
+        together = time.perf_counter() - start
+        print(f"One session: {one:.2f}s")
+        print(f"{args.sessions} sessions at once: {together:.2f}s in all, slowest {max(durations):.2f}s")
+        print(f"Ratio to one session: {together / one:.2f} (1.0 is perfectly concurrent, {args.sessions} is serial)")
+    finally:
+        await close()
+        server.terminate()
+        os.unlink(f.name)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent Sidekick sessions against the stub model")
+    parser.add_argument("--sessions", type=int, default=10)
+    parser.add_argument("--latency", default="fixed:0.5")
+    parser.add_argument("--port", type=int, default=PORT)
+    with tempfile.TemporaryDirectory() as directory:
+        # checkpoints reads SIDEKICK_DB when it's first imported, which is inside main
+        os.environ["SIDEKICK_DB"] = os.path.join(directory, "benchmark.db")
+        asyncio.run(main(parser.parse_args()))
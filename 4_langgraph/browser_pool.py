@@ -0,0 +1,184 @@
+"""
+One set of headless Chromium processes for every Sidekick in the app, rather than a new browser for each session.
+
+Each session browses in a BrowserContext of its own, so cookies, storage and pages stay isolated between users.
+A few contexts are kept warm so that a new session doesn't wait for one; a session's context is closed once it has
+been idle for BROWSER_IDLE_SECONDS, and reopened, empty, if the session browses again; and a context never has more
+than MAX_PAGES_PER_SESSION pages open, the oldest being closed first.
+
+A session id is remembered by the user's browser, so two tabs can share one session and its context. The pool counts
+the Sidekicks using each session, and a session's context is only closed once the last of them is released.
+"""
+
+import asyncio
+import os
+import time
+from dotenv import load_dotenv
+from playwright.async_api import Browser, BrowserContext, async_playwright
+
+load_dotenv(override=True)
+
+BROWSERS = int(os.getenv("BROWSERS", "1"))
+WARM_CONTEXTS = int(os.getenv("WARM_CONTEXTS", "2"))
+BROWSER_IDLE_SECONDS = float(os.getenv("BROWSER_IDLE_SECONDS", "600"))
+MAX_PAGES_PER_SESSION = int(os.getenv("MAX_PAGES_PER_SESSION", "5"))
+HEADLESS = os.getenv("HEADLESS", "true").strip().lower() == "true"
+REAP_EVERY_N_SECONDS = 30
+
+
+class SessionBrowser(Browser):
+    """
+    What a session's browser tools are given: a Browser whose only context is the session's own.
+    The toolkit insists on a playwright Browser, and its tools only use `contexts` and `new_context`, so those are
+    all this provides. The context is taken from the pool the first time the tools need it, and after it's reaped.
+    """
+
+    def __init__(self, pool: "BrowserPool", session_id: str):
+        self.pool = pool
+        self.session_id = session_id
+        self.context: BrowserContext | None = None
+        self.last_used = time.monotonic()
+        self.references = 0
+
+    def __repr__(self) -> str:
+        return f"SessionBrowser({self.session_id})"
+
+    @property
+    def contexts(self) -> list[BrowserContext]:
+        self.last_used = time.monotonic()
+        return [self.context] if self.context else []
+
+    async def new_context(self, **kwargs) -> BrowserContext:
+        self.last_used = time.monotonic()
+        if self.context is None:
+            self.context = await self.pool.context()
+        return self.context
+
+    async def close_context(self) -> None:
+        context, self.context = self.context, None
+        if context:
+            await context.close()
+
+
+class BrowserPool:
+    def __init__(
+        self,
+        browsers: int = BROWSERS,
+        warm: int = WARM_CONTEXTS,
+        idle_seconds: float = BROWSER_IDLE_SECONDS,
+        max_pages: int = MAX_PAGES_PER_SESSION,
+    ):
+        self.size = browsers
+        self.warm_target = warm
+        self.idle_seconds = idle_seconds
+        self.max_pages = max_pages
+        self.playwright = None
+        self.browsers: list[Browser] = []
+        self.warm: list[BrowserContext] = []
+        self.sessions: dict[str, SessionBrowser] = {}
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self.lock = asyncio.Lock()
+        self.tasks: set[asyncio.Task] = set()
+
+    async def start(self) -> None:
+        """Launch the browsers and warm up some contexts, the first time it's called"""
+        async with self.lock:
+            if self.playwright is None:
+                self.loop = asyncio.get_running_loop()
+                self.playwright = await async_playwright().start()
+                self.browsers = [await self.playwright.chromium.launch(headless=HEADLESS) for _ in range(self.size)]
+                self.spawn(self.reap_forever())
+        await self.fill()
+
+    def spawn(self, coroutine) -> None:
+        task = self.loop.create_task(coroutine)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def new_context(self) -> BrowserContext:
+        browser = min(self.browsers, key=lambda b: len(b.contexts))
+        context = await browser.new_context()
+        context.on("page", lambda page: self.spawn(self.cap_pages(context)))
+        return context
+
+    async def fill(self) -> None:
+        while len(self.warm) < self.warm_target:
+            self.warm.append(await self.new_context())
+
+    async def context(self) -> BrowserContext:
+        """A fresh context for a session, warm if there's one ready; the warm ones are topped up in the background"""
+        await self.start()
+        context = self.warm.pop() if self.warm else await self.new_context()
+        self.spawn(self.fill())
+        return context
+
+    async def cap_pages(self, context: BrowserContext) -> None:
+        for page in context.pages[: -self.max_pages]:
+            await page.close()
+
+    def session(self, session_id: str) -> SessionBrowser:
+        """The browser for a session, counting one more user of it; each call should be matched by a release"""
+        if session_id not in self.sessions:
+            self.sessions[session_id] = SessionBrowser(self, session_id)
+        browser = self.sessions[session_id]
+        browser.references += 1
+        return browser
+
+    def unreference(self, session_id: str) -> SessionBrowser | None:
+        """Count one fewer user of a session, returning its browser if that was the last one"""
+        browser = self.sessions.get(session_id)
+        if browser is None:
+            return None
+        browser.references -= 1
+        if browser.references > 0:
+            return None
+        return self.sessions.pop(session_id)
+
+    async def release(self, session_id: str) -> None:
+        browser = self.unreference(session_id)
+        if browser:
+            await browser.close_context()
+
+    def release_soon(self, session_id: str) -> None:
+        """Release a session from any thread or event loop, as Gradio's delete callbacks may run outside the app's loop"""
+        if self.loop is None:
+            self.unreference(session_id)
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self.loop:
+            self.spawn(self.release(session_id))
+        else:
+            asyncio.run_coroutine_threadsafe(self.release(session_id), self.loop)
+
+    async def reap(self) -> int:
+        """Close the contexts of sessions that have been idle too long, returning how many were closed"""
+        now = time.monotonic()
+        idle = [b for b in self.sessions.values() if b.context and now - b.last_used > self.idle_seconds]
+        for browser in idle:
+            await browser.close_context()
+        return len(idle)
+
+    async def reap_forever(self) -> None:
+        while True:
+            await asyncio.sleep(REAP_EVERY_N_SECONDS)
+            await self.reap()
+
+    async def stop(self) -> None:
+        for task in list(self.tasks):
+            task.cancel()
+        for browser in self.sessions.values():
+            await browser.close_context()
+        self.sessions = {}
+        for context in self.warm:
+            await context.close()
+        for browser in self.browsers:
+            await browser.close()
+        if self.playwright:
+            await self.playwright.stop()
+        self.playwright, self.browsers, self.warm = None, [], []
+
+
+pool = BrowserPool()
@@ -0,0 +1,95 @@
+"""
+Where Sidekick keeps its conversations: a SQLite database, so a session survives a restart and an idle session
+costs disk rather than memory.
+
+Every step of the graph checkpoints the whole state, browser page dumps and all, so two things keep the database
+in check: only the latest KEEP_CHECKPOINTS checkpoints of each thread are kept, and anything that serializes to more
+than COMPRESS_OVER bytes is stored zlib-compressed.
+"""
+
+import asyncio
+import os
+import zlib
+import aiosqlite
+from dotenv import load_dotenv
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+load_dotenv(override=True)
+
+SIDEKICK_DB = os.getenv("SIDEKICK_DB", "memory.db")
+KEEP_CHECKPOINTS = int(os.getenv("KEEP_CHECKPOINTS", "10"))
+COMPRESS_OVER = 4096
+COMPRESSED = "+zlib"
+
+
+class CompressingSerializer(JsonPlusSerializer):
+    """Compresses large values, and marks them in the type so small and old uncompressed ones still load"""
+
+    def dumps_typed(self, obj):
+        type_, data = super().dumps_typed(obj)
+        if len(data) > COMPRESS_OVER:
+            return type_ + COMPRESSED, zlib.compress(data)
+        return type_, data
+
+    def loads_typed(self, data):
+        type_, payload = data
+        if type_.endswith(COMPRESSED):
+            return super().loads_typed((type_.removesuffix(COMPRESSED), zlib.decompress(payload)))
+        return super().loads_typed(data)
+
+
+class PrunedSqliteSaver(AsyncSqliteSaver):
+    """An async SQLite checkpointer that keeps only the latest checkpoints of each thread"""
+
+    def __init__(self, conn: aiosqlite.Connection, keep: int = KEEP_CHECKPOINTS):
+        super().__init__(conn, serde=CompressingSerializer())
+        self.keep = keep
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        saved = await super().aput(config, checkpoint, metadata, new_versions)
+        await self.prune(saved["configurable"]["thread_id"], saved["configurable"]["checkpoint_ns"])
+        return saved
+
+    async def prune(self, thread_id: str, checkpoint_ns: str = "") -> None:
+        """Delete all but the latest checkpoints of a thread, and their pending writes; checkpoint ids sort by time"""
+        async with self.lock:
+            for table in ("writes", "checkpoints"):
+                await self.conn.execute(
+                    f"""
+                    DELETE FROM {table} WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id < (
+                        SELECT min(checkpoint_id) FROM (
+                            SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?
+                            ORDER BY checkpoint_id DESC LIMIT ?
+                        )
+                    )
+                    """,
+                    (thread_id, checkpoint_ns, thread_id, checkpoint_ns, self.keep),
+                )
+            await self.conn.commit()
+
+
+_saver: PrunedSqliteSaver | None = None
+_saver_lock = asyncio.Lock()
+
+
+async def checkpointer() -> PrunedSqliteSaver:
+    """The checkpointer shared by every session in this process, opened on first use"""
+    global _saver
+    async with _saver_lock:
+        if _saver is None:
+            conn = await aiosqlite.connect(SIDEKICK_DB)
+            await conn.execute("PRAGMA journal_mode=WAL")
+            saver = PrunedSqliteSaver(conn)
+            await saver.setup()
+            _saver = saver
+    return _saver
+
+
+async def close() -> None:
+    """Close the shared checkpointer; scripts need this to exit, as the connection runs on a non-daemon thread"""
+    global _saver
+    async with _saver_lock:
+        if _saver is not None:
+            await _saver.conn.close()
+            _saver = None
@@ -0,0 +1,131 @@
+"""
+Keep the worker's and evaluator's prompts within a token budget however long a session runs.
+
+The conversation is split in two: older turns, which are folded into a running summary, and a recent window that is
+sent as it is, apart from tool outputs. The latest round of tool outputs is cut to TOOL_OUTPUT_TOKENS and earlier
+ones to OLD_TOOL_OUTPUT_TOKENS, since a page dump the assistant has already acted on rarely needs rereading.
+When the window grows past PROMPT_TOKENS, its older half is summarized into the summary. Only the turns that are new
+since the last summary are sent to the summarizer, so each loop costs the same however long the session has been.
+"""
+
+import os
+from functools import lru_cache
+from typing import Any, List
+import tiktoken
+from dotenv import load_dotenv
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+load_dotenv(override=True)
+
+MODEL = "gpt-4o-mini"
+PROMPT_TOKENS = int(os.getenv("PROMPT_TOKENS", "8000"))
+TOOL_OUTPUT_TOKENS = int(os.getenv("TOOL_OUTPUT_TOKENS", "2000"))
+OLD_TOOL_OUTPUT_TOKENS = 200
+CHARS_PER_TOKEN = 4
+
+
+@lru_cache
+def encoding():
+    try:
+        return tiktoken.encoding_for_model(MODEL)
+    except Exception:
+        # tiktoken downloads its encodings on first use; offline, estimate from the length instead
+        return None
+
+
+def count_tokens(text: str) -> int:
+    enc = encoding()
+    return len(enc.encode(text, disallowed_special=())) if enc else len(text) // CHARS_PER_TOKEN + 1
+
+
+def truncate(text: str, tokens: int) -> str:
+    enc = encoding()
+    if enc:
+        encoded = enc.encode(text, disallowed_special=())
+        if len(encoded) <= tokens:
+            return text
+        kept, elided = enc.decode(encoded[:tokens]), len(encoded) - tokens
+    else:
+        if len(text) <= tokens * CHARS_PER_TOKEN:
+            return text
+        kept, elided = text[: tokens * CHARS_PER_TOKEN], (len(text) - tokens * CHARS_PER_TOKEN) // CHARS_PER_TOKEN
+    return f"{kept}\n[... {elided} more tokens of this output elided]"
+
+
+def content_of(message: Any) -> str:
+    return message.content if isinstance(message.content, str) else str(message.content)
+
+
+class Compactor:
+    def __init__(self, summarizer, prompt_tokens: int = PROMPT_TOKENS):
+        self.summarizer = summarizer
+        self.prompt_tokens = prompt_tokens
+        self.token_counts: dict[tuple[str, int], int] = {}
+
+    def window(self, messages: List[Any], summarized: int) -> List[Any]:
+        """The messages after the summary, with tool outputs cut down; copies, so the state keeps the originals"""
+        recent = messages[summarized:]
+        last_tool_round = max((i for i, m in enumerate(recent) if isinstance(m, AIMessage) and m.tool_calls), default=-1)
+        window = []
+        for i, message in enumerate(recent):
+            if isinstance(message, ToolMessage):
+                limit = TOOL_OUTPUT_TOKENS if i > last_tool_round else OLD_TOOL_OUTPUT_TOKENS
+                message = message.model_copy(update={"content": truncate(content_of(message), limit)})
+            window.append(message)
+        return window
+
+    def tokens(self, message: Any) -> int:
+        """Tokens in a message, remembered by id and length, since a cut-down copy keeps the original's id"""
+        content = content_of(message)
+        key = (message.id, len(content))
+        if message.id is None or key not in self.token_counts:
+            count = count_tokens(content) + sum(count_tokens(str(call)) for call in getattr(message, "tool_calls", []))
+            if message.id is None:
+                return count
+            self.token_counts[key] = count
+        return self.token_counts[key]
+
+    def split(self, messages: List[Any], summarized: int) -> int:
+        """
+        Where to end the summary so the newest half of the budget stays verbatim. The user's latest request is always
+        kept, and tool outputs are never separated from the tool calls they answer.
+        """
+        window = self.window(messages, summarized)
+        kept, split = 0, len(messages)
+        for message in reversed(window):
+            kept += self.tokens(message)
+            if kept > self.prompt_tokens // 2:
+                break
+            split -= 1
+        while split < len(messages) and isinstance(messages[split], ToolMessage):
+            split += 1
+        latest_request = max((i for i, m in enumerate(messages) if isinstance(m, HumanMessage)), default=len(messages))
+        return min(split, latest_request)
+
+    async def compact(self, messages: List[Any], summary: str, summarized: int) -> dict[str, Any]:
+        """State updates that fold older turns into the summary, or nothing if the window is within budget"""
+        window = self.window(messages, summarized)
+        if count_tokens(summary) + sum(self.tokens(m) for m in window) <= self.prompt_tokens:
+            return {}
+        split = self.split(messages, summarized)
+        if split <= summarized:
+            return {}
+        new_turns = self.window(messages[:split], summarized)
+        return {"summary": await self.summarize(summary, new_turns), "summarized": split}
+
+    async def summarize(self, summary: str, turns: List[Any]) -> str:
+        transcript = []
+        for message in turns:
+            if isinstance(message, HumanMessage):
+                transcript.append(f"User: {content_of(message)}")
+            elif isinstance(message, AIMessage):
+                calls = ", ".join(call["name"] for call in message.tool_calls)
+                transcript.append(f"Assistant: {content_of(message) or f'[Used tools: {calls}]'}")
+            elif isinstance(message, ToolMessage):
+                transcript.append(f"Tool output: {content_of(message)}")
+        system_message = """You keep a running summary of a conversation between a User and an Assistant that uses tools.
+    Update the summary with the new turns. Keep the user's requests, what the Assistant found out and did, any answers
+    given and any feedback on them. Leave out page content that wasn't used. Respond only with the updated summary."""
+        user_message = f"The summary so far:\n{summary or '(none yet)'}\n\nThe new turns:\n" + "\n".join(transcript)
+        response = await self.summarizer.ainvoke([SystemMessage(content=system_message), HumanMessage(content=user_message)])
+        return response.content
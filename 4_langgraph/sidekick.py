@@ -5,15 +5,19 @@ from langgraph.graph.message import add_messages
 from dotenv import load_dotenv
 from langgraph.prebuilt import ToolNode
 from langchain_openai import ChatOpenAI
-from langgraph.checkpoint.memory import MemorySaver
 from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 from typing import List, Any, Optional, Dict
 from pydantic import BaseModel, Field
 from sidekick_tools import playwright_tools, other_tools
+from checkpoints import checkpointer
+from browser_pool import pool
+from compaction import Compactor
 import uuid
 import asyncio
 from datetime import datetime
 
+from shared.replay_cache import http_client, async_http_client
+
 load_dotenv(override=True)
 
 class State(TypedDict):
@@ -22,6 +26,8 @@ class State(TypedDict):
     feedback_on_work: Optional[str]
     success_criteria_met: bool
     user_input_needed: bool
+    summary: str
+    summarized: int
 
 
 class EvaluatorOutput(BaseModel):
@@ -31,27 +37,38 @@ class EvaluatorOutput(BaseModel):
 
 
 class Sidekick:
-    def __init__(self):
+    def __init__(self, sidekick_id: Optional[str] = None):
         self.worker_llm_with_tools = None
         self.evaluator_llm_with_output = None
         self.tools = None
+        self.compactor = None
         self.llm_with_tools = None
         self.graph = None
-        self.sidekick_id = str(uuid.uuid4())
-        self.memory = MemorySaver()
+        # Passing the id of an earlier session picks up its conversation from the checkpointer
+        self.sidekick_id = sidekick_id or str(uuid.uuid4())
+        self.memory = None
         self.browser = None
-        self.playwright = None
+        self.lock = asyncio.Lock()
 
-    async def setup(self):
-        self.tools, self.browser, self.playwright = await playwright_tools()
-        self.tools += await other_tools()
-        worker_llm = ChatOpenAI(model="gpt-4o-mini")
+    async def setup(self, tools: Optional[List[Any]] = None):
+        if tools is None:
+            self.tools, self.browser = await playwright_tools(self.sidekick_id)
+            self.tools += await other_tools()
+        else:
+            self.tools = tools
+        worker_llm = ChatOpenAI(model="gpt-4o-mini", http_client=http_client(), http_async_client=async_http_client())
         self.worker_llm_with_tools = worker_llm.bind_tools(self.tools)
-        evaluator_llm = ChatOpenAI(model="gpt-4o-mini")
+        evaluator_llm = ChatOpenAI(model="gpt-4o-mini", http_client=http_client(), http_async_client=async_http_client())
         self.evaluator_llm_with_output = evaluator_llm.with_structured_output(EvaluatorOutput)
+        summarizer_llm = ChatOpenAI(model="gpt-4o-mini", http_client=http_client(), http_async_client=async_http_client())
+        self.compactor = Compactor(summarizer_llm)
+        self.memory = await checkpointer()
         await self.build_graph()
 
-    def worker(self, state: State) -> Dict[str, Any]:
+    async def compact(self, state: State) -> Dict[str, Any]:
+        return await self.compactor.compact(state["messages"], state.get("summary", ""), state.get("summarized", 0))
+
+    async def worker(self, state: State) -> Dict[str, Any]:
         system_message = f"""You are a helpful assistant that can use tools to complete tasks.
     You keep working on a task until either you have a question or clarification for the user, or the success criteria is met.
     You have many tools to help you, including tools to browse the internet, navigating and retrieving web pages.
@@ -74,11 +91,16 @@ class Sidekick:
     Here is the feedback on why this was rejected:
     {state['feedback_on_work']}
     With this feedback, please continue the assignment, ensuring that you meet the success criteria or have a question for the user."""
+
+        if state.get("summary"):
+            system_message += f"""
+    The earlier part of this conversation has been summarized to save space. Here is the summary:
+    {state['summary']}"""
         
         # Add in the system message
 
         found_system_message = False
-        messages = state["messages"]
+        messages = self.compactor.window(state["messages"], state.get("summarized", 0))
         for message in messages:
             if isinstance(message, SystemMessage):
                 message.content = system_message
@@ -88,7 +110,7 @@ class Sidekick:
             messages = [SystemMessage(content=system_message)] + messages
         
         # Invoke the LLM with tools
-        response = self.worker_llm_with_tools.invoke(messages)
+        response = await self.worker_llm_with_tools.ainvoke(messages)
         
         # Return updated state
         return {
@@ -104,8 +126,10 @@ class Sidekick:
         else:
             return "evaluator"
         
-    def format_conversation(self, messages: List[Any]) -> str:
+    def format_conversation(self, messages: List[Any], summary: str = "") -> str:
         conversation = "Conversation history:\n\n"
+        if summary:
+            conversation += f"Summary of the earlier conversation: {summary}\n\n"
         for message in messages:
             if isinstance(message, HumanMessage):
                 conversation += f"User: {message.content}\n"
@@ -114,7 +138,7 @@ class Sidekick:
                 conversation += f"Assistant: {text}\n"
         return conversation
         
-    def evaluator(self, state: State) -> State:
+    async def evaluator(self, state: State) -> State:
         last_response = state["messages"][-1].content
 
         system_message = f"""You are an evaluator that determines if a task has been completed successfully by an Assistant.
@@ -124,7 +148,7 @@ class Sidekick:
         user_message = f"""You are evaluating a conversation between the User and Assistant. You decide what action to take based on the last response from the Assistant.
 
     The entire conversation with the assistant, with the user's original request and all replies, is:
-    {self.format_conversation(state['messages'])}
+    {self.format_conversation(self.compactor.window(state['messages'], state.get('summarized', 0)), state.get('summary', ''))}
 
     The success criteria for this assignment is:
     {state['success_criteria']}
@@ -145,7 +169,7 @@ class Sidekick:
         
         evaluator_messages = [SystemMessage(content=system_message), HumanMessage(content=user_message)]
 
-        eval_result = self.evaluator_llm_with_output.invoke(evaluator_messages)
+        eval_result = await self.evaluator_llm_with_output.ainvoke(evaluator_messages)
         new_state = {
             "messages": [{"role": "assistant", "content": f"Evaluator Feedback on this answer: {eval_result.feedback}"}],
             "feedback_on_work": eval_result.feedback,
@@ -166,15 +190,17 @@ class Sidekick:
         graph_builder = StateGraph(State)
 
         # Add nodes
+        graph_builder.add_node("compact", self.compact)
         graph_builder.add_node("worker", self.worker)
         graph_builder.add_node("tools", ToolNode(tools=self.tools))
         graph_builder.add_node("evaluator", self.evaluator)
 
         # Add edges
         graph_builder.add_conditional_edges("worker", self.worker_router, {"tools": "tools", "evaluator": "evaluator"})
-        graph_builder.add_edge("tools", "worker")
-        graph_builder.add_conditional_edges("evaluator", self.route_based_on_evaluation, {"worker": "worker", "END": END})
-        graph_builder.add_edge(START, "worker")
+        graph_builder.add_edge("compact", "worker")
+        graph_builder.add_edge("tools", "compact")
+        graph_builder.add_conditional_edges("evaluator", self.route_based_on_evaluation, {"worker": "compact", "END": END})
+        graph_builder.add_edge(START, "compact")
 
         # Compile the graph
         self.graph = graph_builder.compile(checkpointer=self.memory)
@@ -189,21 +215,32 @@ class Sidekick:
             "success_criteria_met": False,
             "user_input_needed": False
         }
-        result = await self.graph.ainvoke(state, config=config)
+        # One superstep at a time per session, as they share a thread in the checkpointer; other sessions run concurrently
+        async with self.lock:
+            result = await self.graph.ainvoke(state, config=config)
         user = {"role": "user", "content": message}
         reply = {"role": "assistant", "content": result["messages"][-2].content}
         feedback = {"role": "assistant", "content": result["messages"][-1].content}
         return history + [user, reply, feedback]
+
+    async def history(self) -> List[Dict[str, str]]:
+        """The conversation so far, for the chatbot, from the latest checkpoint of this session"""
+        config = {"configurable": {"thread_id": self.sidekick_id}}
+        snapshot = await self.graph.aget_state(config)
+        history = []
+        for message in snapshot.values.get("messages", []):
+            if isinstance(message, HumanMessage):
+                history.append({"role": "user", "content": message.content})
+            elif isinstance(message, AIMessage) and message.content and not message.tool_calls:
+                history.append({"role": "assistant", "content": message.content})
+        return history
+
+    async def forget(self):
+        """Delete this session's checkpoints"""
+        await self.memory.adelete_thread(self.sidekick_id)
     
     def cleanup(self):
+        """Hand this session's browser context back to the pool; the shared browsers keep running"""
         if self.browser:
-            try:
-                loop = asyncio.get_running_loop()
-                loop.create_task(self.browser.close())
-                if self.playwright:
-                    loop.create_task(self.playwright.stop())
-            except RuntimeError:
-                # If no loop is running, do a direct run
-                asyncio.run(self.browser.close())
-                if self.playwright:
-                    asyncio.run(self.playwright.stop())
+            pool.release_soon(self.sidekick_id)
+            self.browser = None
@@ -1,8 +1,6 @@
-from playwright.async_api import async_playwright
 from langchain_community.agent_toolkits import PlayWrightBrowserToolkit
+from browser_pool import pool
 from dotenv import load_dotenv
-import os
-import requests
 from langchain.agents import Tool
 from langchain_community.agent_toolkits import FileManagementToolkit
 from langchain_community.tools.wikipedia.tool import WikipediaQueryRun
@@ -10,24 +8,22 @@ from langchain_experimental.tools import PythonREPLTool
 from langchain_community.utilities import GoogleSerperAPIWrapper
 from langchain_community.utilities.wikipedia import WikipediaAPIWrapper
 
+from shared import notifications
+
 
 
 load_dotenv(override=True)
-pushover_token = os.getenv("PUSHOVER_TOKEN")
-pushover_user = os.getenv("PUSHOVER_USER")
-pushover_url = "https://api.pushover.net/1/messages.json"
-serper = GoogleSerperAPIWrapper()
-
-async def playwright_tools():
-    playwright = await async_playwright().start()
-    browser = await playwright.chromium.launch(headless=False)
+
+async def playwright_tools(session_id: str):
+    await pool.start()
+    browser = pool.session(session_id)
     toolkit = PlayWrightBrowserToolkit.from_browser(async_browser=browser)
-    return toolkit.get_tools(), browser, playwright
+    return toolkit.get_tools(), browser
 
 
 def push(text: str):
     """Send a push notification to the user"""
-    requests.post(pushover_url, data = {"token": pushover_token, "user": pushover_user, "message": text})
+    notifications.push(text)
     return "success"
 
 
@@ -40,6 +36,8 @@ async def other_tools():
     push_tool = Tool(name="send_push_notification", func=push, description="Use this tool when you want to send a push notification")
     file_tools = get_file_tools()
 
+    # Built here rather than at import, as it needs SERPER_API_KEY and callers with their own tools never search
+    serper = GoogleSerperAPIWrapper()
     tool_search =Tool(
         name="search",
         func=serper.run,
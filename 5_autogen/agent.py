@@ -35,8 +35,8 @@ class Agent(RoutedAgent):
         text_message = TextMessage(content=message.content, source="user")
         response = await self._delegate.on_messages([text_message], ctx.cancellation_token)
         idea = response.chat_message.content
-        if random.random() < self.CHANCES_THAT_I_BOUNCE_IDEA_OFF_ANOTHER:
-            recipient = messages.find_recipient()
+        if random.random() < self.CHANCES_THAT_I_BOUNCE_IDEA_OFF_ANOTHER and messages.can_bounce():
+            recipient = messages.find_recipient(exclude=self.id.type)
             message = f"Here is my business idea. It may not be your speciality, but please refine it and make it better. {idea}"
             response = await self.send_message(messages.Message(content=message), recipient)
             idea = response.content
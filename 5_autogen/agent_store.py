@@ -0,0 +1,88 @@
+"""
+A store of the agent modules that Creator generates, keyed by a hash of everything that went into generating them:
+the template, the prompt, the model and a seed. Re-running the world with the same inputs loads the stored agents
+instead of asking the model to write them again.
+
+Generated code is checked before it's stored or run: it has to compile and define `class Agent(RoutedAgent)` with an
+`__init__(self, name)`. Modules are loaded from memory under a unique name, so they don't clutter the working
+directory and two generations of agent3 can't collide in sys.modules.
+"""
+
+import ast
+import hashlib
+import os
+import re
+import sys
+import types
+from dotenv import load_dotenv
+
+load_dotenv(override=True)
+
+AGENT_STORE = os.getenv("AGENT_STORE", ".agent_store")
+WORLD_SEED = os.getenv("WORLD_SEED", "")
+FENCE = re.compile(r"^```(?:python)?\s*\n(.*?)\n```\s*$", re.DOTALL)
+
+
+def strip_fences(code: str) -> str:
+    """Models sometimes wrap the code in a markdown block despite being asked not to"""
+    match = FENCE.match(code.strip())
+    return match.group(1) if match else code
+
+
+def validate(code: str, filename: str = "<generated>") -> None:
+    """Raise ValueError unless the code compiles and defines an Agent class the Creator can register"""
+    try:
+        tree = ast.parse(code, filename=filename)
+        compile(tree, filename, "exec")
+    except SyntaxError as e:
+        raise ValueError(f"Generated code doesn't compile: {e}") from e
+    agent = next((node for node in tree.body if isinstance(node, ast.ClassDef) and node.name == "Agent"), None)
+    if agent is None:
+        raise ValueError("Generated code has no top-level class named Agent")
+    if not any(isinstance(base, ast.Name) and base.id == "RoutedAgent" for base in agent.bases):
+        raise ValueError("Agent must inherit from RoutedAgent")
+    init = next((node for node in agent.body if isinstance(node, ast.FunctionDef) and node.name == "__init__"), None)
+    if init is None or [arg.arg for arg in init.args.args] != ["self", "name"]:
+        raise ValueError("Agent must have an __init__(self, name) method")
+
+
+class AgentStore:
+    def __init__(self, root: str = AGENT_STORE):
+        self.root = root
+
+    def key(self, template: str, prompt: str, model: str, seed: str) -> str:
+        material = "\0".join([template, prompt, model, WORLD_SEED, seed])
+        return hashlib.sha256(material.encode()).hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], f"{key}.py")
+
+    def get(self, key: str) -> str | None:
+        try:
+            with open(self.path(key), encoding="utf-8") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, key: str, code: str) -> None:
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            f.write(code)
+        os.replace(temporary, path)
+
+    def load(self, name: str, key: str, code: str) -> types.ModuleType:
+        """Execute the code as a fresh module named after the agent and its key"""
+        module_name = f"generated_{name}_{key[:12]}"
+        if module_name in sys.modules:
+            return sys.modules[module_name]
+        module = types.ModuleType(module_name)
+        module.__file__ = self.path(key)
+        sys.modules[module_name] = module
+        try:
+            exec(compile(code, module.__file__, "exec"), module.__dict__)
+        except BaseException:
+            del sys.modules[module_name]
+            raise
+        return module
@@ -0,0 +1,161 @@
+"""
+Measure what the runtime costs per message, with synthetic agents in place of the model.
+
+The traffic follows world.py: a driver asks a Creator, which passes the request to an agent, which "thinks" for a fake
+model delay and may bounce the idea to a peer, up to a maximum number of hops. The same traffic is run on the
+single-threaded in-process runtime and on the gRPC host and worker that world.py uses, and compared.
+Each reply carries how many messages its chain took and how long they spent in the fake model, so whatever else the
+chain took is the runtime's own overhead.
+Run with: uv run benchmark_runtime.py [--requests 2000] [--concurrency 100] [--delay 0.01] [--runtimes single,grpc]
+"""
+
+from dataclasses import dataclass
+from autogen_core import AgentId, MessageContext, RoutedAgent, SingleThreadedAgentRuntime, message_handler
+from autogen_core import try_get_known_serializers_for_type
+from autogen_ext.runtimes.grpc import GrpcWorkerAgentRuntime, GrpcWorkerAgentRuntimeHost
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+HOST_ADDRESS = "localhost:50061"
+
+
+@dataclass
+class Idea:
+    content: str
+    hops: int = 0
+    messages: int = 0
+    simulated: float = 0.0
+
+
+class SyntheticAgent(RoutedAgent):
+    """Waits for a fake model call, then maybe bounces the idea to a peer, like the agents Creator writes"""
+
+    def __init__(self, name: str, peers: list[str], delay: float, bounce: float, max_hops: int) -> None:
+        super().__init__(name)
+        self.peers = [peer for peer in peers if peer != name]
+        self.delay = delay
+        self.bounce = bounce
+        self.max_hops = max_hops
+
+    @message_handler
+    async def handle_idea(self, message: Idea, ctx: MessageContext) -> Idea:
+        await asyncio.sleep(self.delay)
+        if message.hops < self.max_hops and random.random() < self.bounce:
+            peer = AgentId(random.choice(self.peers), "default")
+            reply = await self.send_message(Idea(content=message.content, hops=message.hops + 1), peer)
+            return Idea(message.content, message.hops, reply.messages + 1, reply.simulated + self.delay)
+        return Idea(message.content, message.hops, 1, self.delay)
+
+
+class SyntheticCreator(RoutedAgent):
+    """Passes each request on to one of the agents, as Creator does once an agent is live"""
+
+    def __init__(self, name: str, agents: list[str]) -> None:
+        super().__init__(name)
+        self.agents = agents
+
+    @message_handler
+    async def handle_idea(self, message: Idea, ctx: MessageContext) -> Idea:
+        reply = await self.send_message(Idea(content=message.content), AgentId(random.choice(self.agents), "default"))
+        return Idea(reply.content, 0, reply.messages + 1, reply.simulated)
+
+
+async def register(runtime, args) -> None:
+    agents = [f"agent{i}" for i in range(1, args.agents + 1)]
+    for name in agents:
+        await SyntheticAgent.register(
+            runtime, name, lambda name=name: SyntheticAgent(name, agents, args.delay, args.bounce, args.max_hops)
+        )
+    await SyntheticCreator.register(runtime, "Creator", lambda: SyntheticCreator("Creator", agents))
+
+
+async def drive(runtime, args) -> dict:
+    """Send the requests with bounded concurrency, after a warm-up round so connections and agents already exist"""
+    semaphore = asyncio.Semaphore(args.concurrency)
+    creator = AgentId("Creator", "default")
+    payload = "x" * args.payload
+    latencies, replies = [], []
+
+    async def request():
+        async with semaphore:
+            start = time.perf_counter()
+            reply = await runtime.send_message(Idea(content=payload), creator)
+            latencies.append(time.perf_counter() - start)
+            replies.append(reply)
+
+    await asyncio.gather(*[runtime.send_message(Idea(content=payload), creator) for _ in range(args.concurrency)])
+    start = time.perf_counter()
+    await asyncio.gather(*[request() for _ in range(args.requests)])
+    wall = time.perf_counter() - start
+    handled = sum(reply.messages for reply in replies)
+    overhead = sum(latencies) - sum(reply.simulated for reply in replies)
+    quantiles = statistics.quantiles(latencies, n=100)
+    return {
+        "msgs/s": (handled + len(replies)) / wall,
+        "p50 ms": 1000 * statistics.median(latencies),
+        "p99 ms": 1000 * quantiles[98],
+        "overhead/msg ms": 1000 * overhead / (handled + len(replies)),
+    }
+
+
+async def run_single(args) -> dict:
+    runtime = SingleThreadedAgentRuntime()
+    await register(runtime, args)
+    runtime.start()
+    try:
+        return await drive(runtime, args)
+    finally:
+        await runtime.stop_when_idle()
+
+
+async def run_grpc(args) -> dict:
+    """The host and a single worker in this process, with the worker also sending the requests, as in world.py"""
+    host = GrpcWorkerAgentRuntimeHost(address=HOST_ADDRESS)
+    host.start()
+    worker = GrpcWorkerAgentRuntime(host_address=HOST_ADDRESS)
+    await worker.start()
+    try:
+        await register(worker, args)
+        return await drive(worker, args)
+    finally:
+        await worker.stop()
+        await host.stop()
+
+
+RUNTIMES = {"single": run_single, "grpc": run_grpc}
+
+
+def serialization_cost(payload: int, rounds: int = 10_000) -> float:
+    """Microseconds to serialize and deserialize one message, which the gRPC runtime does at every hop"""
+    serializer = try_get_known_serializers_for_type(Idea)[0]
+    message = Idea(content="x" * payload, hops=1)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        serializer.deserialize(serializer.serialize(message))
+    return 1_000_000 * (time.perf_counter() - start) / rounds
+
+
+async def main(args):
+    print(f"{args.requests} requests to {args.agents} agents, {args.concurrency} at a time; fake model delay "
+          f"{args.delay}s; bounce chance {args.bounce} up to {args.max_hops} hops; {args.payload} byte ideas")
+    print(f"{'runtime':<10}{'msgs/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'overhead/msg ms':>18}")
+    for name in args.runtimes.split(","):
+        r = await RUNTIMES[name](args)
+        print(f"{name:<10}{r['msgs/s']:>10.0f}{r['p50 ms']:>10.1f}{r['p99 ms']:>10.1f}{r['overhead/msg ms']:>18.3f}")
+    print(f"Serialization: {serialization_cost(args.payload):.1f} microseconds per message to serialize and deserialize")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Messages per second and per-message overhead of the autogen runtimes")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--agents", type=int, default=20)
+    parser.add_argument("--delay", type=float, default=0.01, help="seconds each fake model call takes")
+    parser.add_argument("--bounce", type=float, default=0.5, help="chance that an agent passes an idea on")
+    parser.add_argument("--max-hops", type=int, default=3)
+    parser.add_argument("--payload", type=int, default=2000, help="size of each idea in characters")
+    parser.add_argument("--runtimes", default=",".join(RUNTIMES))
+    asyncio.run(main(parser.parse_args()))
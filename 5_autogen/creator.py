@@ -3,16 +3,25 @@ from autogen_agentchat.agents import AssistantAgent
 from autogen_agentchat.messages import TextMessage
 from autogen_ext.models.openai import OpenAIChatCompletionClient
 import messages
+from registry import registry, tracked, announce
+from agent_store import AgentStore, strip_fences, validate
 from autogen_core import TRACE_LOGGER_NAME
-import importlib
+import os
 import logging
-from autogen_core import AgentId
+from autogen_core import AgentId, AgentRuntime
 
 logging.basicConfig(level=logging.WARNING)
 logger = logging.getLogger(TRACE_LOGGER_NAME)
 logger.addHandler(logging.StreamHandler())
 logger.setLevel(logging.DEBUG)
 
+MODEL = "gpt-4o-mini"
+MAX_GENERATION_ATTEMPTS = 3
+REGENERATE_AGENTS = os.getenv("REGENERATE_AGENTS", "false").strip().lower() == "true"
+
+# The agents registered with a runtime in this process
+live_here: set[str] = set()
+
 
 class Creator(RoutedAgent):
 
@@ -33,30 +42,88 @@ class Creator(RoutedAgent):
 
     def __init__(self, name) -> None:
         super().__init__(name)
-        model_client = OpenAIChatCompletionClient(model="gpt-4o-mini", temperature=1.0)
+        model_client = OpenAIChatCompletionClient(model=MODEL, temperature=1.0)
         self._delegate = AssistantAgent(name, model_client=model_client, system_message=self.system_message)
+        self.store = AgentStore()
+        self.template = read_template()
 
     def get_user_prompt(self):
-        prompt = "Please generate a new Agent based strictly on this template. Stick to the class structure. \
-            Respond only with the python code, no other text, and no markdown code blocks.\n\n\
-            Be creative about taking the agent in a new direction, but don't change method signatures.\n\n\
-            Here is the template:\n\n"
-        with open("agent.py", "r", encoding="utf-8") as f:
-            template = f.read()
-        return prompt + template   
-        
+        return user_prompt(self.template)
+
+    async def generate(self, agent_name: str, ctx: MessageContext) -> str:
+        """Ask the model for a new agent, retrying if what comes back isn't a valid Agent class"""
+        for attempt in range(1, MAX_GENERATION_ATTEMPTS + 1):
+            text_message = TextMessage(content=self.get_user_prompt(), source="user")
+            response = await self._delegate.on_messages([text_message], ctx.cancellation_token)
+            code = strip_fences(response.chat_message.content)
+            try:
+                validate(code, f"{agent_name}.py")
+                return code
+            except ValueError as e:
+                logger.warning(f"** Attempt {attempt} to create {agent_name} gave invalid code: {e}")
+        raise ValueError(f"Couldn't generate a valid agent {agent_name} in {MAX_GENERATION_ATTEMPTS} attempts")
+
+    async def get_agent_module(self, agent_name: str, ctx: MessageContext):
+        """Load the agent from the store if it's been generated from these inputs before, otherwise generate it"""
+        key = agent_key(self.store, self.template, agent_name)
+        code = None if REGENERATE_AGENTS else self.store.get(key)
+        if code is None:
+            code = await self.generate(agent_name, ctx)
+            self.store.put(key, code)
+            print(f"** Creator has created python code for agent {agent_name} - about to register with Runtime")
+        else:
+            validate(code, f"{agent_name}.py")
+            print(f"** Creator is reusing stored code for agent {agent_name} - about to register with Runtime")
+        return self.store.load(agent_name, key, code)
+
 
     @message_handler
     async def handle_my_message_type(self, message: messages.Message, ctx: MessageContext) -> messages.Message:
         filename = message.content
         agent_name = filename.split(".")[0]
-        text_message = TextMessage(content=self.get_user_prompt(), source="user")
-        response = await self._delegate.on_messages([text_message], ctx.cancellation_token)
-        with open(filename, "w", encoding="utf-8") as f:
-            f.write(response.chat_message.content)
-        print(f"** Creator has created python code for agent {agent_name} - about to register with Runtime")
-        module = importlib.import_module(agent_name)
-        await module.Agent.register(self.runtime, agent_name, lambda: module.Agent(agent_name))
-        logger.info(f"** Agent {agent_name} is live")
-        result = await self.send_message(messages.Message(content="Give me an idea"), AgentId(agent_name, "default"))
-        return messages.Message(content=result.content)
\ No newline at end of file
+        module = await self.get_agent_module(agent_name, ctx)
+        await make_live(self.runtime, agent_name, module)
+        request = messages.Message(content="Give me an idea", idea=message.idea)
+        result = await self.send_message(request, AgentId(agent_name, "default"))
+        return messages.Message(content=result.content)
+
+
+def read_template() -> str:
+    with open("agent.py", "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def user_prompt(template: str) -> str:
+    prompt = "Please generate a new Agent based strictly on this template. Stick to the class structure. \
+            Respond only with the python code, no other text, and no markdown code blocks.\n\n\
+            Be creative about taking the agent in a new direction, but don't change method signatures.\n\n\
+            Here is the template:\n\n"
+    return prompt + template
+
+
+def agent_key(store: AgentStore, template: str, agent_name: str) -> str:
+    return store.key(template, Creator.system_message + user_prompt(template), MODEL, agent_name)
+
+
+async def make_live(runtime: AgentRuntime, agent_name: str, module) -> None:
+    """Register a generated agent with the runtime and tell every worker's registry that it's live"""
+    if agent_name in live_here:
+        return
+    agent_class = tracked(module.Agent)
+    await agent_class.register(runtime, agent_name, lambda: agent_class(agent_name))
+    live_here.add(agent_name)
+    registry.register(agent_name)
+    await announce(runtime, agent_name)
+    logger.info(f"** Agent {agent_name} is live")
+
+
+async def restore(runtime: AgentRuntime, agent_name: str) -> bool:
+    """Bring back an agent that was created before, from the store, without asking the model; False if it isn't stored"""
+    store = AgentStore()
+    key = agent_key(store, read_template(), agent_name)
+    code = store.get(key)
+    if code is None:
+        return False
+    validate(code, f"{agent_name}.py")
+    await make_live(runtime, agent_name, store.load(agent_name, key, code))
+    return True
@@ -0,0 +1,97 @@
+"""
+Keeps the world's fan-out predictable: how far an idea can be bounced, how long a request may take,
+and how many agents can be working at once, in total and per agent.
+
+An agent holds a slot only while it's working itself. While it waits on another agent's reply the slot is
+released, so a chain of bounces can never deadlock however small the limits are.
+"""
+
+from collections import Counter
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+import asyncio
+import os
+import time
+from dotenv import load_dotenv
+
+load_dotenv(override=True)
+
+MAX_HOPS = int(os.getenv("MAX_HOPS", "3"))
+IDEA_DEADLINE_SECONDS = float(os.getenv("IDEA_DEADLINE_SECONDS", "300"))
+MAX_CONCURRENT_AGENTS = int(os.getenv("MAX_CONCURRENT_AGENTS", "8"))
+MAX_CONCURRENT_PER_AGENT = int(os.getenv("MAX_CONCURRENT_PER_AGENT", "2"))
+
+# The message being handled, and the agent handling it, for whatever that agent sends on
+current_message: ContextVar[tuple | None] = ContextVar("current_message", default=None)
+
+
+class Governor:
+    def __init__(self, total: int = MAX_CONCURRENT_AGENTS, per_agent: int = MAX_CONCURRENT_PER_AGENT):
+        self.total = asyncio.Semaphore(total)
+        self.per_agent_limit = per_agent
+        self.per_agent: dict[str, asyncio.Semaphore] = {}
+        self.held = Counter()
+        self.active = 0
+        self.peak = 0
+        self.refused = Counter()
+
+    async def acquire(self, name: str, deadline: float | None = None) -> None:
+        """Wait for a slot for this agent, giving up with TimeoutError if the deadline passes first"""
+        agent = self.per_agent.setdefault(name, asyncio.Semaphore(self.per_agent_limit))
+        remaining = None if not deadline else max(0.0, deadline - time.time())
+        async with asyncio.timeout(remaining):
+            await agent.acquire()
+            try:
+                await self.total.acquire()
+            except BaseException:
+                agent.release()
+                raise
+        self.held[name] += 1
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+
+    def release(self, name: str) -> None:
+        self.held[name] -= 1
+        self.active -= 1
+        self.total.release()
+        self.per_agent[name].release()
+
+    @asynccontextmanager
+    async def slot(self, name: str, deadline: float | None = None):
+        await self.acquire(name, deadline)
+        try:
+            yield
+        finally:
+            self.release(name)
+
+    @asynccontextmanager
+    async def waiting(self, name: str):
+        """
+        Give up the agent's slot while it waits on another agent, and take one back afterwards. An agent sending from
+        outside a slot, as one does when it's set up, has nothing to give up and doesn't take a slot either.
+        """
+        held = self.held[name] > 0
+        if held:
+            self.release(name)
+        try:
+            yield
+        finally:
+            if held:
+                await self.acquire(name)
+
+    def refusal(self, message, name: str) -> str | None:
+        """Why a bounced message shouldn't be handled by this agent, if there's a reason"""
+        if message.hops > MAX_HOPS:
+            return "hops"
+        if name in message.path:
+            return "cycle"
+        if message.deadline and time.time() > message.deadline:
+            return "deadline"
+        return None
+
+    def stats(self) -> str:
+        refused = ", ".join(f"{reason}: {count}" for reason, count in self.refused.items()) or "none"
+        return f"Peak concurrent agents: {self.peak}; bounces refused: {refused}"
+
+
+governor = Governor()
@@ -0,0 +1,141 @@
+"""
+A durable record of the ideas as they're refined. Each agent's output is appended as soon as the agent has it, so
+a run that dies loses at most the last batch, and a run started again skips the ideas that were already finished.
+
+The writes happen on a thread of their own, so the agents' event loop never waits on SQLite: record() and complete()
+only queue a row. The writer commits hops in batches, every FLUSH_EVERY rows or FLUSH_SECONDS, whichever comes first;
+a finished idea is committed straight away. Every process of a distributed world appends to the same database.
+"""
+
+import asyncio
+import atexit
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from dotenv import load_dotenv
+
+load_dotenv(override=True)
+
+IDEAS_DB = os.getenv("IDEAS_DB", "ideas.db")
+FLUSH_EVERY = 20
+FLUSH_SECONDS = 1.0
+PROGRESS_EVERY_N_SECONDS = 5
+PREVIEW_LENGTH = 100
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS hops (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    idea INTEGER NOT NULL,
+    agent TEXT NOT NULL,
+    hops INTEGER NOT NULL,
+    content TEXT NOT NULL,
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS hops_idea ON hops (idea);
+CREATE TABLE IF NOT EXISTS ideas (idea INTEGER PRIMARY KEY, content TEXT NOT NULL, completed REAL NOT NULL);
+"""
+
+
+def preview(content: str) -> str:
+    flat = " ".join(content.split())
+    return flat if len(flat) <= PREVIEW_LENGTH else flat[: PREVIEW_LENGTH - 3] + "..."
+
+
+class IdeaJournal:
+    def __init__(self, path: str = IDEAS_DB):
+        self.path = path
+        self.queue: queue.Queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.executescript(SCHEMA)
+        return connection
+
+    def start(self) -> None:
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name="idea-journal", daemon=True)
+                self.thread.start()
+                atexit.register(self.flush)
+
+    def record(self, idea: int, agent: str, hops: int, content: str) -> None:
+        """Append one agent's take on an idea, and show it"""
+        print(f"[idea {idea}] {agent} at hop {hops}: {preview(content)}")
+        self.start()
+        self.queue.put(("hop", (idea, agent, hops, content, time.time())))
+
+    def complete(self, idea: int, content: str) -> None:
+        self.start()
+        self.queue.put(("idea", (idea, content, time.time())))
+
+    def flush(self) -> None:
+        """Wait until everything recorded so far is committed; from the event loop, await asyncio.to_thread(flush)"""
+        if self.thread is None:
+            return
+        done = threading.Event()
+        self.queue.put(("flush", done))
+        done.wait()
+
+    def run(self) -> None:
+        """The writer: commit hops when a batch is full or FLUSH_SECONDS have passed, and finished ideas at once"""
+        with closing(self.connect()) as connection:
+            pending, flushed_at = [], time.time()
+            while True:
+                try:
+                    kind, item = self.queue.get(timeout=max(flushed_at + FLUSH_SECONDS - time.time(), 0.01))
+                except queue.Empty:
+                    kind, item = None, None
+                if kind == "hop":
+                    pending.append(item)
+                    if len(pending) < FLUSH_EVERY and time.time() - flushed_at < FLUSH_SECONDS:
+                        continue
+                try:
+                    with connection:
+                        if pending:
+                            connection.executemany(
+                                "INSERT INTO hops (idea, agent, hops, content, created) VALUES (?, ?, ?, ?, ?)", pending
+                            )
+                        if kind == "idea":
+                            connection.execute("INSERT OR REPLACE INTO ideas (idea, content, completed) VALUES (?, ?, ?)", item)
+                    pending.clear()
+                except sqlite3.Error as e:
+                    print(f"Idea journal error: {e}")
+                flushed_at = time.time()
+                if kind == "flush":
+                    item.set()
+
+    def completed(self) -> set[int]:
+        with closing(self.connect()) as connection:
+            return {row[0] for row in connection.execute("SELECT idea FROM ideas")}
+
+    def counts(self) -> tuple[int, int]:
+        """Hops recorded and ideas finished so far, by every process"""
+        with closing(self.connect()) as connection:
+            hops = connection.execute("SELECT count(*) FROM hops").fetchone()[0]
+            ideas = connection.execute("SELECT count(*) FROM ideas").fetchone()[0]
+        return hops, ideas
+
+
+journal = IdeaJournal()
+
+
+async def show_progress(total: int, every: float = PROGRESS_EVERY_N_SECONDS) -> None:
+    """Print how many ideas are finished, and how fast hops and ideas are being recorded"""
+    await asyncio.to_thread(journal.flush)
+    previous_hops, previous_ideas = await asyncio.to_thread(journal.counts)
+    while True:
+        await asyncio.sleep(every)
+        await asyncio.to_thread(journal.flush)
+        hops, ideas = await asyncio.to_thread(journal.counts)
+        print(
+            f"** Progress: {ideas}/{total} ideas finished, {hops} hops recorded; "
+            f"{(hops - previous_hops) / every:.1f} hops/s, {(ideas - previous_ideas) / every:.2f} ideas/s"
+        )
+        previous_hops, previous_ideas = hops, ideas
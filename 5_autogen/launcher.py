@@ -0,0 +1,256 @@
+"""
+Run the world across processes, so that hundreds of agents aren't sharing one event loop and one core.
+
+The launcher starts the gRPC host, then N worker processes that each run their own runtime with a Creator of their own.
+Each agent is placed on a worker, either by a hash of its name or on the worker with the fewest agents so far, and the
+driver asks that worker's Creator to make it. Placements are kept for the whole run: if a worker dies it's started
+again and re-registers its agents from the agent store, without asking the model to write them again.
+
+Agents find each other through the host. Every worker's registry hears when an agent goes live anywhere, but the
+in-flight counts it balances on are only those of the messages sent from that worker.
+
+Run with: uv run launcher.py [--workers 4] [--agents 200] [--placement hash|least-loaded]
+"""
+
+from autogen_ext.runtimes.grpc import GrpcWorkerAgentRuntimeHost, GrpcWorkerAgentRuntime
+from autogen_core import AgentId, try_get_known_serializers_for_type
+from creator import Creator, restore
+from registry import registry, listen_for_agents
+from governor import IDEA_DEADLINE_SECONDS
+from ideas import journal, show_progress, IDEAS_DB
+import messages
+import argparse
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import queue
+import time
+
+HOST_ADDRESS = os.getenv("HOST_ADDRESS", "localhost:50051")
+WORKERS = int(os.getenv("WORKERS", str(os.cpu_count() or 4)))
+HOW_MANY_AGENTS = int(os.getenv("HOW_MANY_AGENTS", "200"))
+REPORT_EVERY_N_SECONDS = 5
+SEND_ATTEMPTS = 3
+
+
+def creator_name(worker: int) -> str:
+    return f"Creator{worker}"
+
+
+class WorkerRuntime(GrpcWorkerAgentRuntime):
+    """
+    A worker runtime whose request ids are unique across processes. The host files pending replies under the receiving
+    worker and the sender's request id, and every runtime counts from 1, so two workers sending to a third would collide.
+    """
+
+    # GrpcWorkerAgentRuntime has no public hook for request ids, so this overrides a private method; the pin on
+    # autogen-ext in pyproject.toml is what keeps it there. Check it still exists before moving to a new release.
+    async def _get_new_request_id(self) -> str:
+        return f"{os.getpid()}-{await super()._get_new_request_id()}"
+
+
+def run_worker(worker: int, address: str, agents: list[str], peers: list[str], reports) -> None:
+    """The entry point of each worker process"""
+    asyncio.run(serve(worker, address, agents, peers, reports))
+
+
+async def serve(worker: int, address: str, agents: list[str], peers: list[str], reports) -> None:
+    runtime = WorkerRuntime(host_address=address)
+    await runtime.start()
+    await listen_for_agents(runtime, f"Registry{worker}")
+    for name in peers:
+        registry.register(name)
+    name = creator_name(worker)
+    await Creator.register(runtime, name, lambda: Creator(name))
+    for agent_name in agents:
+        if not await restore(runtime, agent_name):
+            print(f"** Worker {worker} has no stored code for {agent_name}; it will be created again when asked")
+    while True:
+        reports.put((worker, os.getpid(), registry.handled))
+        await asyncio.sleep(REPORT_EVERY_N_SECONDS)
+
+
+class Placement:
+    """Which worker each agent lives on, decided once and kept, so a restarted worker gets the same agents back"""
+
+    def __init__(self, workers: int, strategy: str = "hash"):
+        self.workers = workers
+        self.strategy = strategy
+        self.agents: dict[int, list[str]] = {worker: [] for worker in range(workers)}
+        self.worker_of: dict[str, int] = {}
+
+    def place(self, name: str, rates: dict[int, float] | None = None) -> int:
+        if name in self.worker_of:
+            return self.worker_of[name]
+        if self.strategy == "hash":
+            worker = int(hashlib.sha256(name.encode()).hexdigest(), 16) % self.workers
+        else:
+            rates = rates or {}
+            worker = min(range(self.workers), key=lambda w: (len(self.agents[w]), rates.get(w, 0.0)))
+        self.agents[worker].append(name)
+        self.worker_of[name] = worker
+        return worker
+
+
+class Throughput:
+    """Messages handled by each worker, carried across restarts, from the counts the workers report"""
+
+    def __init__(self, workers: int):
+        self.pids: dict[int, int] = {}
+        self.base = {worker: 0 for worker in range(workers)}
+        self.latest = {worker: 0 for worker in range(workers)}
+        self.previous = {worker: 0 for worker in range(workers)}
+        self.rates = {worker: 0.0 for worker in range(workers)}
+
+    def record(self, worker: int, pid: int, handled: int) -> bool:
+        """Take a report, returning True if it's the first from this worker process"""
+        first = self.pids.get(worker) != pid
+        if first:
+            self.base[worker] += self.latest[worker]
+            self.latest[worker] = 0
+            self.pids[worker] = pid
+        self.latest[worker] = handled
+        return first
+
+    def total(self, worker: int) -> int:
+        return self.base[worker] + self.latest[worker]
+
+    def tick(self, seconds: float) -> None:
+        for worker in self.rates:
+            total = self.total(worker)
+            self.rates[worker] = (total - self.previous[worker]) / seconds
+            self.previous[worker] = total
+
+
+class Launcher:
+    def __init__(self, workers: int, strategy: str, address: str = HOST_ADDRESS):
+        self.workers = workers
+        self.address = address
+        self.placement = Placement(workers, strategy)
+        self.throughput = Throughput(workers)
+        self.context = multiprocessing.get_context("spawn")
+        self.reports = self.context.Queue()
+        self.processes: dict[int, multiprocessing.Process] = {}
+        self.ready = {worker: asyncio.Event() for worker in range(workers)}
+        self.restarts = {worker: 0 for worker in range(workers)}
+        self.sending: dict[int, set[asyncio.Task]] = {worker: set() for worker in range(workers)}
+
+    def start_worker(self, worker: int) -> None:
+        """Start a worker with the agents that were live on it and a registry of the agents live elsewhere"""
+        agents = [name for name in self.placement.agents[worker] if name in registry]
+        peers = [name for name in registry.names if self.placement.worker_of.get(name) != worker]
+        process = self.context.Process(
+            target=run_worker, args=(worker, self.address, agents, peers, self.reports), daemon=True
+        )
+        process.start()
+        self.processes[worker] = process
+
+    async def supervise(self) -> None:
+        """
+        Restart any worker that has died, with the agents that were live on it. The host never answers requests that
+        were in flight to a dead worker, so the driver's are cancelled to be sent again.
+        """
+        while True:
+            await asyncio.sleep(1)
+            for worker, process in self.processes.items():
+                if not process.is_alive():
+                    agents = sum(1 for name in self.placement.agents[worker] if name in registry)
+                    print(f"** Worker {worker} exited with code {process.exitcode}; restarting it with {agents} agents")
+                    self.ready[worker].clear()
+                    self.restarts[worker] += 1
+                    for send in self.sending[worker]:
+                        send.cancel()
+                    self.start_worker(worker)
+
+    async def collect(self) -> None:
+        while True:
+            try:
+                worker, pid, handled = self.reports.get_nowait()
+            except queue.Empty:
+                await asyncio.sleep(0.1)
+                continue
+            if self.throughput.record(worker, pid, handled):
+                self.ready[worker].set()
+
+    async def report(self) -> None:
+        while True:
+            await asyncio.sleep(REPORT_EVERY_N_SECONDS)
+            self.throughput.tick(REPORT_EVERY_N_SECONDS)
+            print(self.table())
+
+    def table(self) -> str:
+        lines = [f"{'worker':>6}{'agents':>8}{'handled':>10}{'msgs/s':>9}{'restarts':>10}"]
+        for worker in range(self.workers):
+            lines.append(
+                f"{worker:>6}{len(self.placement.agents[worker]):>8}{self.throughput.total(worker):>10}"
+                f"{self.throughput.rates[worker]:>9.1f}{self.restarts[worker]:>10}"
+            )
+        return "\n".join(lines)
+
+    async def create_and_message(self, driver: WorkerRuntime, i: int) -> None:
+        agent_name = f"agent{i}"
+        worker = self.placement.place(agent_name, self.throughput.rates)
+        for attempt in range(1, SEND_ATTEMPTS + 1):
+            await self.ready[worker].wait()
+            message = messages.Message(content=f"{agent_name}.py", idea=i)
+            send = asyncio.create_task(driver.send_message(message, AgentId(creator_name(worker), "default")))
+            self.sending[worker].add(send)
+            try:
+                async with asyncio.timeout(IDEA_DEADLINE_SECONDS):
+                    result = await send
+                journal.complete(i, result.content)
+                with open(f"idea{i}.md", "w") as f:
+                    f.write(result.content)
+                return
+            except asyncio.CancelledError:
+                if asyncio.current_task().cancelling():
+                    raise
+                print(f"Attempt {attempt} to run {agent_name} was lost with worker {worker}")
+            except Exception as e:
+                print(f"Attempt {attempt} to run {agent_name} on worker {worker} failed: {e!r}")
+            finally:
+                self.sending[worker].discard(send)
+        print(f"Gave up on {agent_name} after {SEND_ATTEMPTS} attempts")
+
+    async def run(self, how_many: int) -> None:
+        host = GrpcWorkerAgentRuntimeHost(address=self.address)
+        host.start()
+        for worker in range(self.workers):
+            self.start_worker(worker)
+        driver = WorkerRuntime(host_address=self.address)
+        driver.add_message_serializer(try_get_known_serializers_for_type(messages.Message))
+        await driver.start()
+        await listen_for_agents(driver)
+        tasks = (self.supervise(), self.collect(), self.report(), show_progress(how_many))
+        background = [asyncio.create_task(task) for task in tasks]
+        completed = journal.completed()
+        if completed:
+            print(f"** Skipping {len(completed)} ideas already finished in {IDEAS_DB} - delete it to start again")
+        start = time.perf_counter()
+        try:
+            await asyncio.gather(*[self.create_and_message(driver, i) for i in range(1, how_many + 1) if i not in completed])
+            await asyncio.sleep(REPORT_EVERY_N_SECONDS + 1)
+        finally:
+            elapsed = time.perf_counter() - start
+            for task in background:
+                task.cancel()
+            print(self.table())
+            total = sum(self.throughput.total(worker) for worker in range(self.workers))
+            print(f"{len(registry)} of {how_many} agents came up; {total} messages handled in {elapsed:.1f}s")
+            for process in self.processes.values():
+                process.terminate()
+            try:
+                await driver.stop()
+                await host.stop()
+            except Exception as e:
+                print(e)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the world across a gRPC host and several worker processes")
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--agents", type=int, default=HOW_MANY_AGENTS)
+    parser.add_argument("--placement", choices=["hash", "least-loaded"], default="hash")
+    args = parser.parse_args()
+    asyncio.run(Launcher(args.workers, args.placement).run(args.agents))
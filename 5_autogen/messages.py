@@ -1,24 +1,58 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from autogen_core import AgentId
-import glob
-import os
-
-
-import random
+from registry import registry
+from governor import current_message, MAX_HOPS, IDEA_DEADLINE_SECONDS
+import time
 
 @dataclass
 class Message:
+    """
+    The content, plus an envelope that travels with an idea as it's bounced between agents:
+    how many times it has been passed on, when the original request has to be answered by, who has handled it,
+    and which of the world's ideas it is.
+    A message created while an agent is handling another inherits the envelope, one hop further on.
+    """
     content: str
+    hops: int = 0
+    deadline: float = 0.0
+    path: list[str] = field(default_factory=list)
+    idea: int = 0
+
+    def __post_init__(self):
+        current = current_message.get()
+        if current is not None and self.hops == 0 and not self.path:
+            message, name = current
+            self.hops = message.hops + 1
+            self.deadline = message.deadline
+            self.path = message.path + [name]
+            self.idea = message.idea
+        elif not self.deadline:
+            self.deadline = time.time() + IDEA_DEADLINE_SECONDS
+
+
+def visited() -> set[str]:
+    """The agents that have already handled the idea being worked on, including the current one"""
+    current = current_message.get()
+    if current is None:
+        return set()
+    message, name = current
+    return set(message.path) | {name}
+
+
+def can_bounce() -> bool:
+    """Whether there's hop budget and time left to pass the current idea on, and someone new to pass it to"""
+    current = current_message.get()
+    if current is None:
+        return len(registry) > 0
+    message, _ = current
+    if message.hops + 1 > MAX_HOPS or time.time() > message.deadline:
+        return False
+    return registry.has_candidate(exclude=visited())
 
 
-def find_recipient() -> AgentId:
-    try:
-        agent_files = glob.glob("agent*.py")
-        agent_names = [os.path.splitext(file)[0] for file in agent_files]
-        agent_names.remove("agent")
-        agent_name = random.choice(agent_names)
-        print(f"Selecting agent for refinement: {agent_name}")
-        return AgentId(agent_name, "default")
-    except Exception as e:
-        print(f"Exception finding recipient: {e}")
-        return AgentId("agent1", "default")
+def find_recipient(exclude: str | None = None) -> AgentId:
+    """Choose a live agent to bounce an idea off, favouring those with the fewest messages in flight"""
+    excluded = visited() | ({exclude} if exclude else set())
+    agent_name = registry.choose(exclude=excluded)
+    print(f"Selecting agent for refinement: {agent_name}")
+    return AgentId(agent_name, "default")
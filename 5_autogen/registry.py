@@ -0,0 +1,162 @@
+from contextlib import contextmanager
+from dataclasses import dataclass
+from autogen_core import AgentRuntime, MessageContext, RoutedAgent, TopicId, TypeSubscription, message_handler
+from governor import governor, current_message
+from ideas import journal
+import random
+
+REGISTRY_TOPIC = "registry"
+
+
+class AgentRegistry:
+    """
+    The agents that are live in this runtime, and how many messages each has been sent but not yet answered.
+    Agents are added once they're registered with the runtime, so a recipient is never a half-written module.
+    A recipient is chosen with the "power of two choices": pick two live agents at random and use the less busy one,
+    which spreads the load almost as well as checking every agent, in constant time.
+    """
+
+    def __init__(self):
+        self.names: list[str] = []
+        self.positions: dict[str, int] = {}
+        self.in_flight: dict[str, int] = {}
+        self.pending: dict[str, int] = {}
+        self.handled = 0
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.positions
+
+    def register(self, name: str) -> None:
+        if name not in self.positions:
+            self.positions[name] = len(self.names)
+            self.names.append(name)
+            self.in_flight.setdefault(name, 0)
+            self.pending.setdefault(name, 0)
+
+    def unregister(self, name: str) -> None:
+        position = self.positions.pop(name, None)
+        if position is None:
+            return
+        last = self.names.pop()
+        if last != name:
+            self.names[position] = last
+            self.positions[last] = position
+
+    def others(self, exclude: set[str]) -> int:
+        return len(self.names) - sum(1 for name in exclude if name in self.positions)
+
+    def has_candidate(self, exclude: set[str]) -> bool:
+        return self.others(exclude) > 0
+
+    def sample(self, exclude: set[str]) -> str:
+        while True:
+            name = self.names[random.randrange(len(self.names))]
+            if name not in exclude:
+                return name
+
+    def load(self, name: str) -> int:
+        return self.pending[name] + self.in_flight[name]
+
+    def choose(self, exclude: set[str] | None = None) -> str:
+        """
+        A live agent to send a message to, other than those in `exclude` unless there's no one else.
+        The message counts against the agent straight away, so a burst of choices doesn't all land on the same agent.
+        """
+        if not self.names:
+            raise LookupError("No agents are registered yet")
+        exclude = exclude or set()
+        if not self.has_candidate(exclude):
+            chosen = self.sample(set())
+        else:
+            first, second = self.sample(exclude), self.sample(exclude)
+            chosen = second if self.load(second) < self.load(first) else first
+        self.pending[chosen] += 1
+        return chosen
+
+    @contextmanager
+    def handling(self, name: str):
+        """Count a message as in flight for an agent while it's being handled"""
+        if self.pending.get(name, 0) > 0:
+            self.pending[name] -= 1
+        self.in_flight[name] = self.in_flight.get(name, 0) + 1
+        self.handled += 1
+        try:
+            yield
+        finally:
+            self.in_flight[name] -= 1
+
+
+registry = AgentRegistry()
+
+
+@dataclass
+class AgentLive:
+    """Published when an agent is registered, so runtimes in other processes can send it ideas too"""
+    name: str
+
+
+class RegistryListener(RoutedAgent):
+    """Adds agents that go live anywhere in the world to this process's registry"""
+
+    @message_handler
+    async def on_agent_live(self, message: AgentLive, ctx: MessageContext) -> None:
+        registry.register(message.name)
+
+
+async def listen_for_agents(runtime: AgentRuntime, listener: str = "Registry") -> None:
+    """Keep this process's registry up to date with agents registered by every runtime connected to the same host"""
+    await RegistryListener.register(runtime, listener, lambda: RegistryListener(listener))
+    await runtime.add_subscription(TypeSubscription(topic_type=REGISTRY_TOPIC, agent_type=listener))
+
+
+async def announce(runtime: AgentRuntime, name: str) -> None:
+    await runtime.publish_message(AgentLive(name), TopicId(REGISTRY_TOPIC, "default"))
+
+
+def tracked(agent_class):
+    """
+    A subclass of an agent class that runs under the governor and keeps the registry's in-flight counts up to date.
+    Bounced messages that have run out of hops or time, or would go round in a circle, are handed straight back.
+    Whatever the agent makes of an idea is appended to the journal as soon as it replies.
+    """
+
+    class Tracked(agent_class):
+        async def on_message_impl(self, message, ctx):
+            name = self.id.type
+            with registry.handling(name):
+                hops, deadline = getattr(message, "hops", 0), getattr(message, "deadline", 0.0)
+                if hops:
+                    reason = governor.refusal(message, name)
+                    if reason:
+                        governor.refused[reason] += 1
+                        return type(message)(
+                            content=message.content, hops=hops, deadline=deadline, path=message.path, idea=message.idea
+                        )
+                try:
+                    async with governor.slot(name, deadline):
+                        token = current_message.set((message, name)) if hasattr(message, "hops") else None
+                        try:
+                            result = await super().on_message_impl(message, ctx)
+                            if getattr(message, "idea", 0) and result is not None:
+                                journal.record(message.idea, name, hops, result.content)
+                            return result
+                        finally:
+                            if token:
+                                current_message.reset(token)
+                except TimeoutError:
+                    if not hops:
+                        raise
+                    governor.refused["deadline"] += 1
+                    return type(message)(
+                        content=message.content, hops=hops, deadline=deadline, path=message.path, idea=message.idea
+                    )
+
+        async def send_message(self, *args, **kwargs):
+            async with governor.waiting(self.id.type):
+                return await super().send_message(*args, **kwargs)
+
+    Tracked.__name__ = Tracked.__qualname__ = agent_class.__name__
+    return Tracked
@@ -4,13 +4,17 @@ from creator import Creator
 from autogen_ext.runtimes.grpc import GrpcWorkerAgentRuntime
 from autogen_core import AgentId
 import messages
+from governor import governor
+from registry import listen_for_agents
+from ideas import journal, show_progress, IDEAS_DB
 import asyncio
 
 HOW_MANY_AGENTS = 20
 
 async def create_and_message(worker, creator_id, i: int):
     try:
-        result = await worker.send_message(messages.Message(content=f"agent{i}.py"), creator_id)
+        result = await worker.send_message(messages.Message(content=f"agent{i}.py", idea=i), creator_id)
+        journal.complete(i, result.content)
         with open(f"idea{i}.md", "w") as f:
             f.write(result.content)
     except Exception as e:
@@ -21,10 +25,18 @@ async def main():
     host.start() 
     worker = GrpcWorkerAgentRuntime(host_address="localhost:50051")
     await worker.start()
+    await listen_for_agents(worker)
     result = await Creator.register(worker, "Creator", lambda: Creator("Creator"))
     creator_id = AgentId("Creator", "default")
-    coroutines = [create_and_message(worker, creator_id, i) for i in range(1, HOW_MANY_AGENTS+1)]
+    completed = journal.completed()
+    if completed:
+        print(f"** Skipping {len(completed)} ideas already finished in {IDEAS_DB} - delete it to start again")
+    coroutines = [create_and_message(worker, creator_id, i) for i in range(1, HOW_MANY_AGENTS+1) if i not in completed]
+    progress = asyncio.create_task(show_progress(HOW_MANY_AGENTS))
     await asyncio.gather(*coroutines)
+    progress.cancel()
+    await asyncio.to_thread(journal.flush)
+    print(governor.stats())
     try:
         await worker.stop()
         await host.stop()
@@ -9,6 +9,9 @@ load_dotenv(override=True)
 
 INITIAL_BALANCE = 10_000.0
 SPREAD = 0.002
+SUMMARY_TRANSACTIONS = 5
+RATIONALE_CHARS = 120
+TRANSACTIONS_PAGE_SIZE = 20
 
 
 class Transaction(BaseModel):
@@ -49,8 +52,8 @@ class Account(BaseModel):
         return cls(**fields)
     
     
-    def save(self):
-        write_account(self.name.lower(), self.model_dump())
+    def save(self, cash_in: float = 0.0, restart: bool = False):
+        write_account(self.name.lower(), self.model_dump(), cash_in=cash_in, restart=restart)
 
     def reset(self, strategy: str):
         self.balance = INITIAL_BALANCE
@@ -58,7 +61,7 @@ class Account(BaseModel):
         self.holdings = {}
         self.transactions = []
         self.portfolio_value_time_series = []
-        self.save()
+        self.save(restart=True)
 
     def deposit(self, amount: float):
         """ Deposit funds into the account. """
@@ -66,7 +69,7 @@ class Account(BaseModel):
             raise ValueError("Deposit amount must be positive.")
         self.balance += amount
         print(f"Deposited ${amount}. New balance: ${self.balance}")
-        self.save()
+        self.save(cash_in=amount)
 
     def withdraw(self, amount: float):
         """ Withdraw funds from the account, ensuring it doesn't go negative. """
@@ -74,7 +77,7 @@ class Account(BaseModel):
             raise ValueError("Insufficient funds for withdrawal.")
         self.balance -= amount
         print(f"Withdrew ${amount}. New balance: ${self.balance}")
-        self.save()
+        self.save(cash_in=-amount)
 
     def buy_shares(self, symbol: str, quantity: int, rationale: str) -> str:
         """ Buy shares of a stock if sufficient funds are available. """
@@ -98,7 +101,7 @@ class Account(BaseModel):
         self.balance -= total_cost
         self.save()
         write_log(self.name, "account", f"Bought {quantity} of {symbol}")
-        return "Completed. Latest details:\n" + self.report()
+        return "Completed. Latest details:\n" + self.summary()
 
     def sell_shares(self, symbol: str, quantity: int, rationale: str) -> str:
         """ Sell shares of a stock if the user has enough shares. """
@@ -124,7 +127,7 @@ class Account(BaseModel):
         self.balance += total_proceeds
         self.save()
         write_log(self.name, "account", f"Sold {quantity} of {symbol}")
-        return "Completed. Latest details:\n" + self.report()
+        return "Completed. Latest details:\n" + self.summary()
 
     def calculate_portfolio_value(self):
         """ Calculate the total value of the user's portfolio. """
@@ -150,17 +153,85 @@ class Account(BaseModel):
         """ List all transactions made by the user. """
         return [transaction.model_dump() for transaction in self.transactions]
     
-    def report(self) -> str:
-        """ Return a json string representing the account.  """
+    def calculate_cost_basis(self) -> dict[str, float]:
+        """ Calculate the average cost per share of each holding; sales don't change the average cost. """
+        quantities = {}
+        costs = {}
+        for transaction in self.transactions:
+            symbol = transaction.symbol
+            held = quantities.get(symbol, 0)
+            if transaction.quantity > 0:
+                costs[symbol] = costs.get(symbol, 0.0) + transaction.total()
+            elif held > 0:
+                costs[symbol] = costs.get(symbol, 0.0) * (held + transaction.quantity) / held
+            quantities[symbol] = held + transaction.quantity
+        return {symbol: costs.get(symbol, 0.0) / quantity for symbol, quantity in self.holdings.items() if quantity}
+
+    def record_portfolio_value(self) -> float:
+        """ Calculate the portfolio value and add it to the time series. """
         portfolio_value = self.calculate_portfolio_value()
         self.portfolio_value_time_series.append((datetime.now().strftime("%Y-%m-%d %H:%M:%S"), portfolio_value))
         self.save()
+        return portfolio_value
+
+    def report(self) -> str:
+        """ Return a json string representing the account.  """
+        portfolio_value = self.record_portfolio_value()
         pnl = self.calculate_profit_loss(portfolio_value)
         data = self.model_dump()
         data["total_portfolio_value"] = portfolio_value
         data["total_profit_loss"] = pnl
         write_log(self.name, "account", f"Retrieved account details")
         return json.dumps(data)
+
+    def summarize_transaction(self, index: int) -> dict:
+        transaction = self.transactions[index]
+        rationale = transaction.rationale
+        if len(rationale) > RATIONALE_CHARS:
+            rationale = rationale[:RATIONALE_CHARS].rstrip() + "..."
+        return {
+            "index": index,
+            "timestamp": transaction.timestamp,
+            "symbol": transaction.symbol,
+            "quantity": transaction.quantity,
+            "price": round(transaction.price, 2),
+            "rationale": rationale,
+        }
+
+    def summary(self, last_n: int = SUMMARY_TRANSACTIONS) -> str:
+        """ Return a compact json string of the account, with only the most recent transactions, that stays the same size as history grows. """
+        portfolio_value = self.record_portfolio_value()
+        pnl = self.calculate_profit_loss(portfolio_value)
+        cost_basis = self.calculate_cost_basis()
+        count = len(self.transactions)
+        data = {
+            "name": self.name,
+            "balance": round(self.balance, 2),
+            "holdings": [
+                {"symbol": symbol, "quantity": quantity, "average_cost": round(cost_basis.get(symbol, 0.0), 2)}
+                for symbol, quantity in self.holdings.items()
+            ],
+            "total_portfolio_value": round(portfolio_value, 2),
+            "total_profit_loss": round(pnl, 2),
+            "transaction_count": count,
+            "recent_transactions": [self.summarize_transaction(i) for i in range(count - 1, max(count - last_n, 0) - 1, -1)],
+        }
+        if count > last_n:
+            data["older_transactions"] = f"Use the get_transactions tool with cursor {count - last_n} to page through older transactions"
+        write_log(self.name, "account", f"Retrieved account summary")
+        return json.dumps(data)
+
+    def transactions_page(self, cursor: int | None = None, limit: int = TRANSACTIONS_PAGE_SIZE) -> str:
+        """ Return a json page of transactions, newest first, starting just before the cursor index. """
+        count = len(self.transactions)
+        end = count if cursor is None or cursor < 0 else min(cursor, count)
+        start = max(end - max(limit, 1), 0)
+        data = {
+            "transactions": [self.summarize_transaction(i) for i in range(end - 1, start - 1, -1)],
+            "next_cursor": start if start > 0 else None,
+        }
+        write_log(self.name, "account", f"Retrieved transactions")
+        return json.dumps(data)
     
     def get_strategy(self) -> str:
         """ Return the strategy of the account """
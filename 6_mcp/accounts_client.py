@@ -3,16 +3,26 @@ from mcp.client.stdio import stdio_client
 from mcp import StdioServerParameters
 from agents import FunctionTool
 import json
+import os
 
-params = StdioServerParameters(command="uv", args=["run", "accounts_server.py"], env=None)
+# Pass the namespace on, as the stdio client doesn't, so a forked floor reads its own accounts
+params = StdioServerParameters(
+    command="uv", args=["run", "accounts_server.py"], env={"TRADING_NAMESPACE": os.getenv("TRADING_NAMESPACE", "")}
+)
 
 
+_accounts_tools = None
+
 async def list_accounts_tools():
-    async with stdio_client(params) as streams:
-        async with mcp.ClientSession(*streams) as session:
-            await session.initialize()
-            tools_result = await session.list_tools()
-            return tools_result.tools
+    """The tool schemas don't change while we're running, so only spawn the server to list them once"""
+    global _accounts_tools
+    if _accounts_tools is None:
+        async with stdio_client(params) as streams:
+            async with mcp.ClientSession(*streams) as session:
+                await session.initialize()
+                tools_result = await session.list_tools()
+                _accounts_tools = tools_result.tools
+    return _accounts_tools
         
 async def call_accounts_tool(tool_name, tool_args):
     async with stdio_client(params) as streams:
@@ -28,6 +38,20 @@ async def read_accounts_resource(name):
             result = await session.read_resource(f"accounts://accounts_server/{name}")
             return result.contents[0].text
         
+async def read_summary_resource(name):
+    async with stdio_client(params) as streams:
+        async with mcp.ClientSession(*streams) as session:
+            await session.initialize()
+            result = await session.read_resource(f"accounts://summary/{name}")
+            return result.contents[0].text
+
+async def read_transactions_resource(name, cursor=-1):
+    async with stdio_client(params) as streams:
+        async with mcp.ClientSession(*streams) as session:
+            await session.initialize()
+            result = await session.read_resource(f"accounts://transactions/{name}/{cursor}")
+            return result.contents[0].text
+
 async def read_strategy_resource(name):
     async with stdio_client(params) as streams:
         async with mcp.ClientSession(*streams) as session:
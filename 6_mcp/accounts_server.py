@@ -56,11 +56,32 @@ async def change_strategy(name: str, strategy: str) -> str:
     """
     return Account.get(name).change_strategy(strategy)
 
+@mcp.tool()
+async def get_transactions(name: str, cursor: int = -1, limit: int = 20) -> str:
+    """Get a page of past transactions, newest first, with their rationale.
+
+    Args:
+        name: The name of the account holder
+        cursor: Return transactions before this index; use -1 for the most recent, then the next_cursor of the previous page
+        limit: The maximum number of transactions to return
+    """
+    return Account.get(name).transactions_page(cursor, limit)
+
 @mcp.resource("accounts://accounts_server/{name}")
 async def read_account_resource(name: str) -> str:
     account = Account.get(name.lower())
     return account.report()
 
+@mcp.resource("accounts://summary/{name}")
+async def read_summary_resource(name: str) -> str:
+    account = Account.get(name.lower())
+    return account.summary()
+
+@mcp.resource("accounts://transactions/{name}/{cursor}")
+async def read_transactions_resource(name: str, cursor: str) -> str:
+    account = Account.get(name.lower())
+    return account.transactions_page(int(cursor))
+
 @mcp.resource("accounts://strategy/{name}")
 async def read_strategy_resource(name: str) -> str:
     account = Account.get(name.lower())
@@ -1,19 +1,39 @@
 import gradio as gr
-from util import css, js, Color
+from util import css, js
 import pandas as pd
 from trading_floor import names, lastnames, short_model_names
 import plotly.express as px
+import numpy as np
+from downsample import SeriesPyramid
+from leaderboard import Leaderboard
 from accounts import Account
-from database import read_log
+from database import read_account_json, migrate
+from log_feed import log_feed
+from metrics import get_run_metrics_df, get_latency_percentiles_df
+import hashlib
+import threading
+import time
 
-mapper = {
-    "trace": Color.WHITE,
-    "agent": Color.CYAN,
-    "function": Color.GREEN,
-    "generation": Color.YELLOW,
-    "response": Color.MAGENTA,
-    "account": Color.RED,
-}
+# Even if an account hasn't changed, recompute its view this often so that prices stay current
+VIEW_MAX_AGE_SECONDS = 15 * 60
+
+# The ranges the chart can show, in days; the pyramid picks its resolution from the range that's chosen
+CHART_RANGES = {"Day": 1, "Week": 7, "Month": 30, "All": None}
+
+
+class TraderViewModel:
+    """The rendered dashboard artifacts for one version of a trader's account, shared by every session"""
+
+    def __init__(self, version, portfolio_value, holdings, transactions):
+        self.version = version
+        self.portfolio_value = portfolio_value
+        self.charts = {}
+        self.holdings = holdings
+        self.transactions = transactions
+        self.computed_at = time.monotonic()
+
+    def is_current(self, version) -> bool:
+        return version == self.version and time.monotonic() - self.computed_at < VIEW_MAX_AGE_SECONDS
 
 
 class Trader:
@@ -22,23 +42,77 @@ class Trader:
         self.lastname = lastname
         self.model_name = model_name
         self.account = Account.get(name)
+        self.view = None
+        self.lock = threading.Lock()
+        self.pyramid = SeriesPyramid()
 
     def reload(self):
         self.account = Account.get(self.name)
 
+    def get_view(self) -> TraderViewModel:
+        """
+        Return the cached view of this trader, rebuilding it only if the account's data has changed.
+        The version is a hash of the stored account JSON, which is cheap next to pricing every holding.
+        """
+        with self.lock:
+            account_json = read_account_json(self.name)
+            version = hashlib.sha1(account_json.encode()).hexdigest() if account_json else None
+            if self.view is None or not self.view.is_current(version):
+                self.account = Account.model_validate_json(account_json) if account_json else Account.get(self.name)
+                self.update_pyramid()
+                self.view = TraderViewModel(
+                    version,
+                    self.get_portfolio_value(),
+                    self.get_holdings_df(),
+                    self.get_transactions_df(),
+                )
+            return self.view
+
+    def get_chart(self, days: float | None = None):
+        """The chart of the last number of days (or all time), drawn once per version of the account and range"""
+        view = self.get_view()
+        with self.lock:
+            if days not in view.charts:
+                view.charts[days] = self.get_portfolio_value_chart(days)
+            return view.charts[days]
+
+    def get_series(self) -> tuple[np.ndarray, np.ndarray]:
+        """The full valuation series as of the latest view, taken under the lock so the times and values match"""
+        self.get_view()
+        with self.lock:
+            return self.pyramid.t, self.pyramid.v
+
     def get_title(self) -> str:
         return f"<div style='text-align: center;font-size:34px;'>{self.name}<span style='color:#ccc;font-size:24px;'> ({self.model_name}) - {self.lastname}</span></div>"
 
     def get_strategy(self) -> str:
         return self.account.get_strategy()
 
-    def get_portfolio_value_df(self) -> pd.DataFrame:
-        df = pd.DataFrame(self.account.portfolio_value_time_series, columns=["datetime", "value"])
+    def update_pyramid(self):
+        """Fold any new points of the time series into the pre-aggregates; start again if the account was reset"""
+        series = self.account.portfolio_value_time_series
+        if len(series) < len(self.pyramid):
+            self.pyramid = SeriesPyramid()
+        new_points = series[len(self.pyramid):]
+        if new_points:
+            times, values = zip(*new_points)
+            self.pyramid.extend(
+                np.array(times, dtype="datetime64[s]").astype(np.int64), np.array(values, dtype=np.float64)
+            )
+
+    def get_portfolio_value_df(self, days: float | None = None) -> pd.DataFrame:
+        """The portfolio value over the last number of days (or all time), downsampled for charting"""
+        self.update_pyramid()
+        start = None
+        if days and len(self.pyramid):
+            start = int(self.pyramid.t[-1] - days * 86400)
+        _, times, values = self.pyramid.view(start=start)
+        df = pd.DataFrame({"datetime": times.astype("datetime64[s]"), "value": values})
         df["datetime"] = pd.to_datetime(df["datetime"])
         return df
 
-    def get_portfolio_value_chart(self):
-        df = self.get_portfolio_value_df()
+    def get_portfolio_value_chart(self, days: float | None = None):
+        df = self.get_portfolio_value_df(days)
         fig = px.line(df, x="datetime", y="value")
         margin = dict(l=40, r=20, t=20, b=40)
         fig.update_layout(
@@ -80,17 +154,12 @@ class Trader:
         emoji = "⬆" if pnl >= 0 else "⬇"
         return f"<div style='text-align: center;background-color:{color};'><span style='font-size:32px'>${portfolio_value:,.0f}</span><span style='font-size:24px'>&nbsp;&nbsp;&nbsp;{emoji}&nbsp;${pnl:,.0f}</span></div>"
 
-    def get_logs(self, previous=None) -> str:
-        logs = read_log(self.name, last_n=13)
-        response = ""
-        for log in logs:
-            timestamp, type, message = log
-            color = mapper.get(type, Color.WHITE).value
-            response += f"<span style='color:{color}'>{timestamp} : [{type}] {message}</span><br/>"
-        response = f"<div style='height:250px; overflow-y:auto;'>{response}</div>"
-        if response != previous:
-            return response
-        return gr.update()
+    def get_logs(self) -> str:
+        return log_feed.get_html(self.name)
+
+    async def stream_logs(self):
+        async for html in log_feed.stream(self.name):
+            yield html
 
 
 class TraderView:
@@ -98,6 +167,7 @@ class TraderView:
         self.trader = trader
         self.portfolio_value = None
         self.chart = None
+        self.chart_range = None
         self.holdings_table = None
         self.transactions_table = None
 
@@ -105,16 +175,16 @@ class TraderView:
         with gr.Column():
             gr.HTML(self.trader.get_title())
             with gr.Row():
-                self.portfolio_value = gr.HTML(self.trader.get_portfolio_value)
+                self.portfolio_value = gr.HTML(lambda: self.trader.get_view().portfolio_value)
             with gr.Row():
-                self.chart = gr.Plot(
-                    self.trader.get_portfolio_value_chart, container=True, show_label=False
-                )
+                self.chart = gr.Plot(self.trader.get_chart, container=True, show_label=False)
+            with gr.Row():
+                self.chart_range = gr.Radio(list(CHART_RANGES), value="All", show_label=False, container=False)
             with gr.Row(variant="panel"):
                 self.log = gr.HTML(self.trader.get_logs)
             with gr.Row():
                 self.holdings_table = gr.Dataframe(
-                    value=self.trader.get_holdings_df,
+                    value=lambda: self.trader.get_view().holdings,
                     label="Holdings",
                     headers=["Symbol", "Quantity"],
                     row_count=(5, "dynamic"),
@@ -124,7 +194,7 @@ class TraderView:
                 )
             with gr.Row():
                 self.transactions_table = gr.Dataframe(
-                    value=self.trader.get_transactions_df,
+                    value=lambda: self.trader.get_view().transactions,
                     label="Recent Transactions",
                     headers=["Timestamp", "Symbol", "Quantity", "Price", "Rationale"],
                     row_count=(5, "dynamic"),
@@ -133,10 +203,13 @@ class TraderView:
                     elem_classes=["dataframe-fix"],
                 )
 
+        self.chart_range.change(
+            fn=self.get_chart, inputs=[self.chart_range], outputs=[self.chart], show_progress="hidden"
+        )
         timer = gr.Timer(value=120)
         timer.tick(
             fn=self.refresh,
-            inputs=[],
+            inputs=[self.chart_range],
             outputs=[
                 self.portfolio_value,
                 self.chart,
@@ -146,24 +219,107 @@ class TraderView:
             show_progress="hidden",
             queue=False,
         )
-        log_timer = gr.Timer(value=0.5)
-        log_timer.tick(
-            fn=self.trader.get_logs,
-            inputs=[self.log],
+        gr.on(
+            triggers=None,
+            fn=self.trader.stream_logs,
+            inputs=[],
             outputs=[self.log],
             show_progress="hidden",
+            concurrency_limit=None,
+        )
+
+    def get_chart(self, chart_range: str):
+        return self.trader.get_chart(CHART_RANGES[chart_range])
+
+    def refresh(self, chart_range: str):
+        view = self.trader.get_view()
+        return (
+            view.portfolio_value,
+            self.get_chart(chart_range),
+            view.holdings,
+            view.transactions,
+        )
+
+
+class MetricsView:
+    def make_ui(self):
+        with gr.Row(variant="panel"):
+            with gr.Column(scale=2):
+                self.runs_table = gr.Dataframe(
+                    value=get_run_metrics_df,
+                    label="Recent Runs",
+                    max_height=300,
+                    elem_classes=["dataframe-fix"],
+                )
+            with gr.Column(scale=1):
+                self.model_table = gr.Dataframe(
+                    value=lambda: get_latency_percentiles_df("model"),
+                    label="Model Latency (s)",
+                    max_height=300,
+                    elem_classes=["dataframe-fix"],
+                )
+            with gr.Column(scale=1):
+                self.tool_table = gr.Dataframe(
+                    value=lambda: get_latency_percentiles_df("tool"),
+                    label="Tool Latency (s)",
+                    max_height=300,
+                    elem_classes=["dataframe-fix"],
+                )
+
+        timer = gr.Timer(value=120)
+        timer.tick(
+            fn=self.refresh,
+            inputs=[],
+            outputs=[self.runs_table, self.model_table, self.tool_table],
+            show_progress="hidden",
             queue=False,
         )
 
     def refresh(self):
-        self.trader.reload()
         return (
-            self.trader.get_portfolio_value(),
-            self.trader.get_portfolio_value_chart(),
-            self.trader.get_holdings_df(),
-            self.trader.get_transactions_df(),
+            get_run_metrics_df(),
+            get_latency_percentiles_df("model"),
+            get_latency_percentiles_df("tool"),
+        )
+
+
+class LeaderboardView:
+    def __init__(self, traders: list[Trader]):
+        self.traders = traders
+        self.leaderboard = Leaderboard()
+
+    def make_ui(self):
+        with gr.Row():
+            self.table = gr.Dataframe(
+                value=lambda: self.leaderboard.get(self.traders)["leaderboard"],
+                label="Leaderboard",
+                max_height=400,
+            )
+        with gr.Row():
+            with gr.Column(scale=2):
+                self.chart = gr.Plot(
+                    lambda: self.leaderboard.get(self.traders)["chart"], container=True, show_label=False
+                )
+            with gr.Column(scale=1):
+                self.correlation = gr.Dataframe(
+                    value=lambda: self.leaderboard.get(self.traders)["correlation"].reset_index(names=""),
+                    label="Correlation of Returns",
+                    max_height=400,
+                )
+
+        timer = gr.Timer(value=120)
+        timer.tick(
+            fn=self.refresh,
+            inputs=[],
+            outputs=[self.table, self.chart, self.correlation],
+            show_progress="hidden",
+            queue=False,
         )
 
+    def refresh(self):
+        result = self.leaderboard.get(self.traders)
+        return result["leaderboard"], result["chart"], result["correlation"].reset_index(names="")
+
 
 # Main UI construction
 def create_ui():
@@ -178,13 +334,18 @@ def create_ui():
     with gr.Blocks(
         title="Traders", css=css, js=js, theme=gr.themes.Default(primary_hue="sky"), fill_width=True
     ) as ui:
-        with gr.Row():
-            for trader_view in trader_views:
-                trader_view.make_ui()
+        with gr.Tab("Trading Floor"):
+            with gr.Row():
+                for trader_view in trader_views:
+                    trader_view.make_ui()
+            MetricsView().make_ui()
+        with gr.Tab("Leaderboard"):
+            LeaderboardView(traders).make_ui()
 
     return ui
 
 
 if __name__ == "__main__":
+    migrate()
     ui = create_ui()
     ui.launch(inbrowser=True)
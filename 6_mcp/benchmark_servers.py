@@ -0,0 +1,77 @@
+"""
+Measure how long each of our MCP servers takes to become useful: spawn, initialize, list tools and answer a first tool call.
+Run with: uv run benchmark_servers.py [--runs 5] [--audit]
+--audit also prints the slowest imports for each server, from python -X importtime.
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+import mcp
+from mcp import StdioServerParameters
+from mcp.client.stdio import stdio_client
+
+# The server script, and a cheap tool call that doesn't change any state we care about (or None to just list tools)
+
+SERVERS = [
+    ("accounts_server.py", ("get_balance", {"name": "warren"})),
+    ("market_server.py", ("lookup_share_price", {"symbol": "AAPL"})),
+    ("push_server.py", None),
+    ("memory_server.py", ("search_nodes", {"query": "AAPL"})),
+]
+
+
+async def time_server(script: str, call: tuple[str, dict] | None) -> dict[str, float]:
+    params = StdioServerParameters(command=sys.executable, args=[script], env=None)
+    start = time.perf_counter()
+    timings = {}
+    with open(os.devnull, "w") as errlog:
+        async with stdio_client(params, errlog=errlog) as streams:
+            async with mcp.ClientSession(*streams) as session:
+                await session.initialize()
+                timings["initialize"] = time.perf_counter() - start
+                await session.list_tools()
+                timings["list_tools"] = time.perf_counter() - start
+                if call:
+                    await session.call_tool(*call)
+                timings["first_response"] = time.perf_counter() - start
+    return timings
+
+
+def audit_imports(script: str, top: int = 10) -> list[tuple[int, str]]:
+    module = script.removesuffix(".py")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"], capture_output=True, text=True
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line.removeprefix("import time:").split("|")
+            if cumulative.strip().isdigit():
+                rows.append((int(cumulative), name.rstrip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+async def main(runs: int, audit: bool):
+    print(f"{'server':<22}{'initialize':>12}{'list_tools':>12}{'first call':>12}   (median seconds over {runs} runs)")
+    for script, call in SERVERS:
+        results = [await time_server(script, call) for _ in range(runs)]
+        medians = [statistics.median(r[key] for r in results) for key in ("initialize", "list_tools", "first_response")]
+        print(f"{script:<22}" + "".join(f"{m:>12.3f}" for m in medians))
+    if audit:
+        for script, _ in SERVERS:
+            print(f"\nSlowest imports for {script} (cumulative microseconds):")
+            for cumulative, name in audit_imports(script):
+                print(f"{cumulative:>10}  {name}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time-to-first-tool-response for the MCP servers")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--audit", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(main(args.runs, args.audit))
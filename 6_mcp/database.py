@@ -1,5 +1,7 @@
+import os
 import sqlite3
 import json
+import hashlib
 from datetime import datetime
 from dotenv import load_dotenv
 
@@ -7,39 +9,305 @@ load_dotenv(override=True)
 
 DB = "accounts.db"
 
+# Experiments run in a namespace forked from the main floor (the empty namespace); see snapshots.py
+NAMESPACE = os.getenv("TRADING_NAMESPACE", "")
 
-with sqlite3.connect(DB) as conn:
-    cursor = conn.cursor()
-    cursor.execute('CREATE TABLE IF NOT EXISTS accounts (name TEXT PRIMARY KEY, account TEXT)')
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS logs (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT,
-            datetime DATETIME,
-            type TEXT,
-            message TEXT
-        )
-    ''')
-    cursor.execute('CREATE TABLE IF NOT EXISTS market (date TEXT PRIMARY KEY, data TEXT)')
-    conn.commit()
-
-def write_account(name, account_dict):
-    json_data = json.dumps(account_dict)
+
+# Each entry upgrades the schema by one version; the version reached is kept in PRAGMA user_version
+
+MIGRATIONS = [
+    [
+        'CREATE TABLE IF NOT EXISTS accounts (name TEXT PRIMARY KEY, account TEXT)',
+        '''
+            CREATE TABLE IF NOT EXISTS logs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT,
+                datetime DATETIME,
+                type TEXT,
+                message TEXT
+            )
+        ''',
+        'CREATE TABLE IF NOT EXISTS market (date TEXT PRIMARY KEY, data TEXT)',
+        '''
+            CREATE TABLE IF NOT EXISTS run_metrics (
+                trace_id TEXT PRIMARY KEY,
+                name TEXT,
+                trace_name TEXT,
+                started DATETIME,
+                ended DATETIME,
+                seconds REAL,
+                llm_turns INTEGER,
+                tool_calls INTEGER,
+                input_tokens INTEGER,
+                output_tokens INTEGER,
+                cost REAL
+            )
+        ''',
+        '''
+            CREATE TABLE IF NOT EXISTS call_metrics (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                trace_id TEXT,
+                name TEXT,
+                kind TEXT,
+                label TEXT,
+                seconds REAL
+            )
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_call_metrics_kind ON call_metrics (kind, label)',
+        '''
+            CREATE TABLE IF NOT EXISTS spans (
+                span_id TEXT PRIMARY KEY,
+                trace_id TEXT,
+                parent_id TEXT,
+                name TEXT,
+                type TEXT,
+                span_name TEXT,
+                server TEXT,
+                started TEXT,
+                ended TEXT,
+                error TEXT,
+                attributes TEXT
+            )
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_spans_trace ON spans (trace_id)',
+        'CREATE INDEX IF NOT EXISTS idx_spans_name_started ON spans (name, started)',
+    ],
+    [
+        '''
+            CREATE TABLE IF NOT EXISTS integrity (
+                name TEXT PRIMARY KEY,
+                epoch INTEGER,
+                tx_count INTEGER,
+                chain_hash TEXT,
+                cash_in REAL,
+                verified_count INTEGER,
+                verified_hash TEXT,
+                verified_holdings TEXT,
+                verified_cash REAL,
+                verified_at DATETIME
+            )
+        ''',
+    ],
+    [
+        '''
+            CREATE TABLE IF NOT EXISTS namespaces (
+                namespace TEXT PRIMARY KEY,
+                parent TEXT,
+                log_watermark INTEGER,
+                created DATETIME
+            )
+        ''',
+    ],
+]
+
+GENESIS_HASH = "0" * 64
+
+_schema_checked = False
+
+
+def migrate():
+    """Apply any migrations this database hasn't had yet. Run once up front, e.g. by reset.py"""
     with sqlite3.connect(DB) as conn:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        for target in range(version, len(MIGRATIONS)):
+            for statement in MIGRATIONS[target]:
+                conn.execute(statement)
+            conn.execute(f"PRAGMA user_version = {target + 1}")
+        conn.commit()
+
+
+def connect() -> sqlite3.Connection:
+    """
+    Open a connection to the database. The first time in each process, check the schema version
+    (a cheap pragma read) and only migrate if it's out of date, so short-lived MCP servers don't run DDL on every spawn.
+    """
+    global _schema_checked
+    conn = sqlite3.connect(DB)
+    if not _schema_checked:
+        if conn.execute("PRAGMA user_version").fetchone()[0] < len(MIGRATIONS):
+            migrate()
+        _schema_checked = True
+    return conn
+
+
+def account_key(name: str, namespace: str = NAMESPACE) -> str:
+    """How a trader's rows are keyed in the accounts, integrity and logs tables for a namespace"""
+    return f"{namespace}:{name.lower()}" if namespace else name.lower()
+
+
+_lineages = {}
+
+
+def lineage(namespace: str = NAMESPACE) -> list[tuple[str, int | None]]:
+    """
+    The namespace followed by its ancestors, each with the last log id it shares with the namespace (None for its own logs).
+    Namespaces never change once forked, so this is read once per process.
+    """
+    if namespace not in _lineages:
+        chain, current, watermark = [(namespace, None)], namespace, None
+        with connect() as conn:
+            while current:
+                row = conn.execute('SELECT parent, log_watermark FROM namespaces WHERE namespace = ?', (current,)).fetchone()
+                if row is None:
+                    break
+                current = row[0]
+                watermark = row[1] if watermark is None else min(watermark, row[1])
+                chain.append((current, watermark))
+        _lineages[namespace] = chain
+    return _lineages[namespace]
+
+
+def create_namespace(namespace: str, parent: str = NAMESPACE) -> None:
+    """
+    Fork a namespace from its parent in one transaction. Only the accounts and their integrity records are copied;
+    the parent's logs up to this moment are shared rather than copied.
+    """
+    if not namespace or ":" in namespace:
+        raise ValueError(f"Invalid namespace name: {namespace!r}")
+    with connect() as conn:
+        cursor = conn.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        if parent and not cursor.execute('SELECT 1 FROM namespaces WHERE namespace = ?', (parent,)).fetchone():
+            raise ValueError(f"No such namespace: {parent}")
+        cursor.execute('SELECT COALESCE(MAX(id), 0) FROM logs')
+        watermark = cursor.fetchone()[0]
+        cursor.execute('''
+            INSERT INTO namespaces (namespace, parent, log_watermark, created)
+            VALUES (?, ?, ?, ?)
+        ''', (namespace, parent, watermark, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+        for table, columns in (("accounts", "account"), ("integrity", "epoch, tx_count, chain_hash, cash_in, verified_count, verified_hash, verified_holdings, verified_cash, verified_at")):
+            cursor.execute(f'''
+                INSERT INTO {table} (name, {columns})
+                SELECT ? || substr(name, ?), {columns} FROM {table}
+                WHERE {namespace_filter(parent)}
+            ''', (f"{namespace}:", len(f"{parent}:") + 1 if parent else 1, *namespace_params(parent)))
+        conn.commit()
+
+
+def drop_namespace(namespace: str) -> None:
+    """Delete a namespace and everything written in it; its forks must be dropped first"""
+    with connect() as conn:
+        cursor = conn.cursor()
+        if cursor.execute('SELECT 1 FROM namespaces WHERE parent = ?', (namespace,)).fetchone():
+            raise ValueError(f"Namespace {namespace} has forks; drop them first")
+        for table in ("accounts", "integrity", "logs"):
+            cursor.execute(f'DELETE FROM {table} WHERE {namespace_filter(namespace)}', namespace_params(namespace))
+        cursor.execute('DELETE FROM namespaces WHERE namespace = ?', (namespace,))
+        conn.commit()
+
+
+def read_namespaces() -> list[tuple[str, str, int, str]]:
+    with connect() as conn:
+        cursor = conn.cursor()
+        cursor.execute('SELECT namespace, parent, log_watermark, created FROM namespaces ORDER BY created')
+        return cursor.fetchall()
+
+
+def namespace_filter(namespace: str) -> str:
+    """A WHERE clause matching the rows keyed in a namespace, to go with namespace_params"""
+    return "substr(name, 1, ?) = ?" if namespace else "instr(name, ':') = ?"
+
+
+def namespace_params(namespace: str) -> tuple:
+    return (len(namespace) + 1, f"{namespace}:") if namespace else (0,)
+
+
+def chain_link(previous_hash: str, transaction: dict) -> str:
+    """The next hash in an account's transaction chain"""
+    canonical = json.dumps(transaction, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256((previous_hash + canonical).encode()).hexdigest()
+
+
+def advance_chain(cursor, name: str, account_dict: dict, cash_in: float = 0.0, restart: bool = False):
+    """
+    Extend the account's hash chain with the transactions appended since the last write, in the same transaction as the write.
+    cash_in is money moved in (or out, if negative) other than by trading, such as a deposit.
+    On a restart, or the first time we see an account, the chain is rebuilt from the current transactions and
+    everything not explained by trades is taken as cash in; verification then starts from the beginning.
+    """
+    transactions = account_dict["transactions"]
+    cursor.execute('SELECT epoch, tx_count, chain_hash FROM integrity WHERE name = ?', (name,))
+    row = cursor.fetchone()
+    if row is None or restart:
+        chain_hash = GENESIS_HASH
+        for transaction in transactions:
+            chain_hash = chain_link(chain_hash, transaction)
+        traded = sum(t["quantity"] * t["price"] for t in transactions)
+        cursor.execute('''
+            INSERT OR REPLACE INTO integrity
+            (name, epoch, tx_count, chain_hash, cash_in, verified_count, verified_hash, verified_holdings, verified_cash, verified_at)
+            VALUES (?, ?, ?, ?, ?, 0, ?, '{}', 0.0, NULL)
+        ''', (name, row[0] + 1 if row else 0, len(transactions), chain_hash, account_dict["balance"] + traded, GENESIS_HASH))
+        return
+    _, tx_count, chain_hash = row
+    if len(transactions) < tx_count:
+        # History went backwards outside of a reset; leave the chain alone so verification reports it
+        return
+    for transaction in transactions[tx_count:]:
+        chain_hash = chain_link(chain_hash, transaction)
+    cursor.execute(
+        'UPDATE integrity SET tx_count = ?, chain_hash = ?, cash_in = cash_in + ? WHERE name = ?',
+        (len(transactions), chain_hash, cash_in, name),
+    )
+
+
+def write_account(name, account_dict, cash_in: float = 0.0, restart: bool = False):
+    json_data = json.dumps(account_dict)
+    with connect() as conn:
         cursor = conn.cursor()
         cursor.execute('''
             INSERT INTO accounts (name, account)
             VALUES (?, ?)
             ON CONFLICT(name) DO UPDATE SET account=excluded.account
-        ''', (name.lower(), json_data))
+        ''', (account_key(name), json_data))
+        advance_chain(cursor, account_key(name), account_dict, cash_in, restart)
         conn.commit()
 
+def read_account_json(name) -> str | None:
+    with connect() as conn:
+        cursor = conn.cursor()
+        cursor.execute('SELECT account FROM accounts WHERE name = ?', (account_key(name),))
+        row = cursor.fetchone()
+        return row[0] if row else None
+
 def read_account(name):
-    with sqlite3.connect(DB) as conn:
+    with connect() as conn:
         cursor = conn.cursor()
-        cursor.execute('SELECT account FROM accounts WHERE name = ?', (name.lower(),))
+        cursor.execute('SELECT account FROM accounts WHERE name = ?', (account_key(name),))
         row = cursor.fetchone()
         return json.loads(row[0]) if row else None
+
+
+def read_integrity(name: str) -> tuple[dict, dict] | None:
+    """The account and its integrity record, read together so they're consistent with each other"""
+    with connect() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT a.account, i.epoch, i.tx_count, i.chain_hash, i.cash_in, i.verified_count, i.verified_hash,
+                   i.verified_holdings, i.verified_cash, i.verified_at
+            FROM accounts a JOIN integrity i ON i.name = a.name
+            WHERE a.name = ?
+        ''', (account_key(name),))
+        row = cursor.fetchone()
+        if not row:
+            return None
+        keys = ["epoch", "tx_count", "chain_hash", "cash_in", "verified_count", "verified_hash", "verified_holdings", "verified_cash", "verified_at"]
+        record = dict(zip(keys, row[1:]))
+        record["verified_holdings"] = json.loads(record["verified_holdings"])
+        return json.loads(row[0]), record
+
+
+def write_integrity_checkpoint(name: str, epoch: int, previous_count: int, count: int, chain_hash: str, holdings: dict, cash: float) -> bool:
+    """Move the verified checkpoint forward, unless another verifier or a reset has moved it first"""
+    with connect() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            UPDATE integrity
+            SET verified_count = ?, verified_hash = ?, verified_holdings = ?, verified_cash = ?, verified_at = ?
+            WHERE name = ? AND epoch = ? AND verified_count = ?
+        ''', (count, chain_hash, json.dumps(holdings), cash, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), account_key(name), epoch, previous_count))
+        conn.commit()
+        return cursor.rowcount == 1
     
 def write_log(name: str, type: str, message: str):
     """
@@ -52,39 +320,72 @@ def write_log(name: str, type: str, message: str):
     """
     now = datetime.now().isoformat()
     
-    with sqlite3.connect(DB) as conn:
+    with connect() as conn:
         cursor = conn.cursor()
         cursor.execute('''
             INSERT INTO logs (name, datetime, type, message)
             VALUES (?, datetime('now'), ?, ?)
-        ''', (name.lower(), type, message))
+        ''', (account_key(name), type, message))
         conn.commit()
 
-def read_log(name: str, last_n=10):
+def read_log(name: str, last_n=10, up_to_id: int | None = None):
     """
-    Read the most recent log entries for a given name.
+    Read the most recent log entries for a given name, including those shared from the namespace's ancestors.
     
     Args:
         name (str): The name to retrieve logs for
         last_n (int): Number of most recent entries to retrieve
+        up_to_id (int): If given, ignore entries with a later id
         
     Returns:
         list: A list of tuples containing (datetime, type, message)
     """
-    with sqlite3.connect(DB) as conn:
+    clauses, params = [], []
+    for namespace, watermark in lineage():
+        clauses.append("(name = ? AND (? IS NULL OR id <= ?))")
+        params += [account_key(name, namespace), watermark, watermark]
+    with connect() as conn:
         cursor = conn.cursor()
-        cursor.execute('''
+        cursor.execute(f'''
             SELECT datetime, type, message FROM logs 
-            WHERE name = ? 
-            ORDER BY datetime DESC
+            WHERE ({" OR ".join(clauses)}) AND (? IS NULL OR id <= ?)
+            ORDER BY datetime DESC, id DESC
             LIMIT ?
-        ''', (name.lower(), last_n))
+        ''', (*params, up_to_id, up_to_id, last_n))
         
         return reversed(cursor.fetchall())
 
+def read_logs_after(after_id: int, limit=1000) -> list[tuple]:
+    """
+    Read log entries for all names in this namespace written after a given log id, oldest first.
+
+    Args:
+        after_id (int): Only return entries with an id greater than this
+        limit (int): Maximum number of entries to return
+
+    Returns:
+        list: A list of tuples containing (id, name, datetime, type, message)
+    """
+    prefix = len(NAMESPACE) + 1 if NAMESPACE else 0
+    with connect() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT id, substr(name, ?), datetime, type, message FROM logs
+            WHERE id > ? AND {namespace_filter(NAMESPACE)}
+            ORDER BY id
+            LIMIT ?
+        ''', (prefix + 1, after_id, *namespace_params(NAMESPACE), limit))
+        return cursor.fetchall()
+
+def read_last_log_id() -> int:
+    with connect() as conn:
+        cursor = conn.cursor()
+        cursor.execute('SELECT COALESCE(MAX(id), 0) FROM logs')
+        return cursor.fetchone()[0]
+
 def write_market(date: str, data: dict) -> None:
     data_json = json.dumps(data)
-    with sqlite3.connect(DB) as conn:
+    with connect() as conn:
         cursor = conn.cursor()
         cursor.execute('''
             INSERT INTO market (date, data)
@@ -94,8 +395,128 @@ def write_market(date: str, data: dict) -> None:
         conn.commit()
 
 def read_market(date: str) -> dict | None:
-    with sqlite3.connect(DB) as conn:
+    with connect() as conn:
         cursor = conn.cursor()
         cursor.execute('SELECT data FROM market WHERE date = ?', (date,))
         row = cursor.fetchone()
-        return json.loads(row[0]) if row else None
\ No newline at end of file
+        return json.loads(row[0]) if row else None
+
+
+def write_run_metrics(run: dict, calls: list[tuple[str, str, float]]) -> None:
+    """
+    Write the metrics for one trader run, along with the latency of each model and tool call.
+
+    Args:
+        run (dict): The aggregated metrics for the run, keyed by run_metrics column
+        calls (list): A list of tuples containing (kind, label, seconds)
+    """
+    with connect() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT OR REPLACE INTO run_metrics (trace_id, name, trace_name, started, ended, seconds,
+                llm_turns, tool_calls, input_tokens, output_tokens, cost)
+            VALUES (:trace_id, :name, :trace_name, :started, :ended, :seconds,
+                :llm_turns, :tool_calls, :input_tokens, :output_tokens, :cost)
+        ''', run)
+        cursor.executemany('''
+            INSERT INTO call_metrics (trace_id, name, kind, label, seconds)
+            VALUES (?, ?, ?, ?, ?)
+        ''', [(run["trace_id"], run["name"], kind, label, seconds) for kind, label, seconds in calls])
+        conn.commit()
+
+def read_run_metrics(last_n=20) -> list[tuple]:
+    """
+    Read the metrics for the most recent trader runs.
+
+    Args:
+        last_n (int): Number of most recent runs to retrieve
+
+    Returns:
+        list: A list of tuples containing (name, trace_name, started, seconds, llm_turns, tool_calls, input_tokens, output_tokens, cost)
+    """
+    with connect() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT name, trace_name, started, seconds, llm_turns, tool_calls, input_tokens, output_tokens, cost
+            FROM run_metrics
+            ORDER BY started DESC
+            LIMIT ?
+        ''', (last_n,))
+        return cursor.fetchall()
+
+def read_call_metrics(kind: str, last_n=5000) -> list[tuple[str, float]]:
+    """
+    Read the latencies of the most recent model or tool calls.
+
+    Args:
+        kind (str): Either "model" or "tool"
+        last_n (int): Number of most recent calls to retrieve
+
+    Returns:
+        list: A list of tuples containing (label, seconds)
+    """
+    with connect() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT label, seconds FROM call_metrics
+            WHERE kind = ?
+            ORDER BY id DESC
+            LIMIT ?
+        ''', (kind, last_n))
+        return cursor.fetchall()
+
+def write_spans(spans: list[dict]) -> None:
+    """
+    Write a batch of spans to the spans table in a single transaction.
+
+    Args:
+        spans (list): A list of dicts keyed by spans column
+    """
+    with connect() as conn:
+        cursor = conn.cursor()
+        cursor.executemany('''
+            INSERT OR REPLACE INTO spans (span_id, trace_id, parent_id, name, type, span_name, server, started, ended, error, attributes)
+            VALUES (:span_id, :trace_id, :parent_id, :name, :type, :span_name, :server, :started, :ended, :error, :attributes)
+        ''', spans)
+        conn.commit()
+
+def read_spans(trace_id: str) -> list[dict]:
+    """
+    Read all the spans of a trace, in start order; the trace itself is included as a span with type "trace".
+
+    Args:
+        trace_id (str): The trace to retrieve
+
+    Returns:
+        list: A list of dicts keyed by spans column, with attributes decoded
+    """
+    with connect() as conn:
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        cursor.execute('SELECT * FROM spans WHERE trace_id = ? ORDER BY started', (trace_id,))
+        rows = [dict(row) for row in cursor.fetchall()]
+    for row in rows:
+        row["attributes"] = json.loads(row["attributes"]) if row["attributes"] else {}
+    return rows
+
+def read_trace_ids(name: str, last_n=10) -> list[str]:
+    """
+    Read the ids of the most recent traces for a given name, most recent first.
+
+    Args:
+        name (str): The name to retrieve traces for
+        last_n (int): Number of most recent traces to retrieve
+    """
+    with connect() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT trace_id FROM spans
+            WHERE name = ? AND type = 'trace'
+            ORDER BY started DESC
+            LIMIT ?
+        ''', (name.lower(), last_n))
+        return [row[0] for row in cursor.fetchall()]
+
+
+if __name__ == "__main__":
+    migrate()
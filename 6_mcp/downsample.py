@@ -0,0 +1,144 @@
+import numpy as np
+
+MAX_POINTS = 500
+
+# Pre-aggregate resolutions in seconds, finest first
+RESOLUTIONS = {"minute": 60, "hour": 3600, "day": 86400}
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Largest-Triangle-Three-Buckets: pick `threshold` points that keep the visual shape of the line.
+    The first and last points are always kept; from each bucket in between, keep the point that makes
+    the largest triangle with the previously kept point and the average of the next bucket.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return x, y
+    xf = x.astype(np.float64)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], max(edges[i + 1], edges[i] + 1)
+        next_start, next_end = edges[i + 1], edges[i + 2] if i + 2 < len(edges) else n
+        if next_end <= next_start:
+            next_end = next_start + 1
+        avg_x = xf[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        area = np.abs((xf[a] - avg_x) * (y[start:end] - y[a]) - (xf[a] - xf[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        keep[i + 1] = a
+    return x[keep], y[keep]
+
+
+def minmax(x: np.ndarray, y: np.ndarray, buckets: int) -> tuple[np.ndarray, np.ndarray]:
+    """Keep the minimum and maximum of each of `buckets` equal-count buckets, in time order"""
+    n = len(x)
+    if buckets * 2 >= n:
+        return x, y
+    edges = np.linspace(0, n, buckets + 1).astype(np.int64)
+    keep = []
+    for start, end in zip(edges[:-1], edges[1:]):
+        segment = y[start:end]
+        keep += sorted({start + int(np.argmin(segment)), start + int(np.argmax(segment))})
+    keep = np.array(keep)
+    return x[keep], y[keep]
+
+
+class Aggregate:
+    """Per-bucket open time, min, max and last value at one resolution, with the time of the min and max"""
+
+    def __init__(self, seconds: int):
+        self.seconds = seconds
+        self.start = np.empty(0, dtype=np.int64)
+        self.low = np.empty(0)
+        self.low_time = np.empty(0, dtype=np.int64)
+        self.high = np.empty(0)
+        self.high_time = np.empty(0, dtype=np.int64)
+        self.last = np.empty(0)
+
+    def extend(self, t: np.ndarray, v: np.ndarray) -> None:
+        """Fold new points (in time order) into the buckets; only the last existing bucket can change"""
+        buckets = t - t % self.seconds
+        starts, first = np.unique(buckets, return_index=True)
+        low = np.minimum.reduceat(v, first)
+        high = np.maximum.reduceat(v, first)
+        ends = np.append(first[1:], len(v))
+        low_time = np.array([t[s + np.argmin(v[s:e])] for s, e in zip(first, ends)], dtype=np.int64)
+        high_time = np.array([t[s + np.argmax(v[s:e])] for s, e in zip(first, ends)], dtype=np.int64)
+        last = v[ends - 1]
+        if len(self.start) and starts[0] == self.start[-1]:
+            if low[0] < self.low[-1]:
+                self.low[-1], self.low_time[-1] = low[0], low_time[0]
+            if high[0] > self.high[-1]:
+                self.high[-1], self.high_time[-1] = high[0], high_time[0]
+            self.last[-1] = last[0]
+            starts, low, low_time, high, high_time, last = (a[1:] for a in (starts, low, low_time, high, high_time, last))
+        self.start = np.concatenate([self.start, starts])
+        self.low = np.concatenate([self.low, low])
+        self.low_time = np.concatenate([self.low_time, low_time])
+        self.high = np.concatenate([self.high, high])
+        self.high_time = np.concatenate([self.high_time, high_time])
+        self.last = np.concatenate([self.last, last])
+
+    def points(self, start: int, end: int) -> tuple[np.ndarray, np.ndarray]:
+        """The min and max of each bucket in the range, as points in time order"""
+        lo = np.searchsorted(self.start, start - start % self.seconds, side="left")
+        hi = np.searchsorted(self.start, end, side="right")
+        t = np.concatenate([self.low_time[lo:hi], self.high_time[lo:hi]])
+        v = np.concatenate([self.low[lo:hi], self.high[lo:hi]])
+        order = np.argsort(t, kind="stable")
+        t, v = t[order], v[order]
+        unique = np.concatenate([[True], t[1:] != t[:-1]]) if len(t) else np.empty(0, dtype=bool)
+        return t[unique], v[unique]
+
+
+class SeriesPyramid:
+    """
+    A time series of (epoch seconds, value) kept at full resolution and as minute, hour and day aggregates.
+    Points are appended incrementally, and a view picks the finest resolution that fits the visible range.
+    """
+
+    def __init__(self):
+        self.t = np.empty(0, dtype=np.int64)
+        self.v = np.empty(0)
+        self.aggregates = {name: Aggregate(seconds) for name, seconds in RESOLUTIONS.items()}
+
+    def __len__(self) -> int:
+        return len(self.t)
+
+    def extend(self, t: np.ndarray, v: np.ndarray) -> None:
+        if not len(t):
+            return
+        order = np.argsort(t, kind="stable")
+        t, v = t[order].astype(np.int64), v[order].astype(np.float64)
+        if len(self.t) and t[0] < self.t[-1]:
+            self.rebuild(np.concatenate([self.t, t]), np.concatenate([self.v, v]))
+            return
+        self.t = np.concatenate([self.t, t])
+        self.v = np.concatenate([self.v, v])
+        for aggregate in self.aggregates.values():
+            aggregate.extend(t, v)
+
+    def rebuild(self, t: np.ndarray, v: np.ndarray) -> None:
+        self.__init__()
+        self.extend(t, v)
+
+    def view(self, start: int | None = None, end: int | None = None, max_points: int = MAX_POINTS):
+        """Return (resolution, t, v) for the range, with at most max_points points"""
+        if not len(self.t):
+            return "raw", self.t, self.v
+        start = self.t[0] if start is None else start
+        end = self.t[-1] if end is None else end
+        lo = np.searchsorted(self.t, start, side="left")
+        hi = np.searchsorted(self.t, end, side="right")
+        if hi - lo <= max_points:
+            return "raw", self.t[lo:hi], self.v[lo:hi]
+        for name, seconds in RESOLUTIONS.items():
+            if 2 * (end - start) / seconds <= max_points * 4:
+                t, v = self.aggregates[name].points(start, end)
+                return name, *lttb(t, v, max_points)
+        t, v = self.aggregates["day"].points(start, end)
+        return "day", *minmax(t, v, max_points // 2)
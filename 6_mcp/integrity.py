@@ -0,0 +1,95 @@
+"""
+Checks that each account's holdings and balance still agree with its transaction history.
+
+Every write_account extends a per-account hash chain over the transactions, in the same database transaction
+as the write. Verification replays only the transactions after the last verified checkpoint, checks that they
+hash to the stored chain, and that the resulting holdings and cash match what the account says.
+When everything agrees the checkpoint moves forward, so each check costs only the trades since the last one.
+Run once with: uv run integrity.py [--full]
+"""
+
+import argparse
+import asyncio
+import os
+from dotenv import load_dotenv
+from database import GENESIS_HASH, chain_link, read_integrity, write_integrity_checkpoint, write_log
+
+load_dotenv(override=True)
+
+VERIFY_EVERY_N_SECONDS = int(os.getenv("VERIFY_EVERY_N_SECONDS", "60"))
+CASH_TOLERANCE = 0.01
+
+
+def verify(name: str, full: bool = False) -> list[str]:
+    """
+    Verify one account and return a description of any drift found (an empty list means all is well).
+    With full=True, replay the whole history rather than starting from the checkpoint.
+    """
+    state = read_integrity(name)
+    if state is None:
+        return []
+    account, record = state
+    transactions = account["transactions"]
+    if full:
+        count, chain_hash, holdings, cash = 0, GENESIS_HASH, {}, 0.0
+    else:
+        count = record["verified_count"]
+        chain_hash = record["verified_hash"]
+        holdings = dict(record["verified_holdings"])
+        cash = record["verified_cash"]
+    drift = []
+    if len(transactions) < count:
+        return [f"history has {len(transactions)} transactions but {count} were already verified"]
+    for transaction in transactions[count:]:
+        chain_hash = chain_link(chain_hash, transaction)
+        symbol = transaction["symbol"]
+        holdings[symbol] = holdings.get(symbol, 0) + transaction["quantity"]
+        cash -= transaction["quantity"] * transaction["price"]
+    holdings = {symbol: quantity for symbol, quantity in holdings.items() if quantity}
+    if len(transactions) != record["tx_count"]:
+        drift.append(f"history has {len(transactions)} transactions but the chain covers {record['tx_count']}")
+    elif chain_hash != record["chain_hash"]:
+        drift.append("transaction history does not match its hash chain")
+    actual = {symbol: quantity for symbol, quantity in account["holdings"].items() if quantity}
+    for symbol in sorted(holdings.keys() | actual.keys()):
+        expected, held = holdings.get(symbol, 0), actual.get(symbol, 0)
+        if expected != held:
+            drift.append(f"holds {held} {symbol} but transactions add up to {expected}")
+    expected_balance = record["cash_in"] + cash
+    if abs(account["balance"] - expected_balance) > CASH_TOLERANCE:
+        drift.append(f"balance is {account['balance']:.2f} but transactions imply {expected_balance:.2f}")
+    if not drift and len(transactions) > record["verified_count"]:
+        write_integrity_checkpoint(
+            name, record["epoch"], record["verified_count"], len(transactions), chain_hash, holdings, cash
+        )
+    return drift
+
+
+def report(name: str, full: bool = False) -> list[str]:
+    """Verify an account and log any drift against it, so it shows up alongside the trader's activity"""
+    drift = verify(name, full)
+    for problem in drift:
+        write_log(name, "integrity", f"Drift detected: {problem}")
+    return drift
+
+
+async def verify_every_n_seconds(names: list[str], seconds: int = VERIFY_EVERY_N_SECONDS):
+    """Keep verifying the accounts in the background while trading goes on"""
+    while True:
+        for name in names:
+            try:
+                await asyncio.to_thread(report, name)
+            except Exception as e:
+                print(f"Integrity check failed for {name}: {e}")
+        await asyncio.sleep(seconds)
+
+
+if __name__ == "__main__":
+    from trading_floor import names
+
+    parser = argparse.ArgumentParser(description="Check accounts against their transaction history")
+    parser.add_argument("--full", action="store_true", help="replay every transaction, not just those since the checkpoint")
+    args = parser.parse_args()
+    for name in names:
+        drift = report(name, args.full)
+        print(f"{name}: " + ("; ".join(drift) if drift else "ok"))
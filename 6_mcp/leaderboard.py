@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import threading
+from accounts import INITIAL_BALANCE
+
+GRID_POINTS = 200
+
+
+def align(series: list[tuple[np.ndarray, np.ndarray]], grid_points: int = GRID_POINTS) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Sample every trader's valuation series on one common time grid, carrying the last known value forward.
+    All traders are handled in a single searchsorted by offsetting each trader's timestamps into its own band.
+    Before a trader's first valuation, its value is the initial balance.
+    """
+    non_empty = [t for t, _ in series if len(t)]
+    if not non_empty:
+        return np.empty(0, dtype=np.int64), np.full((len(series), 0), INITIAL_BALANCE)
+    start = min(t[0] for t in non_empty)
+    end = max(t[-1] for t in non_empty)
+    grid = np.unique(np.linspace(start, end, grid_points).astype(np.int64))
+    band = end - start + 1
+    counts = np.array([len(t) for t, _ in series])
+    owner = np.repeat(np.arange(len(series)), counts)
+    keys = owner * band + (np.concatenate([t for t, _ in series]) - start)
+    values = np.concatenate([v for _, v in series])
+    grid_keys = np.arange(len(series))[:, None] * band + (grid - start)[None, :]
+    index = np.searchsorted(keys, grid_keys, side="right") - 1
+    first = np.concatenate([[0], np.cumsum(counts)[:-1]])[:, None]
+    valid = index >= first
+    aligned = np.where(valid, values[np.clip(index, 0, None)] if len(values) else 0.0, INITIAL_BALANCE)
+    return grid, aligned
+
+
+def compare(names: list[str], series: list[tuple[np.ndarray, np.ndarray]], grid_points: int = GRID_POINTS) -> dict:
+    """
+    Compute the leaderboard, relative performance, pairwise correlation of returns and drawdowns for all traders at once.
+    """
+    grid, values = align(series, grid_points)
+    returns = values / INITIAL_BALANCE - 1
+    floor_average = returns.mean(axis=0)
+    relative = returns - floor_average
+    peaks = np.maximum.accumulate(values, axis=1)
+    drawdowns = values / peaks - 1
+    period_returns = np.diff(values, axis=1) / values[:, :-1] if values.shape[1] > 1 else np.zeros((len(names), 0))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        correlation = np.corrcoef(period_returns) if period_returns.shape[1] > 1 else np.eye(len(names))
+    correlation = np.nan_to_num(np.atleast_2d(correlation))
+    final = values[:, -1] if values.shape[1] else np.full(len(names), INITIAL_BALANCE)
+    order = np.argsort(-final, kind="stable")
+    rank = np.empty(len(names), dtype=np.int64)
+    rank[order] = np.arange(1, len(names) + 1)
+
+    def last(a: np.ndarray) -> np.ndarray:
+        return a[:, -1] if a.shape[1] else np.zeros(len(names))
+
+    leaderboard = pd.DataFrame({
+        "Rank": rank,
+        "Trader": names,
+        "Value": final.round(0),
+        "Return %": (last(returns) * 100).round(2),
+        "vs Floor %": (last(relative) * 100).round(2),
+        "Max Drawdown %": ((drawdowns.min(axis=1) if drawdowns.shape[1] else np.zeros(len(names))) * 100).round(2),
+        "Drawdown %": (last(drawdowns) * 100).round(2),
+    }).sort_values("Rank")
+    return {
+        "grid": grid,
+        "returns": returns,
+        "leaderboard": leaderboard,
+        "correlation": pd.DataFrame(correlation.round(2), index=names, columns=names),
+    }
+
+
+class Leaderboard:
+    """Caches the comparison until one of the traders' data versions changes"""
+
+    def __init__(self):
+        self.versions = None
+        self.result = None
+        self.lock = threading.Lock()
+
+    def get(self, traders) -> dict:
+        with self.lock:
+            views = [trader.get_view() for trader in traders]
+            versions = tuple(view.version for view in views)
+            if versions != self.versions:
+                names = [trader.name for trader in traders]
+                series = [trader.get_series() for trader in traders]
+                self.result = compare(names, series)
+                self.result["chart"] = self.make_chart(names, self.result)
+                self.versions = versions
+            return self.result
+
+    def make_chart(self, names, result):
+        fig = go.Figure()
+        times = result["grid"].astype("datetime64[s]")
+        for name, returns in zip(names, result["returns"]):
+            fig.add_trace(go.Scatter(x=times, y=returns * 100, mode="lines", name=name))
+        fig.update_layout(
+            height=400,
+            margin=dict(l=40, r=20, t=20, b=40),
+            paper_bgcolor="#bbb",
+            plot_bgcolor="#dde",
+            yaxis_title="Return %",
+        )
+        return fig
@@ -0,0 +1,119 @@
+import asyncio
+import sqlite3
+from collections import deque
+from database import DB, read_log, read_logs_after, read_last_log_id
+from util import Color
+
+mapper = {
+    "trace": Color.WHITE,
+    "agent": Color.CYAN,
+    "function": Color.GREEN,
+    "generation": Color.YELLOW,
+    "response": Color.MAGENTA,
+    "account": Color.RED,
+    "integrity": Color.BLUE,
+}
+
+LAST_N = 13
+POLL_SECONDS = 0.5
+READ_BATCH = 1000
+
+
+def render_logs(logs) -> str:
+    response = ""
+    for log in logs:
+        timestamp, type, message = log
+        color = mapper.get(type, Color.WHITE).value
+        response += f"<span style='color:{color}'>{timestamp} : [{type}] {message}</span><br/>"
+    return f"<div style='height:250px; overflow-y:auto;'>{response}</div>"
+
+
+class LogFeed:
+    """
+    A change feed over the logs table, shared by every browser session in this process.
+    One background task watches SQLite's data_version, which changes whenever another connection commits,
+    and only then reads the new rows. The HTML for each trader is rendered once per change,
+    and sessions simply wait for the version to move on.
+    """
+
+    def __init__(self, last_n: int = LAST_N, poll_seconds: float = POLL_SECONDS, read_batch: int = READ_BATCH):
+        self.last_n = last_n
+        self.poll_seconds = poll_seconds
+        self.read_batch = read_batch
+        self.logs: dict[str, deque] = {}
+        self.html: dict[str, str] = {}
+        self.versions: dict[str, int] = {}
+        self.last_id = 0
+        self.condition = None
+        self.task = None
+
+    def start(self) -> None:
+        if self.task is None:
+            self.condition = asyncio.Condition()
+            self.last_id = read_last_log_id()
+            self.task = asyncio.create_task(self.watch())
+
+    def load(self, name: str) -> None:
+        name = name.lower()
+        if name not in self.logs:
+            logs = read_log(name, last_n=self.last_n, up_to_id=self.last_id or None)
+            self.logs[name] = deque(logs, maxlen=self.last_n)
+            self.html[name] = render_logs(self.logs[name])
+            self.versions[name] = 0
+
+    def get_html(self, name: str) -> str:
+        self.load(name)
+        return self.html[name.lower()]
+
+    async def watch(self) -> None:
+        with sqlite3.connect(DB) as conn:
+            data_version = None
+            while True:
+                try:
+                    current = conn.execute("PRAGMA data_version").fetchone()[0]
+                    if current != data_version:
+                        data_version = current
+                        await self.catch_up()
+                except Exception as e:
+                    print(f"Log feed unable to read logs: {e}")
+                await asyncio.sleep(self.poll_seconds)
+
+    async def catch_up(self) -> None:
+        """Read every row written since the last one seen, a batch at a time, so a burst is never left half read"""
+        while True:
+            rows = await asyncio.to_thread(read_logs_after, self.last_id, self.read_batch)
+            await self.ingest(rows)
+            if len(rows) < self.read_batch:
+                return
+
+    async def ingest(self, rows: list[tuple]) -> None:
+        if not rows:
+            return
+        changed = set()
+        for id, name, timestamp, type, message in rows:
+            self.last_id = max(self.last_id, id)
+            if name in self.logs:
+                self.logs[name].append((timestamp, type, message))
+                changed.add(name)
+        for name in changed:
+            self.html[name] = render_logs(self.logs[name])
+            self.versions[name] += 1
+        if changed:
+            async with self.condition:
+                self.condition.notify_all()
+
+    async def stream(self, name: str):
+        """Yield the rendered logs for a trader now, then again each time new entries arrive"""
+        self.start()
+        name = name.lower()
+        self.load(name)
+        version = self.versions[name]
+        yield self.html[name]
+        while True:
+            async with self.condition:
+                await self.condition.wait_for(lambda: self.versions[name] != version)
+            version = self.versions[name]
+            yield self.html[name]
+
+
+log_feed = LogFeed()
@@ -1,4 +1,3 @@
-from polygon import RESTClient
 from dotenv import load_dotenv
 import os
 from datetime import datetime
@@ -17,6 +16,8 @@ is_realtime_polygon = polygon_plan == "realtime"
 
 
 def is_market_open() -> bool:
+    from polygon import RESTClient
+
     client = RESTClient(polygon_api_key)
     market_status = client.get_market_status()
     return market_status.market == "open"
@@ -24,6 +25,8 @@ def is_market_open() -> bool:
 
 def get_all_share_prices_polygon_eod() -> dict[str, float]:
     """With much thanks to student Reema R. for fixing the timezone issue with this!"""
+    from polygon import RESTClient
+
     client = RESTClient(polygon_api_key)
 
     probe = client.get_previous_close_agg("SPY")[0]
@@ -49,6 +52,8 @@ def get_share_price_polygon_eod(symbol) -> float:
 
 
 def get_share_price_polygon_min(symbol) -> float:
+    from polygon import RESTClient
+
     client = RESTClient(polygon_api_key)
     result = client.get_snapshot_ticker("stocks", symbol)
     return result.min.close or result.prev_day.close
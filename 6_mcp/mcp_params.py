@@ -1,12 +1,17 @@
 import os
 from dotenv import load_dotenv
 from market import is_paid_polygon, is_realtime_polygon
+from snapshots import memory_dir
 
 load_dotenv(override=True)
 
 brave_env = {"BRAVE_API_KEY": os.getenv("BRAVE_API_KEY")}
 polygon_api_key = os.getenv("POLYGON_API_KEY")
 
+# MCP's stdio client only passes a handful of environment variables on to a server, so the namespace a forked floor
+# trades in has to be given to each server that reads or writes the accounts
+namespace_env = {"TRADING_NAMESPACE": os.getenv("TRADING_NAMESPACE", "")}
+
 # The MCP server for the Trader to read Market Data
 
 if is_paid_polygon or is_realtime_polygon:
@@ -22,11 +27,28 @@ else:
 # The full set of MCP servers for the trader: Accounts, Push Notification and the Market
 
 trader_mcp_server_params = [
-    {"command": "uv", "args": ["run", "accounts_server.py"]},
-    {"command": "uv", "args": ["run", "push_server.py"]},
+    {"command": "uv", "args": ["run", "accounts_server.py"], "env": namespace_env},
+    {"command": "uv", "args": ["run", "push_server.py"], "env": namespace_env},
     market_mcp,
 ]
 
+# The knowledge graph memory: one long-lived server for everyone if MEMORY_SERVER_URL is set, otherwise one per trader
+# Either way each floor, main or forked, has a single store, with a namespace for each trader alongside the shared entities
+
+MEMORY_SERVER_URL = os.getenv("MEMORY_SERVER_URL")
+
+
+def memory_mcp(name: str):
+    if MEMORY_SERVER_URL:
+        headers = {"X-Memory-Namespace": name.lower(), "X-Trading-Namespace": namespace_env["TRADING_NAMESPACE"]}
+        return {"url": MEMORY_SERVER_URL, "headers": headers}
+    return {
+        "command": "uv",
+        "args": ["run", "memory_server.py"],
+        "env": {"MEMORY_NAMESPACE": name.lower(), "MEMORY_DB": f"{memory_dir()}/memory.db"},
+    }
+
+
 # The full set of MCP servers for the researcher: Fetch, Brave Search and Memory
 
 
@@ -38,9 +60,5 @@ def researcher_mcp_server_params(name: str):
             "args": ["-y", "@modelcontextprotocol/server-brave-search"],
             "env": brave_env,
         },
-        {
-            "command": "npx",
-            "args": ["-y", "mcp-memory-libsql"],
-            "env": {"LIBSQL_URL": f"file:./memory/{name}.db"},
-        },
+        memory_mcp(name),
     ]
@@ -0,0 +1,148 @@
+"""
+A knowledge graph memory MCP server, with the same tools as mcp-memory-libsql, backed by memory_store.py.
+
+Run one long-lived instance for every trader with: uv run memory_server.py --http [--port 8765]
+and set MEMORY_SERVER_URL=http://127.0.0.1:8765/mcp; each trader's namespace is sent in the X-Memory-Namespace header.
+A floor forked with snapshots.py has its own copy of the store, so traders on a fork also send their TRADING_NAMESPACE
+in the X-Trading-Namespace header, and the server opens that fork's store the first time it's asked for.
+Without MEMORY_SERVER_URL, each trader starts its own copy over stdio with MEMORY_NAMESPACE and MEMORY_DB set.
+"""
+
+import argparse
+import os
+import threading
+from pydantic import BaseModel, ConfigDict, Field
+from mcp.server.fastmcp import FastMCP, Context
+from memory_store import KnowledgeGraph, SHARED
+from snapshots import memory_dir
+
+NAMESPACE_HEADER = "x-memory-namespace"
+TRADING_NAMESPACE_HEADER = "x-trading-namespace"
+MEMORY_NAMESPACE = os.getenv("MEMORY_NAMESPACE", SHARED)
+
+mcp = FastMCP("memory_server")
+graph = KnowledgeGraph()
+fork_graphs: dict[str, KnowledgeGraph] = {}
+fork_graphs_lock = threading.Lock()
+
+
+class Entity(BaseModel):
+    name: str = Field(description="The name of the entity, such as a company or a person")
+    entityType: str = Field(description="The type of the entity")
+    observations: list[str] = Field(default=[], description="Facts about the entity")
+    shared: bool = Field(default=False, description="Whether to share this entity with the other traders")
+
+
+class Relation(BaseModel):
+    model_config = ConfigDict(populate_by_name=True)
+    source: str = Field(alias="from", description="The name of the entity the relation starts from")
+    target: str = Field(alias="to", description="The name of the entity the relation points to")
+    relationType: str = Field(description="The type of relation, in active voice")
+
+
+def namespace_of(ctx: Context) -> str:
+    request = ctx.request_context.request
+    if request is not None and request.headers.get(NAMESPACE_HEADER):
+        return request.headers[NAMESPACE_HEADER].lower()
+    return MEMORY_NAMESPACE.lower()
+
+
+def graph_of(ctx: Context) -> KnowledgeGraph:
+    """The store of the floor the request comes from: the main floor's, or a fork's own copy"""
+    request = ctx.request_context.request
+    floor = request.headers.get(TRADING_NAMESPACE_HEADER, "") if request is not None else ""
+    if not floor:
+        return graph
+    with fork_graphs_lock:
+        if floor not in fork_graphs:
+            if not os.path.isdir(memory_dir(floor)):
+                raise ValueError(f"No such trading namespace: {floor}")
+            fork_graphs[floor] = KnowledgeGraph(os.path.join(memory_dir(floor), "memory.db"))
+            fork_graphs[floor].refresh()
+        return fork_graphs[floor]
+
+
+@mcp.tool()
+def create_entities(entities: list[Entity], ctx: Context) -> str:
+    """Create new entities with observations, or add observations to entities that already exist"""
+    names = graph_of(ctx).create_entities(namespace_of(ctx), [entity.model_dump() for entity in entities])
+    return f"Saved entities: {', '.join(names)}"
+
+
+@mcp.tool()
+def add_observations(name: str, observations: list[str], ctx: Context) -> str:
+    """Add observations to an existing entity
+
+    Args:
+        name: The name of the entity
+        observations: The facts to add
+    """
+    if not graph_of(ctx).add_observations(namespace_of(ctx), name, observations):
+        raise ValueError(f"Entity not found: {name}")
+    return f"Added {len(observations)} observations to {name}"
+
+
+@mcp.tool()
+def search_nodes(query: str, ctx: Context) -> dict:
+    """Search for entities and their relations by name, type or the content of their observations
+
+    Args:
+        query: The words to search for
+    """
+    return graph_of(ctx).search(namespace_of(ctx), query)
+
+
+@mcp.tool()
+def read_graph(ctx: Context) -> dict:
+    """Read the most recent entities in memory, with their observations and relations"""
+    return graph_of(ctx).read_graph(namespace_of(ctx))
+
+
+@mcp.tool()
+def create_relations(relations: list[Relation], ctx: Context) -> str:
+    """Create relations between entities"""
+    missing = graph_of(ctx).create_relations(
+        namespace_of(ctx), [relation.model_dump(by_alias=True) for relation in relations]
+    )
+    if missing:
+        return f"Created relations, except for those involving unknown entities: {', '.join(sorted(set(missing)))}"
+    return f"Created {len(relations)} relations"
+
+
+@mcp.tool()
+def delete_entity(name: str, ctx: Context) -> str:
+    """Delete an entity, with its observations and relations
+
+    Args:
+        name: The name of the entity
+    """
+    if not graph_of(ctx).delete_entity(namespace_of(ctx), name):
+        raise ValueError(f"Entity not found: {name}")
+    return f"Deleted {name}"
+
+
+@mcp.tool()
+def delete_relation(source: str, target: str, relationType: str, ctx: Context) -> str:
+    """Delete a relation between two entities
+
+    Args:
+        source: The name of the entity the relation starts from
+        target: The name of the entity the relation points to
+        relationType: The type of relation
+    """
+    if not graph_of(ctx).delete_relation(namespace_of(ctx), source, target, relationType):
+        raise ValueError(f"Relation not found: {source} {relationType} {target}")
+    return f"Deleted relation {source} {relationType} {target}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Knowledge graph memory MCP server")
+    parser.add_argument("--http", action="store_true", help="serve every trader from one long-lived process")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    graph.refresh()
+    if args.http:
+        mcp.settings.port = args.port
+        mcp.run(transport="streamable-http")
+    else:
+        mcp.run(transport="stdio")
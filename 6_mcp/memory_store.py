@@ -0,0 +1,250 @@
+"""
+A knowledge graph of entities, observations and relations in one SQLite store, shared by every trader.
+
+Each trader writes to its own namespace and can also read and write entities in the shared namespace,
+so what one trader learns about a company can be used by the others. Observations are indexed with FTS5
+for full text search, and the entity names are kept in memory so that lookups don't touch the database.
+Other processes may write to the same store; their commits are spotted with PRAGMA data_version and the
+in-memory index is reloaded.
+"""
+
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from dotenv import load_dotenv
+
+load_dotenv(override=True)
+
+MEMORY_DB = os.getenv("MEMORY_DB", "memory/memory.db")
+SHARED = "shared"
+SEARCH_LIMIT = 20
+READ_GRAPH_LIMIT = 50
+
+SCHEMA = [
+    '''
+        CREATE TABLE IF NOT EXISTS entities (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            namespace TEXT,
+            name TEXT,
+            entity_type TEXT,
+            created DATETIME,
+            UNIQUE (namespace, name)
+        )
+    ''',
+    '''
+        CREATE TABLE IF NOT EXISTS observations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            entity_id INTEGER REFERENCES entities (id) ON DELETE CASCADE,
+            content TEXT,
+            created DATETIME
+        )
+    ''',
+    'CREATE UNIQUE INDEX IF NOT EXISTS idx_observations_entity ON observations (entity_id, content)',
+    '''
+        CREATE TABLE IF NOT EXISTS relations (
+            source_id INTEGER REFERENCES entities (id) ON DELETE CASCADE,
+            target_id INTEGER REFERENCES entities (id) ON DELETE CASCADE,
+            relation_type TEXT,
+            created DATETIME,
+            PRIMARY KEY (source_id, target_id, relation_type)
+        )
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_relations_target ON relations (target_id)',
+    "CREATE VIRTUAL TABLE IF NOT EXISTS observations_fts USING fts5(content, content='observations', content_rowid='id')",
+    '''
+        CREATE TRIGGER IF NOT EXISTS observations_insert AFTER INSERT ON observations BEGIN
+            INSERT INTO observations_fts (rowid, content) VALUES (new.id, new.content);
+        END
+    ''',
+    '''
+        CREATE TRIGGER IF NOT EXISTS observations_delete AFTER DELETE ON observations BEGIN
+            INSERT INTO observations_fts (observations_fts, rowid, content) VALUES ('delete', old.id, old.content);
+        END
+    ''',
+]
+
+
+def fts_query(query: str) -> str:
+    """Turn free text into an FTS5 query that matches any of the words, without tripping over FTS syntax"""
+    words = [word.replace('"', '""') for word in query.split()]
+    return " OR ".join(f'"{word}"' for word in words)
+
+
+class KnowledgeGraph:
+    def __init__(self, db: str = MEMORY_DB):
+        os.makedirs(os.path.dirname(db) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(db, check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        for statement in SCHEMA:
+            self.conn.execute(statement)
+        self.conn.commit()
+        self.lock = threading.Lock()
+        self.index: dict[tuple[str, str], tuple[int, str]] = {}
+        self.data_version = None
+
+    def refresh(self) -> None:
+        """Reload the entity index if another connection has committed since we last looked"""
+        current = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        if current != self.data_version:
+            rows = self.conn.execute("SELECT id, namespace, name, entity_type FROM entities").fetchall()
+            self.index = {(namespace, name): (id, entity_type) for id, namespace, name, entity_type in rows}
+            self.data_version = current
+
+    @contextmanager
+    def transaction(self):
+        """Hold the lock around a write; if it fails, the index may be ahead of the database, so reload it next time"""
+        with self.lock:
+            self.refresh()
+            try:
+                with self.conn:
+                    yield
+            except Exception:
+                self.data_version = None
+                raise
+
+    def visible(self, namespace: str) -> tuple[str, ...]:
+        return (namespace, SHARED) if namespace != SHARED else (SHARED,)
+
+    def resolve(self, namespace: str, name: str) -> int | None:
+        """The entity a trader means by this name: its own if it has one, otherwise the shared one"""
+        for space in self.visible(namespace):
+            if (space, name) in self.index:
+                return self.index[(space, name)][0]
+        return None
+
+    def create_entities(self, namespace: str, entities: list[dict]) -> list[str]:
+        """Create entities, or add observations to ones that already exist; returns the names touched"""
+        now = datetime.now().isoformat()
+        with self.transaction():
+            for entity in entities:
+                space = SHARED if entity.get("shared") else namespace
+                key = (space, entity["name"])
+                if key in self.index:
+                    id = self.index[key][0]
+                else:
+                    # Another process may have just created the same entity, so don't assume the insert happened
+                    self.conn.execute(
+                        "INSERT OR IGNORE INTO entities (namespace, name, entity_type, created) VALUES (?, ?, ?, ?)",
+                        (space, entity["name"], entity.get("entityType", ""), now),
+                    )
+                    id = self.conn.execute("SELECT id FROM entities WHERE namespace = ? AND name = ?", key).fetchone()[0]
+                    self.index[key] = (id, entity.get("entityType", ""))
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO observations (entity_id, content, created) VALUES (?, ?, ?)",
+                    [(id, observation, now) for observation in entity.get("observations", [])],
+                )
+        return [entity["name"] for entity in entities]
+
+    def add_observations(self, namespace: str, name: str, observations: list[str]) -> bool:
+        now = datetime.now().isoformat()
+        with self.transaction():
+            id = self.resolve(namespace, name)
+            if id is None:
+                return False
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO observations (entity_id, content, created) VALUES (?, ?, ?)",
+                [(id, observation, now) for observation in observations],
+            )
+        return True
+
+    def create_relations(self, namespace: str, relations: list[dict]) -> list[str]:
+        """Relate entities by name; returns any names that couldn't be found"""
+        now = datetime.now().isoformat()
+        missing = []
+        with self.transaction():
+            for relation in relations:
+                source = self.resolve(namespace, relation["from"])
+                target = self.resolve(namespace, relation["to"])
+                if source is None or target is None:
+                    missing += [name for name, id in ((relation["from"], source), (relation["to"], target)) if id is None]
+                    continue
+                self.conn.execute(
+                    "INSERT OR IGNORE INTO relations (source_id, target_id, relation_type, created) VALUES (?, ?, ?, ?)",
+                    (source, target, relation["relationType"], now),
+                )
+        return missing
+
+    def delete_entity(self, namespace: str, name: str) -> bool:
+        """Delete one of the trader's own entities (shared entities are left to whoever reads them)"""
+        with self.transaction():
+            entry = self.index.pop((namespace, name), None)
+            if entry is None:
+                return False
+            self.conn.execute("DELETE FROM observations WHERE entity_id = ?", (entry[0],))
+            self.conn.execute("DELETE FROM relations WHERE source_id = ? OR target_id = ?", (entry[0], entry[0]))
+            self.conn.execute("DELETE FROM entities WHERE id = ?", (entry[0],))
+        return True
+
+    def delete_relation(self, namespace: str, source: str, target: str, relation_type: str) -> bool:
+        with self.transaction():
+            source_id, target_id = self.resolve(namespace, source), self.resolve(namespace, target)
+            cursor = self.conn.execute(
+                "DELETE FROM relations WHERE source_id = ? AND target_id = ? AND relation_type = ?",
+                (source_id, target_id, relation_type),
+            )
+        return cursor.rowcount > 0
+
+    def search(self, namespace: str, query: str, limit: int = SEARCH_LIMIT) -> dict:
+        """Entities whose name or type contains the query, then those with the best matching observations"""
+        spaces = self.visible(namespace)
+        with self.lock:
+            self.refresh()
+            lowered = query.lower()
+            ids = [
+                id for (space, name), (id, entity_type) in self.index.items()
+                if space in spaces and (lowered in name.lower() or lowered in entity_type.lower())
+            ][:limit]
+            terms = fts_query(query)
+            if terms and len(ids) < limit:
+                placeholders = ", ".join("?" for _ in spaces)
+                rows = self.conn.execute(f'''
+                    SELECT o.entity_id FROM observations_fts f
+                    JOIN observations o ON o.id = f.rowid
+                    JOIN entities e ON e.id = o.entity_id
+                    WHERE observations_fts MATCH ? AND e.namespace IN ({placeholders})
+                    ORDER BY bm25(observations_fts)
+                    LIMIT ?
+                ''', (terms, *spaces, limit * 5)).fetchall()
+                for (id,) in rows:
+                    if id not in ids:
+                        ids.append(id)
+                    if len(ids) >= limit:
+                        break
+            return self.graph(ids)
+
+    def read_graph(self, namespace: str, limit: int = READ_GRAPH_LIMIT) -> dict:
+        """The most recently created entities the trader can see, with their relations"""
+        spaces = self.visible(namespace)
+        with self.lock:
+            self.refresh()
+            ids = sorted((id for (space, _), (id, _) in self.index.items() if space in spaces), reverse=True)[:limit]
+            return self.graph(ids)
+
+    def graph(self, ids: list[int]) -> dict:
+        if not ids:
+            return {"entities": [], "relations": []}
+        placeholders = ", ".join("?" for _ in ids)
+        entities = {
+            id: {"name": name, "entityType": entity_type, "observations": [], "shared": namespace == SHARED}
+            for id, namespace, name, entity_type in self.conn.execute(
+                f"SELECT id, namespace, name, entity_type FROM entities WHERE id IN ({placeholders})", ids
+            )
+        }
+        for entity_id, content in self.conn.execute(
+            f"SELECT entity_id, content FROM observations WHERE entity_id IN ({placeholders}) ORDER BY id", ids
+        ):
+            entities[entity_id]["observations"].append(content)
+        relations = [
+            {"from": entities[source]["name"], "to": entities[target]["name"], "relationType": relation_type}
+            for source, target, relation_type in self.conn.execute(
+                f'''
+                    SELECT source_id, target_id, relation_type FROM relations
+                    WHERE source_id IN ({placeholders}) AND target_id IN ({placeholders})
+                ''',
+                ids + ids,
+            )
+        ]
+        return {"entities": [entities[id] for id in ids if id in entities], "relations": relations}
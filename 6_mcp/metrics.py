@@ -0,0 +1,174 @@
+from agents import TracingProcessor, Trace, Span
+from datetime import datetime
+from tracers import get_trader_name
+from model_router import is_hedge_loser
+from database import write_run_metrics, read_run_metrics, read_call_metrics
+import pandas as pd
+import threading
+
+# Approximate list prices in USD per million tokens, as (input, output)
+# Matched against the model name by prefix, so more specific names must come first
+
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1-nano": (0.10, 0.40),
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-4o": (2.50, 10.00),
+    "deepseek-chat": (0.27, 1.10),
+    "deepseek-reasoner": (0.55, 2.19),
+    "gemini-2.5-flash": (0.15, 0.60),
+    "gemini-2.0-flash": (0.10, 0.40),
+    "grok-3-mini": (0.30, 0.50),
+    "grok-3": (3.00, 15.00),
+}
+
+PERCENTILES = [0.5, 0.9, 0.99]
+
+
+def price_for(model: str | None) -> tuple[float, float]:
+    if model:
+        model = model.split("/")[-1]
+        for prefix, price in MODEL_PRICES.items():
+            if model.startswith(prefix):
+                return price
+    return (0.0, 0.0)
+
+
+def seconds_between(started: str | None, ended: str | None) -> float:
+    if not started or not ended:
+        return 0.0
+    return (datetime.fromisoformat(ended) - datetime.fromisoformat(started)).total_seconds()
+
+
+def usage_of(span_data) -> tuple[str | None, int, int]:
+    """
+    Pull (model, input_tokens, output_tokens) out of a generation or response span.
+    Chat Completions models report usage on the generation span; the Responses API reports it on the response.
+    """
+    if span_data.type == "generation":
+        usage = span_data.usage or {}
+        input_tokens = usage.get("input_tokens", usage.get("prompt_tokens", 0)) or 0
+        output_tokens = usage.get("output_tokens", usage.get("completion_tokens", 0)) or 0
+        return span_data.model, input_tokens, output_tokens
+    response = getattr(span_data, "response", None)
+    usage = getattr(response, "usage", None)
+    model = getattr(response, "model", None)
+    if usage is None:
+        return model, 0, 0
+    return model, usage.input_tokens or 0, usage.output_tokens or 0
+
+
+class RunMetrics:
+    """Running totals for one trader run, accumulated as its spans end"""
+
+    def __init__(self, trace: Trace, name: str):
+        self.trace_id = trace.trace_id
+        self.trace_name = trace.name
+        self.name = name
+        self.started = datetime.now().isoformat()
+        self.llm_turns = 0
+        self.tool_calls = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.cost = 0.0
+        self.calls: list[tuple[str, str, float]] = []
+
+    def add_span(self, span: Span) -> None:
+        span_data = span.span_data
+        seconds = seconds_between(span.started_at, span.ended_at)
+        if span_data.type in ("generation", "response"):
+            model, input_tokens, output_tokens = usage_of(span_data)
+            input_price, output_price = price_for(model)
+            self.llm_turns += 1
+            self.input_tokens += input_tokens
+            self.output_tokens += output_tokens
+            self.cost += (input_tokens * input_price + output_tokens * output_price) / 1_000_000
+            self.calls.append(("model", model or "unknown", seconds))
+        elif span_data.type == "function":
+            self.tool_calls += 1
+            self.calls.append(("tool", span_data.name, seconds))
+
+    def as_row(self) -> dict:
+        ended = datetime.now().isoformat()
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "trace_name": self.trace_name,
+            "started": self.started,
+            "ended": ended,
+            "seconds": seconds_between(self.started, ended),
+            "llm_turns": self.llm_turns,
+            "tool_calls": self.tool_calls,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "cost": self.cost,
+        }
+
+
+class MetricsTracer(TracingProcessor):
+    """Aggregates model and tool spans into one run_metrics row per trader run"""
+
+    def __init__(self):
+        self.runs: dict[str, RunMetrics] = {}
+        self.lock = threading.Lock()
+
+    def on_trace_start(self, trace) -> None:
+        name = get_trader_name(trace)
+        if name:
+            with self.lock:
+                self.runs[trace.trace_id] = RunMetrics(trace, name)
+
+    def on_trace_end(self, trace) -> None:
+        with self.lock:
+            run = self.runs.pop(trace.trace_id, None)
+        if run:
+            try:
+                write_run_metrics(run.as_row(), run.calls)
+            except Exception as e:
+                print(f"Unable to write metrics for {run.name}: {e}")
+
+    def on_span_start(self, span) -> None:
+        pass
+
+    def on_span_end(self, span) -> None:
+        if not span.span_data:
+            return
+        if span.span_data.type in ("generation", "response") and is_hedge_loser():
+            return
+        with self.lock:
+            run = self.runs.get(span.trace_id)
+            if run:
+                run.add_span(span)
+
+    def force_flush(self) -> None:
+        pass
+
+    def shutdown(self) -> None:
+        pass
+
+
+def get_run_metrics_df(last_n=20) -> pd.DataFrame:
+    columns = ["Trader", "Run", "Started", "Seconds", "Turns", "Tools", "Tokens In", "Tokens Out", "Cost"]
+    df = pd.DataFrame(read_run_metrics(last_n), columns=columns)
+    df["Trader"] = df["Trader"].str.title()
+    df["Started"] = pd.to_datetime(df["Started"]).dt.strftime("%m/%d %H:%M")
+    df["Seconds"] = df["Seconds"].round(1)
+    df["Cost"] = df["Cost"].map(lambda cost: f"${cost:.4f}")
+    return df
+
+
+def get_latency_percentiles_df(kind: str) -> pd.DataFrame:
+    """
+    Latency percentiles in seconds for each model (kind="model") or tool (kind="tool").
+    """
+    label = "Model" if kind == "model" else "Tool"
+    columns = [label, "Calls"] + [f"p{int(p * 100)}" for p in PERCENTILES]
+    calls = pd.DataFrame(read_call_metrics(kind), columns=[label, "seconds"])
+    if calls.empty:
+        return pd.DataFrame(columns=columns)
+    grouped = calls.groupby(label)["seconds"]
+    df = grouped.quantile(PERCENTILES).unstack().round(2)
+    df.columns = columns[2:]
+    df.insert(0, "Calls", grouped.count())
+    return df.reset_index().sort_values("Calls", ascending=False)[columns]
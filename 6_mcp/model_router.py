@@ -0,0 +1,177 @@
+from agents import Model
+from collections import deque
+from contextvars import ContextVar
+import asyncio
+import time
+
+WINDOW = 50
+MIN_SAMPLES = 5
+MAX_ERROR_RATE = 0.5
+DEFAULT_HEDGE_AFTER_SECONDS = 20.0
+
+
+class ProviderStats:
+    """Rolling latency and error rate for one provider, over its last WINDOW requests"""
+
+    def __init__(self, window: int = WINDOW):
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)
+
+    def record_success(self, seconds: float) -> None:
+        self.latencies.append(seconds)
+        self.outcomes.append(True)
+
+    def record_error(self) -> None:
+        self.outcomes.append(False)
+
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+    def p95(self) -> float | None:
+        if len(self.latencies) < MIN_SAMPLES:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+
+    def is_healthy(self) -> bool:
+        return len(self.outcomes) < MIN_SAMPLES or self.error_rate() <= MAX_ERROR_RATE
+
+
+provider_stats: dict[str, ProviderStats] = {}
+
+
+def stats_for(provider: str) -> ProviderStats:
+    return provider_stats.setdefault(provider, ProviderStats())
+
+
+class Attempt:
+    """One of the hedged requests for a model turn; marked lost when another request answers first"""
+
+    def __init__(self, provider: str):
+        self.provider = provider
+        self.lost = False
+
+
+# Set in each hedged request's task, so tracers can tell the spans of a cancelled loser from the call that counted
+current_attempt: ContextVar[Attempt | None] = ContextVar("current_attempt", default=None)
+
+
+def is_hedge_loser() -> bool:
+    attempt = current_attempt.get()
+    return attempt is not None and attempt.lost
+
+
+class RoutedModel(Model):
+    """
+    A Model that tries a list of (provider, model) candidates in order of preference.
+    Unhealthy providers are moved to the back of the list, failures fail over to the next candidate,
+    and with hedge=True a duplicate request goes to the next candidate once the primary is slower than its p95.
+    """
+
+    def __init__(self, candidates: list[tuple[str, Model]], hedge: bool = False):
+        self.candidates = candidates
+        self.hedge = hedge
+
+    def ordered_candidates(self) -> list[tuple[str, Model]]:
+        healthy = [c for c in self.candidates if stats_for(c[0]).is_healthy()]
+        unhealthy = [c for c in self.candidates if not stats_for(c[0]).is_healthy()]
+        return healthy + unhealthy
+
+    async def timed_response(self, provider: str, model: Model, args, kwargs):
+        start = time.perf_counter()
+        try:
+            response = await model.get_response(*args, **kwargs)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            stats_for(provider).record_error()
+            raise
+        stats_for(provider).record_success(time.perf_counter() - start)
+        return response
+
+    async def get_response(self, *args, **kwargs):
+        candidates = self.ordered_candidates()
+        if self.hedge and len(candidates) > 1:
+            return await self.hedged_response(candidates, args, kwargs)
+        last_error = None
+        for provider, model in candidates:
+            try:
+                return await self.timed_response(provider, model, args, kwargs)
+            except Exception as e:
+                print(f"Model request to {provider} failed, failing over: {e}")
+                last_error = e
+        raise last_error
+
+    async def attempt_response(self, attempt: Attempt, model: Model, args, kwargs):
+        current_attempt.set(attempt)
+        return await self.timed_response(attempt.provider, model, args, kwargs)
+
+    async def hedged_response(self, candidates, args, kwargs):
+        """
+        Start the primary; after its p95 latency, start the next candidate as well and take whichever answers first.
+        If a request fails, the next candidate is started straight away, whether or not a hedge is still running.
+        The requests that lose are cancelled and marked, so their spans aren't counted as turns of the run.
+        """
+        attempts: dict[asyncio.Task, Attempt] = {}
+        pending = set()
+        remaining = list(candidates)
+        last_error = None
+
+        def start_next() -> str:
+            provider, model = remaining.pop(0)
+            attempt = Attempt(provider)
+            task = asyncio.create_task(self.attempt_response(attempt, model, args, kwargs))
+            attempts[task] = attempt
+            pending.add(task)
+            return provider
+
+        try:
+            while remaining or pending:
+                if remaining and not pending:
+                    provider = start_next()
+                timeout = None
+                if remaining:
+                    timeout = stats_for(provider).p95() or DEFAULT_HEDGE_AFTER_SECONDS
+                done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                failed = False
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    last_error = task.exception()
+                    failed = True
+                    print(f"Model request to {attempts[task].provider} failed, failing over: {last_error}")
+                if remaining and (failed or not done):
+                    if not failed:
+                        print(f"Model request is slower than p95, hedging with {remaining[0][0]}")
+                    provider = start_next()
+            raise last_error
+        finally:
+            for task in pending:
+                attempts[task].lost = True
+                task.cancel()
+
+    async def stream_response(self, *args, **kwargs):
+        """Fail over only before the first event; once a provider has started streaming, we stay with it"""
+        last_error = None
+        for provider, model in self.ordered_candidates():
+            started = False
+            start = time.perf_counter()
+            try:
+                async for event in model.stream_response(*args, **kwargs):
+                    started = True
+                    yield event
+                stats_for(provider).record_success(time.perf_counter() - start)
+                return
+            except Exception as e:
+                stats_for(provider).record_error()
+                if started:
+                    raise
+                print(f"Model stream from {provider} failed, failing over: {e}")
+                last_error = e
+        raise last_error
+
+    async def close(self) -> None:
+        for _, model in self.candidates:
+            await model.close()
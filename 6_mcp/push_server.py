@@ -1,18 +1,14 @@
-import os
-from dotenv import load_dotenv
-import requests
 from pydantic import BaseModel, Field
 from mcp.server.fastmcp import FastMCP
 
-load_dotenv(override=True)
-
-pushover_user = os.getenv("PUSHOVER_USER")
-pushover_token = os.getenv("PUSHOVER_TOKEN")
-pushover_url = "https://api.pushover.net/1/messages.json"
+from shared.notifications import get_outbox
 
 
 mcp = FastMCP("push_server")
 
+# The MCP client closes our stdin on shutdown and kills us 2 seconds later, so whatever is queued has to go before then
+FLUSH_ON_CLOSE_SECONDS = 1.5
+
 
 class PushModelArgs(BaseModel):
     message: str = Field(description="A brief message to push")
@@ -22,10 +18,11 @@ class PushModelArgs(BaseModel):
 def push(args: PushModelArgs):
     """Send a push notification with this brief message"""
     print(f"Push: {args.message}")
-    payload = {"user": pushover_user, "token": pushover_token, "message": args.message}
-    requests.post(pushover_url, data=payload)
+    get_outbox().push(args.message)
     return "Push notification sent"
 
 
 if __name__ == "__main__":
+    outbox = get_outbox()
     mcp.run(transport="stdio")
+    outbox.flush(FLUSH_ON_CLOSE_SECONDS)
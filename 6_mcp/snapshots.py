@@ -0,0 +1,137 @@
+"""
+Snapshot, restore and fork the trading floor.
+
+A snapshot is a consistent copy of accounts.db and the researchers' memory databases, taken with SQLite's online
+backup API while traders keep running. Restoring copies it back the same way, so readers never see a half-written file.
+
+A fork is an experiment namespace: run the floor with TRADING_NAMESPACE=<namespace> and it trades on its own copy
+of the accounts. Forking copies just the account rows and memory databases; the parent's logs are shared up to the
+moment of the fork, so it takes milliseconds however long the floor has been running.
+
+Run with:
+uv run snapshots.py snapshot <label> | restore <label> | fork <namespace> [--parent <namespace>] | drop <namespace> | list
+"""
+
+import argparse
+import glob
+import json
+import os
+import shutil
+import sqlite3
+from datetime import datetime
+from database import DB, NAMESPACE, create_namespace, drop_namespace, read_namespaces, migrate
+
+SNAPSHOTS_DIR = "snapshots"
+MEMORY_DIR = "memory"
+
+
+def memory_dir(namespace: str = NAMESPACE) -> str:
+    """Where the researchers' memory databases live for a namespace"""
+    return os.path.join(MEMORY_DIR, namespace) if namespace else MEMORY_DIR
+
+
+def copy_database(source: str, destination: str) -> None:
+    """Copy one SQLite database onto another using the online backup API"""
+    with sqlite3.connect(source) as src, sqlite3.connect(destination) as dst:
+        src.backup(dst)
+
+
+def memory_databases(root: str) -> list[str]:
+    """Every memory database under root, including those of forked namespaces, relative to root"""
+    return sorted(os.path.relpath(path, root) for path in glob.glob(os.path.join(root, "**", "*.db"), recursive=True))
+
+
+def snapshot(label: str) -> str:
+    folder = os.path.join(SNAPSHOTS_DIR, label)
+    if os.path.exists(folder):
+        raise ValueError(f"Snapshot {label} already exists")
+    os.makedirs(os.path.join(folder, MEMORY_DIR))
+    copy_database(DB, os.path.join(folder, DB))
+    memories = memory_databases(MEMORY_DIR)
+    for path in memories:
+        os.makedirs(os.path.dirname(os.path.join(folder, MEMORY_DIR, path)), exist_ok=True)
+        copy_database(os.path.join(MEMORY_DIR, path), os.path.join(folder, MEMORY_DIR, path))
+    manifest = {
+        "created": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "namespaces": [row[0] for row in read_namespaces()],
+        "memories": memories,
+    }
+    with open(os.path.join(folder, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return folder
+
+
+def restore(label: str) -> None:
+    """
+    Put the floor, and every fork, back to how they were when the snapshot was taken. Forks made since then are
+    removed: their account rows go with the rest of accounts.db, and their memory databases are deleted.
+    """
+    folder = os.path.join(SNAPSHOTS_DIR, label)
+    if not os.path.exists(os.path.join(folder, "manifest.json")):
+        raise ValueError(f"No such snapshot: {label}")
+    with open(os.path.join(folder, "manifest.json")) as f:
+        namespaces = set(json.load(f)["namespaces"])
+    copy_database(os.path.join(folder, DB), DB)
+    migrate()
+    memories = memory_databases(os.path.join(folder, MEMORY_DIR))
+    for path in memory_databases(MEMORY_DIR):
+        if path not in memories:
+            os.remove(os.path.join(MEMORY_DIR, path))
+    if os.path.isdir(MEMORY_DIR):
+        for entry in os.scandir(MEMORY_DIR):
+            if entry.is_dir() and entry.name not in namespaces:
+                shutil.rmtree(entry.path)
+    for path in memories:
+        os.makedirs(os.path.dirname(os.path.join(MEMORY_DIR, path)), exist_ok=True)
+        copy_database(os.path.join(folder, MEMORY_DIR, path), os.path.join(MEMORY_DIR, path))
+
+
+def fork(namespace: str, parent: str = NAMESPACE) -> None:
+    create_namespace(namespace, parent)
+    target = memory_dir(namespace)
+    os.makedirs(target, exist_ok=True)
+    for path in glob.glob(os.path.join(memory_dir(parent), "*.db")):
+        copy_database(path, os.path.join(target, os.path.basename(path)))
+
+
+def drop(namespace: str) -> None:
+    drop_namespace(namespace)
+    shutil.rmtree(memory_dir(namespace), ignore_errors=True)
+
+
+def list_all() -> None:
+    print("Namespaces:")
+    for namespace, parent, watermark, created in read_namespaces():
+        print(f"  {namespace:<20} forked from {parent or '(main floor)'} at {created}, sharing logs up to id {watermark}")
+    print("Snapshots:")
+    for manifest in sorted(glob.glob(os.path.join(SNAPSHOTS_DIR, "*", "manifest.json"))):
+        with open(manifest) as f:
+            created = json.load(f)["created"]
+        print(f"  {os.path.basename(os.path.dirname(manifest)):<20} taken at {created}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Snapshot, restore and fork the trading floor")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("snapshot").add_argument("label")
+    commands.add_parser("restore").add_argument("label")
+    fork_parser = commands.add_parser("fork")
+    fork_parser.add_argument("namespace")
+    fork_parser.add_argument("--parent", default=NAMESPACE)
+    commands.add_parser("drop").add_argument("namespace")
+    commands.add_parser("list")
+    args = parser.parse_args()
+    migrate()
+    if args.command == "snapshot":
+        print(f"Snapshot written to {snapshot(args.label)}")
+    elif args.command == "restore":
+        restore(args.label)
+        print(f"Restored {args.label}")
+    elif args.command == "fork":
+        fork(args.namespace, args.parent)
+        print(f"Forked {args.namespace}; run with TRADING_NAMESPACE={args.namespace}")
+    elif args.command == "drop":
+        drop(args.namespace)
+        print(f"Dropped {args.namespace}")
+    else:
+        list_all()
@@ -22,6 +22,8 @@ Make use of your knowledge graph tools to store and recall entity information; u
 you have worked on previously, and store new information about companies, stocks and market conditions.
 Also use it to store web addresses that you find interesting so you can check them later.
 Draw on your knowledge graph to build your expertise over time.
+Mark an entity as shared when it's a fact about a company or the market that other traders would benefit from;
+shared entities are visible to every trader.
 
 If there isn't a specific request, then just respond with investment opportunities based on searching latest news.
 The current datetime is {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
@@ -0,0 +1,46 @@
+import asyncio
+import os
+import sqlite3
+import tempfile
+import unittest
+import database
+from database import DB
+from log_feed import LogFeed, READ_BATCH
+
+
+class TestLogFeed(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(directory.name)
+        database.migrate()
+        database.write_log("warren", "trace", "Before the burst")
+
+    def test_reads_a_burst_larger_than_one_batch(self):
+        burst = 2 * READ_BATCH + 500
+
+        async def run():
+            feed = LogFeed(poll_seconds=0.01)
+            feed.start()
+            feed.load("warren")
+            with sqlite3.connect(DB) as conn:
+                conn.executemany(
+                    "INSERT INTO logs (name, datetime, type, message) VALUES ('warren', '2026-01-01 10:00:00', 'trace', ?)",
+                    [(f"Entry {i}",) for i in range(burst)],
+                )
+                last_id = conn.execute("SELECT MAX(id) FROM logs").fetchone()[0]
+            for _ in range(500):
+                if feed.last_id == last_id:
+                    break
+                await asyncio.sleep(0.01)
+            feed.task.cancel()
+            return feed, last_id
+
+        feed, last_id = asyncio.run(run())
+        self.assertEqual(feed.last_id, last_id)
+        self.assertEqual(feed.logs["warren"][-1][2], f"Entry {burst - 1}")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+import httpx
+from openai import AsyncOpenAI
+from agents import Agent, Runner, OpenAIChatCompletionsModel, set_trace_processors, set_tracing_disabled, trace
+from agents.tracing import TracingProcessor
+import model_router
+from model_router import RoutedModel, is_hedge_loser, stats_for
+
+STUB_SERVER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "stub_llm", "stub_server.py")
+
+# Each fake provider is a model name the stub answers in its own way
+SCRIPT = {
+    "rules": [
+        {"model": "^slow$", "content": "slow", "latency": "fixed:3"},
+        {"model": "^fast$", "content": "fast", "latency": "fixed:0.05"},
+        {"model": "^late-failing$", "status": 500, "latency": "fixed:0.5"},
+        {"model": "^failing", "status": 500, "latency": "fixed:0"},
+    ]
+}
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class GenerationSpans(TracingProcessor):
+    """Records, for each model span that ends, whether it belonged to a hedged request that lost"""
+
+    def __init__(self):
+        self.ended = []
+
+    def on_trace_start(self, trace):
+        pass
+
+    def on_trace_end(self, trace):
+        pass
+
+    def on_span_start(self, span):
+        pass
+
+    def on_span_end(self, span):
+        if span.span_data.type == "generation":
+            self.ended.append((span.span_data.model, is_hedge_loser()))
+
+    def shutdown(self):
+        pass
+
+    def force_flush(self):
+        pass
+
+
+class TestRoutedModel(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.script = tempfile.NamedTemporaryFile("w", suffix=".json", delete=False)
+        json.dump(SCRIPT, cls.script)
+        cls.script.close()
+        port = free_port()
+        cls.server = subprocess.Popen(
+            [sys.executable, STUB_SERVER, "--port", str(port), "--script", cls.script.name], stderr=subprocess.DEVNULL
+        )
+        cls.base_url = f"http://127.0.0.1:{port}/v1"
+        for _ in range(100):
+            try:
+                httpx.get(f"{cls.base_url}/models")
+                break
+            except httpx.TransportError:
+                time.sleep(0.1)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.terminate()
+        cls.server.wait()
+        os.unlink(cls.script.name)
+
+    def setUp(self):
+        model_router.provider_stats.clear()
+        set_tracing_disabled(True)
+
+    def candidate(self, name: str):
+        client = AsyncOpenAI(base_url=self.base_url, api_key="stub", max_retries=0)
+        return name, OpenAIChatCompletionsModel(model=name, openai_client=client)
+
+    def ask(self, names: list[str], hedge: bool) -> tuple[str, float]:
+        agent = Agent(name="Trader", instructions="Answer briefly", model=RoutedModel([self.candidate(n) for n in names], hedge))
+        start = time.perf_counter()
+        result = asyncio.run(Runner.run(agent, "What should I buy?"))
+        return result.final_output, time.perf_counter() - start
+
+    def test_slow_primary_is_hedged(self):
+        with mock.patch.object(model_router, "DEFAULT_HEDGE_AFTER_SECONDS", 0.2):
+            answer, seconds = self.ask(["slow", "fast"], hedge=True)
+        self.assertEqual(answer, "fast")
+        self.assertLess(seconds, 2)
+
+    def test_failing_primary_fails_over(self):
+        answer, _ = self.ask(["failing", "fast"], hedge=False)
+        self.assertEqual(answer, "fast")
+        self.assertEqual(stats_for("failing").error_rate(), 1.0)
+
+    def test_failure_starts_next_candidate_while_a_hedge_is_pending(self):
+        # The primary hedges after its p95 of 0.2s and fails at 0.5s, while the hedge is still waiting on a slow reply
+        for _ in range(model_router.MIN_SAMPLES):
+            stats_for("late-failing").record_success(0.2)
+        with mock.patch.object(model_router, "DEFAULT_HEDGE_AFTER_SECONDS", 2.0):
+            answer, seconds = self.ask(["late-failing", "slow", "fast"], hedge=True)
+        self.assertEqual(answer, "fast")
+        self.assertLess(seconds, 1.5)
+
+    def test_all_candidates_failing_raises(self):
+        for hedge in (False, True):
+            with self.subTest(hedge=hedge), self.assertRaises(Exception):
+                self.ask(["failing", "failing-too"], hedge=hedge)
+
+    def test_hedge_losers_are_marked(self):
+        spans = GenerationSpans()
+        set_tracing_disabled(False)
+        set_trace_processors([spans])
+        self.addCleanup(set_trace_processors, [])
+        with mock.patch.object(model_router, "DEFAULT_HEDGE_AFTER_SECONDS", 0.2):
+            with trace("hedging"):
+                answer, _ = self.ask(["slow", "fast"], hedge=True)
+        self.assertEqual(answer, "fast")
+        self.assertIn(("fast", False), spans.ended)
+        self.assertIn(("slow", True), spans.ended)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import asyncio
+import importlib
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+from unittest import mock
+import mcp
+from mcp.client.stdio import stdio_client
+import database
+import snapshots
+from accounts import Account
+from database import DB, account_key
+
+ACCOUNTS_SERVER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "accounts_server.py")
+
+
+def account_row(name: str, namespace: str) -> str | None:
+    with sqlite3.connect(DB) as conn:
+        row = conn.execute("SELECT account FROM accounts WHERE name = ?", (account_key(name, namespace),)).fetchone()
+    return row[0] if row else None
+
+
+class TestNamespaces(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(directory.name)
+        database.migrate()
+        database._lineages.clear()
+        Account.get("Warren")
+        snapshots.fork("whatif")
+
+    def test_forked_trade_leaves_main_floor_alone(self):
+        main_before = account_row("warren", "")
+        with mock.patch.dict(os.environ, {"TRADING_NAMESPACE": "whatif"}):
+            import accounts_client
+            import mcp_params
+
+            importlib.reload(accounts_client)
+            importlib.reload(mcp_params)
+        # The environment is back to normal here, so reloading again puts the modules back on the main floor
+        self.addCleanup(importlib.reload, accounts_client)
+        self.addCleanup(importlib.reload, mcp_params)
+        for server in mcp_params.trader_mcp_server_params[:2]:
+            self.assertEqual(server["env"], {"TRADING_NAMESPACE": "whatif"})
+        # The client's own parameters, environment and all, but run with this Python from the test's directory
+        params = accounts_client.params.model_copy(update={"command": sys.executable, "args": [ACCOUNTS_SERVER], "cwd": os.getcwd()})
+
+        async def buy():
+            async with stdio_client(params) as streams:
+                async with mcp.ClientSession(*streams) as session:
+                    await session.initialize()
+                    await session.call_tool(
+                        "buy_shares", {"name": "Warren", "symbol": "AAPL", "quantity": 1, "rationale": "A test"}
+                    )
+
+        asyncio.run(buy())
+        self.assertEqual(account_row("warren", ""), main_before)
+        self.assertIn("AAPL", json.loads(account_row("warren", "whatif"))["holdings"])
+
+    def test_restore_removes_forks_made_after_the_snapshot(self):
+        snapshots.snapshot("before")
+        snapshots.fork("later")
+        Account.get("Charlie")
+        snapshots.restore("before")
+        database._lineages.clear()
+        self.assertEqual([row[0] for row in database.read_namespaces()], ["whatif"])
+        self.assertTrue(os.path.isdir(snapshots.memory_dir("whatif")))
+        self.assertFalse(os.path.exists(snapshots.memory_dir("later")))
+        self.assertIsNone(account_row("warren", "later"))
+        self.assertIsNone(account_row("charlie", ""))
+
+
+if __name__ == "__main__":
+    unittest.main()
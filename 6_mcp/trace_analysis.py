@@ -0,0 +1,93 @@
+from database import read_spans, read_trace_ids
+from datetime import datetime
+
+RESEARCHER = "Researcher"
+
+
+def seconds(span: dict) -> float:
+    if not span["started"] or not span["ended"]:
+        return 0.0
+    return (datetime.fromisoformat(span["ended"]) - datetime.fromisoformat(span["started"])).total_seconds()
+
+
+def category_of(span: dict) -> str:
+    if span["type"] in ("generation", "response"):
+        return "llm"
+    elif span["type"] == "function" and span["server"]:
+        return "mcp_tool"
+    elif span["type"] == "function":
+        return "tool"
+    elif span["type"] == "mcp_tools":
+        return "mcp_list_tools"
+    else:
+        return "orchestration"
+
+
+def build_tree(spans: list[dict]) -> tuple[dict, dict[str, list[dict]]]:
+    """Return the root span of the trace and a map from span_id to its children"""
+    children = {}
+    root = None
+    for span in spans:
+        if span["type"] == "trace":
+            root = span
+        else:
+            children.setdefault(span["parent_id"], []).append(span)
+    return root, children
+
+
+def critical_path(span: dict, children: dict[str, list[dict]], inside_researcher: bool = False) -> list[tuple[dict, float, bool]]:
+    """
+    Walk back from the end of a span, repeatedly taking the child that finished last before the cursor.
+    Returns (span, self_seconds, inside_researcher) for each span on the critical path, where self_seconds
+    is the time not covered by critical children.
+    """
+    inside_researcher = inside_researcher or (span["type"] in ("agent", "function") and span["span_name"] == RESEARCHER)
+    if not span["ended"]:
+        return [(span, 0.0, inside_researcher)]
+    cursor = datetime.fromisoformat(span["ended"])
+    start = datetime.fromisoformat(span["started"]) if span["started"] else cursor
+    candidates = sorted(
+        [child for child in children.get(span["span_id"], []) if child["ended"] and child["started"]],
+        key=lambda child: child["ended"],
+        reverse=True,
+    )
+    path = []
+    covered = 0.0
+    for child in candidates:
+        child_end = datetime.fromisoformat(child["ended"])
+        child_start = datetime.fromisoformat(child["started"])
+        if child_end <= cursor and child_start >= start:
+            path.extend(critical_path(child, children, inside_researcher))
+            covered += seconds(child)
+            cursor = child_start
+    return [(span, max(seconds(span) - covered, 0.0), inside_researcher)] + path
+
+
+def breakdown(trace_id: str) -> dict[str, float]:
+    """
+    Seconds on the critical path of a trader run by category: llm, mcp_tool, tool, mcp_list_tools and orchestration,
+    with the researcher sub-agent's share reported under "researcher.<category>" as well as in total as "researcher".
+    """
+    root, children = build_tree(read_spans(trace_id))
+    if not root:
+        return {}
+    result = {"total": seconds(root)}
+    for span, self_seconds, inside_researcher in critical_path(root, children):
+        category = category_of(span)
+        if inside_researcher:
+            category = f"researcher.{category}"
+            result["researcher"] = result.get("researcher", 0.0) + self_seconds
+        result[category] = result.get(category, 0.0) + self_seconds
+    return {key: round(value, 3) for key, value in result.items()}
+
+
+def slowest_spans(trace_id: str, n: int = 10) -> list[tuple[str, str, float]]:
+    """The n longest spans in a trace as (type, name, seconds)"""
+    spans = [span for span in read_spans(trace_id) if span["type"] != "trace"]
+    spans.sort(key=seconds, reverse=True)
+    return [(span["type"], span["span_name"] or span["server"] or "", round(seconds(span), 3)) for span in spans[:n]]
+
+
+def recent_breakdowns(name: str, last_n: int = 10) -> list[dict[str, float]]:
+    """Critical-path breakdowns for a trader's most recent runs, most recent first"""
+    return [{"trace_id": trace_id, **breakdown(trace_id)} for trace_id in read_trace_ids(name, last_n)]
@@ -1,9 +1,14 @@
 from agents import TracingProcessor, Trace, Span
-from database import write_log
+from database import write_log, write_spans
+from datetime import datetime, timezone
+import threading
 import secrets
 import string
+import json
 
 ALPHANUM = string.ascii_lowercase + string.digits 
+SPAN_BATCH_SIZE = 50
+MAX_ATTRIBUTE_CHARS = 500
 
 def make_trace_id(tag: str) -> str:
     """
@@ -15,15 +20,21 @@ def make_trace_id(tag: str) -> str:
     random_suffix = ''.join(secrets.choice(ALPHANUM) for _ in range(pad_len))
     return f"trace_{tag}{random_suffix}"
 
+def get_trader_name(trace_or_span: Trace | Span) -> str | None:
+    """
+    Recover the tag passed to make_trace_id, or None if this trace wasn't made by a trader.
+    """
+    trace_id = trace_or_span.trace_id
+    name = trace_id.split("_")[1]
+    if '0' in name:
+        return name.split("0")[0]
+    else:
+        return None
+
 class LogTracer(TracingProcessor):
 
     def get_name(self, trace_or_span: Trace | Span) -> str | None:
-        trace_id = trace_or_span.trace_id
-        name = trace_id.split("_")[1]
-        if '0' in name:
-            return name.split("0")[0]
-        else:
-            return None
+        return get_trader_name(trace_or_span)
 
     def on_trace_start(self, trace) -> None:
         name = self.get_name(trace)
@@ -72,4 +83,101 @@ class LogTracer(TracingProcessor):
         pass
 
     def shutdown(self) -> None:
-        pass
\ No newline at end of file
+        pass
+
+
+class SpanTracer(TracingProcessor):
+    """
+    Records every trace and span of a trader run as a row in the spans table, with parent ids and timestamps.
+    The trace itself is stored as the root span, so top-level spans have the trace_id as their parent.
+    Rows are buffered and written in batches, and always flushed when a trace ends.
+    """
+
+    def __init__(self, batch_size: int = SPAN_BATCH_SIZE):
+        self.batch_size = batch_size
+        self.buffer: list[dict] = []
+        self.trace_starts: dict[str, str] = {}
+        self.lock = threading.Lock()
+
+    def now(self) -> str:
+        return datetime.now(timezone.utc).isoformat()
+
+    def attributes(self, span: Span) -> dict:
+        exported = dict(span.span_data.export()) if span.span_data else {}
+        for key in ("type", "name", "server"):
+            exported.pop(key, None)
+        for key, value in exported.items():
+            if value is not None and not isinstance(value, (int, float, bool)):
+                text = value if isinstance(value, str) else json.dumps(value, default=str)
+                if len(text) > MAX_ATTRIBUTE_CHARS:
+                    exported[key] = text[:MAX_ATTRIBUTE_CHARS] + "..."
+        return exported
+
+    def add(self, row: dict, flush: bool = False) -> None:
+        with self.lock:
+            self.buffer.append(row)
+            if not flush and len(self.buffer) < self.batch_size:
+                return
+            rows, self.buffer = self.buffer, []
+        try:
+            write_spans(rows)
+        except Exception as e:
+            print(f"Unable to write {len(rows)} spans: {e}")
+
+    def on_trace_start(self, trace) -> None:
+        if get_trader_name(trace):
+            self.trace_starts[trace.trace_id] = self.now()
+
+    def on_trace_end(self, trace) -> None:
+        name = get_trader_name(trace)
+        if name:
+            row = {
+                "span_id": trace.trace_id,
+                "trace_id": trace.trace_id,
+                "parent_id": None,
+                "name": name,
+                "type": "trace",
+                "span_name": trace.name,
+                "server": None,
+                "started": self.trace_starts.pop(trace.trace_id, None),
+                "ended": self.now(),
+                "error": None,
+                "attributes": None,
+            }
+            self.add(row, flush=True)
+
+    def on_span_start(self, span) -> None:
+        pass
+
+    def on_span_end(self, span) -> None:
+        name = get_trader_name(span)
+        if not name:
+            return
+        span_data = span.span_data
+        server = getattr(span_data, "server", None)
+        mcp_data = getattr(span_data, "mcp_data", None)
+        if not server and mcp_data:
+            server = mcp_data.get("server")
+        row = {
+            "span_id": span.span_id,
+            "trace_id": span.trace_id,
+            "parent_id": span.parent_id or span.trace_id,
+            "name": name,
+            "type": span_data.type if span_data else "span",
+            "span_name": getattr(span_data, "name", None),
+            "server": server,
+            "started": span.started_at,
+            "ended": span.ended_at,
+            "error": json.dumps(span.error) if span.error else None,
+            "attributes": json.dumps(self.attributes(span), default=str),
+        }
+        self.add(row)
+
+    def force_flush(self) -> None:
+        with self.lock:
+            rows, self.buffer = self.buffer, []
+        if rows:
+            write_spans(rows)
+
+    def shutdown(self) -> None:
+        self.force_flush()
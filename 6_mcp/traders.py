@@ -1,12 +1,12 @@
 from contextlib import AsyncExitStack
-from accounts_client import read_accounts_resource, read_strategy_resource
+from accounts_client import read_summary_resource, read_strategy_resource
 from tracers import make_trace_id
-from agents import Agent, Tool, Runner, OpenAIChatCompletionsModel, trace
+from model_router import RoutedModel
+from agents import Agent, Tool, Runner, OpenAIChatCompletionsModel, trace, set_default_openai_client
 from openai import AsyncOpenAI
 from dotenv import load_dotenv
 import os
-import json
-from agents.mcp import MCPServerStdio
+from agents.mcp import MCPServerStdio, MCPServerStreamableHttp
 from templates import (
     researcher_instructions,
     trader_instructions,
@@ -16,6 +16,8 @@ from templates import (
 )
 from mcp_params import trader_mcp_server_params, researcher_mcp_server_params
 
+from shared.replay_cache import REPLAY_MODE, async_http_client
+
 load_dotenv(override=True)
 
 deepseek_api_key = os.getenv("DEEPSEEK_API_KEY")
@@ -23,32 +25,80 @@ google_api_key = os.getenv("GOOGLE_API_KEY")
 grok_api_key = os.getenv("GROK_API_KEY")
 openrouter_api_key = os.getenv("OPENROUTER_API_KEY")
 
-DEEPSEEK_BASE_URL = "https://api.deepseek.com/v1"
-GROK_BASE_URL = "https://api.x.ai/v1"
-GEMINI_BASE_URL = "https://generativelanguage.googleapis.com/v1beta/openai/"
-OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
+DEEPSEEK_BASE_URL = os.getenv("DEEPSEEK_BASE_URL", "https://api.deepseek.com/v1")
+GROK_BASE_URL = os.getenv("GROK_BASE_URL", "https://api.x.ai/v1")
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL", "https://generativelanguage.googleapis.com/v1beta/openai/")
+OPENROUTER_BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
 
 MAX_TURNS = 30
 
-openrouter_client = AsyncOpenAI(base_url=OPENROUTER_BASE_URL, api_key=openrouter_api_key)
-deepseek_client = AsyncOpenAI(base_url=DEEPSEEK_BASE_URL, api_key=deepseek_api_key)
-grok_client = AsyncOpenAI(base_url=GROK_BASE_URL, api_key=grok_api_key)
-gemini_client = AsyncOpenAI(base_url=GEMINI_BASE_URL, api_key=google_api_key)
+HEDGE_MODEL_REQUESTS = os.getenv("HEDGE_MODEL_REQUESTS", "false").strip().lower() == "true"
 
+# Equivalent models to fail over to, in order of preference, if a provider is slow or failing
 
-def get_model(model_name: str):
+FALLBACK_MODELS = {
+    "deepseek-chat": ["deepseek/deepseek-chat-v3-0324", "gpt-4.1-mini"],
+    "gemini-2.5-flash-preview-04-17": ["google/gemini-2.5-flash-preview", "gpt-4.1-mini"],
+    "grok-3-mini-beta": ["x-ai/grok-3-mini-beta", "gpt-4.1-mini"],
+}
+
+openrouter_client = AsyncOpenAI(base_url=OPENROUTER_BASE_URL, api_key=openrouter_api_key, http_client=async_http_client())
+deepseek_client = AsyncOpenAI(base_url=DEEPSEEK_BASE_URL, api_key=deepseek_api_key, http_client=async_http_client())
+grok_client = AsyncOpenAI(base_url=GROK_BASE_URL, api_key=grok_api_key, http_client=async_http_client())
+gemini_client = AsyncOpenAI(base_url=GEMINI_BASE_URL, api_key=google_api_key, http_client=async_http_client())
+openai_client = AsyncOpenAI(http_client=async_http_client())
+
+# Models given by name use the SDK's default client, so it needs to go through the replay cache too
+if REPLAY_MODE != "passthrough":
+    set_default_openai_client(openai_client, use_for_tracing=False)
+
+
+def get_provider(model_name: str) -> str:
     if "/" in model_name:
-        return OpenAIChatCompletionsModel(model=model_name, openai_client=openrouter_client)
+        return "openrouter"
     elif "deepseek" in model_name:
-        return OpenAIChatCompletionsModel(model=model_name, openai_client=deepseek_client)
+        return "deepseek"
     elif "grok" in model_name:
-        return OpenAIChatCompletionsModel(model=model_name, openai_client=grok_client)
+        return "grok"
     elif "gemini" in model_name:
-        return OpenAIChatCompletionsModel(model=model_name, openai_client=gemini_client)
+        return "gemini"
+    else:
+        return "openai"
+
+
+clients = {
+    "openrouter": openrouter_client,
+    "deepseek": deepseek_client,
+    "grok": grok_client,
+    "gemini": gemini_client,
+    "openai": openai_client,
+}
+
+
+def get_chat_model(model_name: str) -> OpenAIChatCompletionsModel:
+    client = clients[get_provider(model_name)]
+    return OpenAIChatCompletionsModel(model=model_name, openai_client=client)
+
+
+def get_model(model_name: str):
+    if model_name in FALLBACK_MODELS:
+        candidates = [
+            (get_provider(name), get_chat_model(name))
+            for name in [model_name] + FALLBACK_MODELS[model_name]
+        ]
+        return RoutedModel(candidates, hedge=HEDGE_MODEL_REQUESTS)
+    elif get_provider(model_name) != "openai":
+        return get_chat_model(model_name)
     else:
         return model_name
 
 
+def make_mcp_server(params: dict):
+    if "url" in params:
+        return MCPServerStreamableHttp(params, client_session_timeout_seconds=120, cache_tools_list=True)
+    return MCPServerStdio(params, client_session_timeout_seconds=120, cache_tools_list=True)
+
+
 async def get_researcher(mcp_servers, model_name) -> Agent:
     researcher = Agent(
         name="Researcher",
@@ -84,10 +134,7 @@ class Trader:
         return self.agent
 
     async def get_account_report(self) -> str:
-        account = await read_accounts_resource(self.name)
-        account_json = json.loads(account)
-        account_json.pop("portfolio_value_time_series", None)
-        return json.dumps(account_json)
+        return await read_summary_resource(self.name)
 
     async def run_agent(self, trader_mcp_servers, researcher_mcp_servers):
         self.agent = await self.create_agent(trader_mcp_servers, researcher_mcp_servers)
@@ -103,16 +150,12 @@ class Trader:
     async def run_with_mcp_servers(self):
         async with AsyncExitStack() as stack:
             trader_mcp_servers = [
-                await stack.enter_async_context(
-                    MCPServerStdio(params, client_session_timeout_seconds=120)
-                )
+                await stack.enter_async_context(make_mcp_server(params))
                 for params in trader_mcp_server_params
             ]
             async with AsyncExitStack() as stack:
                 researcher_mcp_servers = [
-                    await stack.enter_async_context(
-                        MCPServerStdio(params, client_session_timeout_seconds=120)
-                    )
+                    await stack.enter_async_context(make_mcp_server(params))
                     for params in researcher_mcp_server_params(self.name)
                 ]
                 await self.run_agent(trader_mcp_servers, researcher_mcp_servers)
@@ -1,9 +1,12 @@
 from traders import Trader
 from typing import List
 import asyncio
-from tracers import LogTracer
+from tracers import LogTracer, SpanTracer
+from metrics import MetricsTracer
 from agents import add_trace_processor
 from market import is_market_open
+from database import migrate
+from integrity import verify_every_n_seconds
 from dotenv import load_dotenv
 import os
 
@@ -39,8 +42,12 @@ def create_traders() -> List[Trader]:
 
 
 async def run_every_n_minutes():
+    migrate()
     add_trace_processor(LogTracer())
+    add_trace_processor(MetricsTracer())
+    add_trace_processor(SpanTracer())
     traders = create_traders()
+    verifier = asyncio.create_task(verify_every_n_seconds(names))
     while True:
         if RUN_EVEN_WHEN_MARKET_IS_CLOSED or is_market_open():
             await asyncio.gather(*[trader.run() for trader in traders])
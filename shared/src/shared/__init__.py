@@ -0,0 +1,5 @@
+"""
+Modules that more than one project in this repo uses, kept here once rather than copied into each project.
+
+This is a package in the repo's uv workspace, so `uv run` from any project installs it and it's imported as usual.
+"""
@@ -0,0 +1,233 @@
+"""
+A notification outbox for Pushover.
+
+push() stores the message in a small SQLite outbox and returns immediately. A background thread
+delivers it over a pooled HTTP session, retrying with exponential backoff and respecting a rate limit.
+Messages that arrive in a burst are coalesced into a single digest. flush() sends whatever is still gathering at once,
+and anything not yet delivered when the process exits is picked up the next time an outbox is started against the
+same database.
+
+Several processes may share one database, as the traders' push servers do. A worker claims the rows it is about to
+send by leasing them, so no two workers send the same message; if a worker dies mid-send, its lease runs out and
+another worker sends the rows instead.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import atexit
+import requests
+from dotenv import load_dotenv
+
+load_dotenv(override=True)
+
+PUSHOVER_URL = os.getenv("PUSHOVER_URL", "https://api.pushover.net/1/messages.json")
+NOTIFICATIONS_DB = os.getenv("NOTIFICATIONS_DB", "notifications.db")
+
+TIMEOUT_SECONDS = 10
+COALESCE_SECONDS = 2.0
+MIN_SECONDS_BETWEEN_SENDS = 1.0
+RETRY_BASE_SECONDS = 2.0
+RETRY_MAX_SECONDS = 300.0
+MAX_ATTEMPTS = 8
+MAX_MESSAGE_CHARS = 1024
+FLUSH_ON_EXIT_SECONDS = 5.0
+LEASE_SECONDS = 3 * TIMEOUT_SECONDS
+
+
+class Outbox:
+    def __init__(self, url: str = PUSHOVER_URL, db: str = NOTIFICATIONS_DB, user: str | None = None, token: str | None = None):
+        self.url = url
+        self.db = db
+        self.user = user or os.getenv("PUSHOVER_USER")
+        self.token = token or os.getenv("PUSHOVER_TOKEN")
+        self.wake = threading.Event()
+        self.lock = threading.Lock()
+        self.thread = None
+        self.session = None
+        self.last_send = 0.0
+        with sqlite3.connect(self.db) as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS outbox (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    message TEXT,
+                    created REAL,
+                    attempts INTEGER DEFAULT 0,
+                    next_attempt REAL,
+                    status TEXT DEFAULT 'pending',
+                    lease_until REAL
+                )
+            ''')
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(outbox)")]
+            if "lease_until" not in columns:
+                conn.execute("ALTER TABLE outbox ADD COLUMN lease_until REAL")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_outbox_pending ON outbox (status, next_attempt)")
+
+    def push(self, message: str) -> None:
+        """Queue a message for delivery and return straight away; it's sent after a short window to gather bursts"""
+        now = time.time()
+        with sqlite3.connect(self.db) as conn:
+            conn.execute(
+                "INSERT INTO outbox (message, created, next_attempt) VALUES (?, ?, ?)",
+                (message, now, now + COALESCE_SECONDS),
+            )
+        self.start()
+        self.wake.set()
+
+    def start(self) -> None:
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name="notification-outbox", daemon=True)
+                self.thread.start()
+
+    def pending(self) -> tuple[int, float | None]:
+        """The number of undelivered messages, and when the next one is due or its lease runs out"""
+        with sqlite3.connect(self.db) as conn:
+            return conn.execute(
+                """
+                SELECT COUNT(*), MIN(CASE status WHEN 'pending' THEN next_attempt ELSE lease_until END)
+                FROM outbox WHERE status IN ('pending', 'sending')
+                """
+            ).fetchone()
+
+    def claim(self) -> list[tuple[int, str, int]]:
+        """
+        Lease the messages that are due now, along with any that fall due within the coalescing window, and any whose
+        lease has run out. A single UPDATE, so two workers on the same database never claim the same row.
+        """
+        now = time.time()
+        with sqlite3.connect(self.db) as conn:
+            rows = conn.execute(
+                """
+                UPDATE outbox SET status = 'sending', lease_until = ?
+                WHERE (status = 'pending' AND next_attempt <= ?) OR (status = 'sending' AND lease_until <= ?)
+                RETURNING id, message, attempts
+                """,
+                (now + LEASE_SECONDS, now + COALESCE_SECONDS, now),
+            ).fetchall()
+        return sorted(rows)
+
+    def run(self) -> None:
+        while True:
+            count, next_attempt = self.pending()
+            if not count:
+                self.wake.wait()
+                self.wake.clear()
+                continue
+            delay = next_attempt - time.time()
+            if delay > 0:
+                self.wake.wait(timeout=delay)
+                self.wake.clear()
+                continue
+            wait = self.last_send + MIN_SECONDS_BETWEEN_SENDS - time.time()
+            if wait > 0:
+                time.sleep(wait)
+            try:
+                self.deliver(self.claim())
+            except Exception as e:
+                print(f"Notification outbox error: {e}")
+                time.sleep(RETRY_BASE_SECONDS)
+
+    def digest(self, rows: list[tuple[int, str, int]]) -> tuple[list[tuple[int, str, int]], str]:
+        """Take as many due messages as fit in one push, and combine them if there's more than one"""
+        if len(rows) == 1:
+            return rows, rows[0][1][:MAX_MESSAGE_CHARS]
+        batch, lines = [], []
+        for row in rows:
+            line = f"- {row[1]}"
+            header = f"{len(batch) + 1} notifications:\n"
+            if batch and len(header) + sum(len(l) + 1 for l in lines) + len(line) > MAX_MESSAGE_CHARS:
+                break
+            batch.append(row)
+            lines.append(line)
+        if len(batch) == 1:
+            return batch, batch[0][1][:MAX_MESSAGE_CHARS]
+        return batch, f"{len(batch)} notifications:\n" + "\n".join(lines)
+
+    def deliver(self, rows: list[tuple[int, str, int]]) -> None:
+        """Send one push from the claimed rows, and hand back the rows it had no room for"""
+        if not rows:
+            return
+        if self.session is None:
+            self.session = requests.Session()
+        batch, message = self.digest(rows)
+        self.release([row[0] for row in rows[len(batch):]])
+        self.last_send = time.time()
+        try:
+            payload = {"user": self.user, "token": self.token, "message": message}
+            response = self.session.post(self.url, data=payload, timeout=TIMEOUT_SECONDS)
+            delivered = response.ok
+            if not delivered:
+                print(f"Push notification failed with status {response.status_code}")
+        except requests.RequestException as e:
+            print(f"Push notification failed: {e}")
+            delivered = False
+        if delivered:
+            self.remove([row[0] for row in batch])
+        else:
+            self.schedule_retry(batch)
+
+    def release(self, ids: list[int]) -> None:
+        with sqlite3.connect(self.db) as conn:
+            conn.executemany(
+                "UPDATE outbox SET status = 'pending', lease_until = NULL WHERE id = ? AND status = 'sending'",
+                [(id,) for id in ids],
+            )
+
+    def remove(self, ids: list[int]) -> None:
+        with sqlite3.connect(self.db) as conn:
+            conn.executemany("DELETE FROM outbox WHERE id = ?", [(id,) for id in ids])
+
+    def schedule_retry(self, batch: list[tuple[int, str, int]]) -> None:
+        now = time.time()
+        updates = []
+        for id, _, attempts in batch:
+            attempts += 1
+            delay = min(RETRY_BASE_SECONDS * 2 ** attempts, RETRY_MAX_SECONDS)
+            status = "failed" if attempts >= MAX_ATTEMPTS else "pending"
+            updates.append((attempts, now + delay, status, id))
+        with sqlite3.connect(self.db) as conn:
+            conn.executemany(
+                "UPDATE outbox SET attempts = ?, next_attempt = ?, status = ?, lease_until = NULL WHERE id = ?", updates
+            )
+
+    def flush(self, timeout: float = FLUSH_ON_EXIT_SECONDS) -> bool:
+        """
+        Send what's still gathering in the coalescing window now, and wait up to timeout seconds for messages that are
+        due to be delivered; True if none are left. Messages waiting to retry keep their backoff.
+        """
+        now = time.time()
+        with sqlite3.connect(self.db) as conn:
+            conn.execute(
+                "UPDATE outbox SET next_attempt = ? WHERE status = 'pending' AND attempts = 0 AND next_attempt > ?",
+                (now, now),
+            )
+        self.start()
+        deadline = now + timeout
+        while time.time() < deadline:
+            count, next_attempt = self.pending()
+            if not count or next_attempt > deadline:
+                return not count
+            self.wake.set()
+            time.sleep(0.1)
+        return False
+
+
+_outbox = None
+_outbox_lock = threading.Lock()
+
+
+def get_outbox() -> Outbox:
+    global _outbox
+    with _outbox_lock:
+        if _outbox is None:
+            _outbox = Outbox()
+            _outbox.start()
+            atexit.register(_outbox.flush)
+        return _outbox
+
+
+def push(message: str) -> None:
+    """Send a push notification without waiting for it to be delivered"""
+    get_outbox().push(message)
@@ -0,0 +1,183 @@
+"""
+Record and replay LLM calls, so that re-running an agent with the same inputs doesn't pay for the same calls again.
+
+This sits under the model clients as an httpx transport. Each POST is keyed by a hash of its URL and JSON body
+(model, messages, tools and settings), with timestamps in the prompts and the results of tool calls normalized so
+today's run matches yesterday's.
+Responses, including streamed ones, are kept in a content-addressed store of one file per key.
+
+Set REPLAY_MODE to:
+- passthrough (the default): no caching at all
+- record: call the API as usual and store every response, replacing what was stored before
+- replay: answer only from the store; a request that was never recorded fails with a 404 rather than calling the API
+"""
+
+import hashlib
+import json
+import os
+import re
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv(override=True)
+
+REPLAY_MODE = os.getenv("REPLAY_MODE", "passthrough").strip().lower()
+REPLAY_CACHE = os.getenv("REPLAY_CACHE", ".replay_cache")
+MODES = ("passthrough", "record", "replay")
+TIMEOUT = httpx.Timeout(600, connect=10)
+
+DATETIME = re.compile(r"\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}(:\d{2}(\.\d+)?)?")
+VOLATILE_FIELDS = {"user", "metadata", "store", "prompt_cache_key"}
+TOOL_OUTPUT = "<tool output>"
+
+
+def tool_output_field(message: dict) -> str | None:
+    """Where a tool's result sits in a message, in the Chat Completions, Responses or Anthropic format"""
+    if message.get("role") == "tool":
+        return "content"
+    if message.get("type") == "function_call_output":
+        return "output"
+    if message.get("type") == "tool_result":
+        return "content"
+    return None
+
+
+def normalize(value):
+    """
+    The parts of a request body that decide the response, with datetimes blanked out. What tools returned is blanked
+    too: quotes and clocks change from run to run, and the tool calls before them already tell one request from another.
+    """
+    if isinstance(value, dict):
+        output = tool_output_field(value)
+        return {
+            key: TOOL_OUTPUT if key == output else normalize(item) for key, item in value.items() if key not in VOLATILE_FIELDS
+        }
+    if isinstance(value, list):
+        return [normalize(item) for item in value]
+    if isinstance(value, str):
+        return DATETIME.sub("<datetime>", value)
+    return value
+
+
+class ReplayStore:
+    """Responses stored by request hash, as <root>/<first two characters>/<hash>.json"""
+
+    def __init__(self, root: str = REPLAY_CACHE):
+        self.root = root
+
+    def key(self, request: httpx.Request) -> tuple[str, dict]:
+        try:
+            body = json.loads(request.content) if request.content else None
+        except ValueError:
+            body = request.content.decode(errors="replace")
+        keyed = {"method": request.method, "url": f"{request.url.host}{request.url.path}", "body": normalize(body)}
+        canonical = json.dumps(keyed, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(canonical.encode()).hexdigest(), keyed
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], f"{key}.json")
+
+    def load(self, key: str) -> dict | None:
+        try:
+            with open(self.path(key)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def save(self, key: str, keyed: dict, response: httpx.Response, content: bytes) -> None:
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        entry = {
+            "request": keyed,
+            "status": response.status_code,
+            "content_type": response.headers.get("content-type", "application/json"),
+            "body": content.decode(),
+        }
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "w") as f:
+            json.dump(entry, f)
+        os.replace(temporary, path)
+
+    def cached(self, key: str, request: httpx.Request) -> httpx.Response:
+        entry = self.load(key)
+        if entry is None:
+            error = {"error": {"message": f"No recorded response for this request (replay key {key})", "type": "replay_miss"}}
+            return httpx.Response(404, json=error, request=request)
+        return httpx.Response(
+            entry["status"], headers={"content-type": entry["content_type"]}, content=entry["body"].encode(), request=request
+        )
+
+    def recorded(self, key: str, keyed: dict, request: httpx.Request, response: httpx.Response, content: bytes) -> httpx.Response:
+        if response.status_code == 200:
+            self.save(key, keyed, response, content)
+        return httpx.Response(
+            response.status_code,
+            headers={k: v for k, v in response.headers.items() if k.lower() not in ("content-encoding", "content-length", "transfer-encoding")},
+            content=content,
+            request=request,
+        )
+
+
+class ReplayTransport(httpx.BaseTransport):
+    def __init__(self, mode: str = REPLAY_MODE, store: ReplayStore | None = None):
+        self.mode = mode
+        self.store = store or ReplayStore()
+        self.transport = httpx.HTTPTransport()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        if request.method != "POST" or self.mode == "passthrough":
+            return self.transport.handle_request(request)
+        key, keyed = self.store.key(request)
+        if self.mode == "replay":
+            return self.store.cached(key, request)
+        request.headers["accept-encoding"] = "identity"
+        response = self.transport.handle_request(request)
+        try:
+            content = b"".join(response.stream)
+        finally:
+            response.close()
+        return self.store.recorded(key, keyed, request, response, content)
+
+    def close(self) -> None:
+        self.transport.close()
+
+
+class AsyncReplayTransport(httpx.AsyncBaseTransport):
+    def __init__(self, mode: str = REPLAY_MODE, store: ReplayStore | None = None):
+        self.mode = mode
+        self.store = store or ReplayStore()
+        self.transport = httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if request.method != "POST" or self.mode == "passthrough":
+            return await self.transport.handle_async_request(request)
+        key, keyed = self.store.key(request)
+        if self.mode == "replay":
+            return self.store.cached(key, request)
+        request.headers["accept-encoding"] = "identity"
+        response = await self.transport.handle_async_request(request)
+        try:
+            content = b"".join([chunk async for chunk in response.stream])
+        finally:
+            await response.aclose()
+        return self.store.recorded(key, keyed, request, response, content)
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+def check_mode() -> None:
+    if REPLAY_MODE not in MODES:
+        raise ValueError(f"REPLAY_MODE must be one of {', '.join(MODES)}, not {REPLAY_MODE}")
+
+
+def http_client() -> httpx.Client | None:
+    """An httpx client for a sync model client, or None to let the model client use its own default"""
+    check_mode()
+    return None if REPLAY_MODE == "passthrough" else httpx.Client(transport=ReplayTransport(), timeout=TIMEOUT)
+
+
+def async_http_client() -> httpx.AsyncClient | None:
+    """An httpx client for an async model client, or None to let the model client use its own default"""
+    check_mode()
+    return None if REPLAY_MODE == "passthrough" else httpx.AsyncClient(transport=AsyncReplayTransport(), timeout=TIMEOUT)
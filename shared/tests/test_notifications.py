@@ -0,0 +1,129 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from urllib.parse import parse_qs
+from shared import notifications
+from shared.notifications import Outbox
+
+
+class FakePushover:
+    """A local endpoint standing in for Pushover: records each message, answering with the statuses it's given"""
+
+    def __init__(self, statuses=(200,), delay=0.0):
+        self.statuses = list(statuses)
+        self.delay = delay
+        self.received = []
+        self.lock = threading.Lock()
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                time.sleep(fake.delay)
+                with fake.lock:
+                    fake.received.append((time.time(), parse_qs(body.decode())["message"][0]))
+                    status = fake.statuses.pop(0) if len(fake.statuses) > 1 else fake.statuses[0]
+                self.send_response(status)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/1/messages.json"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def wait_for(condition, timeout=10.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+class TestOutbox(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.db = os.path.join(directory.name, "notifications.db")
+        timings = mock.patch.multiple(
+            notifications, COALESCE_SECONDS=0.0, MIN_SECONDS_BETWEEN_SENDS=0.0, RETRY_BASE_SECONDS=0.05
+        )
+        timings.start()
+        self.addCleanup(timings.stop)
+
+    def endpoint(self, **kwargs) -> FakePushover:
+        fake = FakePushover(**kwargs)
+        self.addCleanup(fake.close)
+        return fake
+
+    def rows(self):
+        with sqlite3.connect(self.db) as conn:
+            return conn.execute("SELECT status, attempts FROM outbox").fetchall()
+
+    def test_retries_with_backoff_after_server_errors(self):
+        fake = self.endpoint(statuses=[503, 503, 200])
+        outbox = Outbox(url=fake.url, db=self.db)
+        outbox.push("Bought 10 AAPL")
+        self.assertTrue(wait_for(lambda: len(fake.received) == 3 and not self.rows()))
+        times = [received[0] for received in fake.received]
+        self.assertGreaterEqual(times[1] - times[0], 0.05 * 2)
+        self.assertGreaterEqual(times[2] - times[1], 0.05 * 4)
+        self.assertEqual([received[1] for received in fake.received], ["Bought 10 AAPL"] * 3)
+
+    def test_dead_letters_after_max_attempts(self):
+        fake = self.endpoint(statuses=[500])
+        with mock.patch.object(notifications, "MAX_ATTEMPTS", 3):
+            outbox = Outbox(url=fake.url, db=self.db)
+            outbox.push("Sold 5 MSFT")
+            self.assertTrue(wait_for(lambda: self.rows() == [("failed", 3)]))
+            time.sleep(0.5)
+        self.assertEqual(len(fake.received), 3)
+        self.assertEqual(outbox.pending(), (0, None))
+
+    def test_two_workers_deliver_each_message_once(self):
+        fake = self.endpoint(delay=0.01)
+        messages = [f"Trade number {i:02d}" for i in range(40)]
+        with mock.patch.object(notifications, "MAX_MESSAGE_CHARS", len(messages[0])):
+            first, second = Outbox(url=fake.url, db=self.db), Outbox(url=fake.url, db=self.db)
+            for message in messages:
+                first.push(message)
+            second.start()
+            second.wake.set()
+            self.assertTrue(wait_for(lambda: not self.rows()))
+        self.assertEqual(sorted(received[1] for received in fake.received), messages)
+
+    def test_burst_is_coalesced_into_one_digest(self):
+        fake = self.endpoint()
+        with mock.patch.object(notifications, "COALESCE_SECONDS", 0.3):
+            outbox = Outbox(url=fake.url, db=self.db)
+            for symbol in ("AAPL", "MSFT", "NVDA"):
+                outbox.push(f"Bought {symbol}")
+            self.assertTrue(wait_for(lambda: not self.rows()))
+        self.assertEqual([received[1] for received in fake.received], ["3 notifications:\n- Bought AAPL\n- Bought MSFT\n- Bought NVDA"])
+
+    def test_flush_sends_without_waiting_out_the_window(self):
+        fake = self.endpoint()
+        with mock.patch.object(notifications, "COALESCE_SECONDS", 30.0):
+            outbox = Outbox(url=fake.url, db=self.db)
+            outbox.push("Bought AAPL")
+            outbox.push("Sold MSFT")
+            start = time.time()
+            self.assertTrue(outbox.flush(timeout=1.5))
+        self.assertLess(time.time() - start, 1.5)
+        self.assertEqual([received[1] for received in fake.received], ["2 notifications:\n- Bought AAPL\n- Sold MSFT"])
+
+
+if __name__ == "__main__":
+    unittest.main()
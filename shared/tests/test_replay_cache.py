@@ -0,0 +1,117 @@
+import asyncio
+import json
+import tempfile
+import unittest
+import httpx
+from shared.replay_cache import AsyncReplayTransport, ReplayStore, ReplayTransport
+
+URL = "https://api.openai.com/v1/chat/completions"
+STREAM = b'data: {"choices":[{"delta":{"content":"Buy"}}]}\n\ndata: [DONE]\n\n'
+
+
+def conversation(question: str, quote: str, asked_at: str) -> dict:
+    """A chat request that has called a price tool and now holds its result"""
+    call = {"id": "call_1", "type": "function", "function": {"name": "price", "arguments": '{"symbol": "AAPL"}'}}
+    return {
+        "model": "gpt-4o-mini",
+        "messages": [
+            {"role": "system", "content": f"The current datetime is {asked_at}"},
+            {"role": "user", "content": question},
+            {"role": "assistant", "tool_calls": [call]},
+            {"role": "tool", "tool_call_id": "call_1", "content": quote},
+        ],
+    }
+
+
+class Upstream:
+    """Stands in for the API: counts the calls that get through and answers each with its own reply"""
+
+    def __init__(self, status=200, content_type="application/json"):
+        self.status = status
+        self.content_type = content_type
+        self.calls = 0
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.calls += 1
+        if self.content_type == "text/event-stream":
+            content = STREAM
+        else:
+            content = json.dumps({"reply": self.calls}).encode()
+        return httpx.Response(self.status, headers={"content-type": self.content_type}, content=content)
+
+
+class TestReplayCache(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.store = ReplayStore(directory.name)
+
+    def client(self, mode: str, upstream: Upstream) -> httpx.Client:
+        transport = ReplayTransport(mode, self.store)
+        transport.transport = httpx.MockTransport(upstream)
+        return httpx.Client(transport=transport)
+
+    def test_record_then_replay_round_trip(self):
+        upstream = Upstream()
+        body = conversation("Should I buy?", "AAPL is $201.50", "2025-06-02 09:30:00")
+        recorded = self.client("record", upstream).post(URL, json=body)
+        replayed = self.client("replay", upstream).post(URL, json=body)
+        self.assertEqual(upstream.calls, 1)
+        self.assertEqual(replayed.status_code, 200)
+        self.assertEqual(replayed.json(), recorded.json())
+
+    def test_streamed_response_round_trip(self):
+        upstream = Upstream(content_type="text/event-stream")
+        body = conversation("Should I buy?", "AAPL is $201.50", "2025-06-02 09:30:00") | {"stream": True}
+        self.client("record", upstream).post(URL, json=body)
+        replayed = self.client("replay", upstream).post(URL, json=body)
+        self.assertEqual(replayed.headers["content-type"], "text/event-stream")
+        self.assertEqual(replayed.content, STREAM)
+
+    def test_hit_when_only_tool_output_and_time_change(self):
+        upstream = Upstream()
+        self.client("record", upstream).post(URL, json=conversation("Should I buy?", "AAPL is $201.50", "2025-06-02 09:30:00"))
+        replayed = self.client("replay", upstream).post(URL, json=conversation("Should I buy?", "AAPL is $198.07", "2025-06-03 14:05:12"))
+        self.assertEqual(replayed.status_code, 200)
+        self.assertEqual(replayed.json(), {"reply": 1})
+
+    def test_tool_outputs_are_normalized_in_every_format(self):
+        responses = {"input": [{"type": "function_call_output", "call_id": "call_1", "output": "AAPL is $201.50"}]}
+        anthropic = {"messages": [{"role": "user", "content": [{"type": "tool_result", "tool_use_id": "toolu_1", "content": "AAPL is $201.50"}]}]}
+        for body in (responses, anthropic):
+            with self.subTest(body=body):
+                first = httpx.Request("POST", URL, json=body)
+                second = httpx.Request("POST", URL, json=json.loads(json.dumps(body).replace("201.50", "198.07")))
+                self.assertEqual(self.store.key(first)[0], self.store.key(second)[0])
+
+    def test_miss_when_the_question_changes(self):
+        upstream = Upstream()
+        self.client("record", upstream).post(URL, json=conversation("Should I buy?", "AAPL is $201.50", "2025-06-02 09:30:00"))
+        replayed = self.client("replay", upstream).post(URL, json=conversation("Should I sell?", "AAPL is $201.50", "2025-06-02 09:30:00"))
+        self.assertEqual(replayed.status_code, 404)
+        self.assertEqual(replayed.json()["error"]["type"], "replay_miss")
+        self.assertEqual(upstream.calls, 1)
+
+    def test_errors_are_not_recorded(self):
+        body = conversation("Should I buy?", "AAPL is $201.50", "2025-06-02 09:30:00")
+        self.assertEqual(self.client("record", Upstream(status=500)).post(URL, json=body).status_code, 500)
+        self.assertEqual(self.client("replay", Upstream()).post(URL, json=body).status_code, 404)
+
+    def test_async_round_trip(self):
+        upstream = Upstream()
+        body = conversation("Should I buy?", "AAPL is $201.50", "2025-06-02 09:30:00")
+
+        async def post(mode: str) -> httpx.Response:
+            transport = AsyncReplayTransport(mode, self.store)
+            transport.transport = httpx.MockTransport(upstream)
+            async with httpx.AsyncClient(transport=transport) as client:
+                return await client.post(URL, json=body)
+
+        recorded = asyncio.run(post("record"))
+        replayed = asyncio.run(post("replay"))
+        self.assertEqual(upstream.calls, 1)
+        self.assertEqual(replayed.json(), recorded.json())
+
+
+if __name__ == "__main__":
+    unittest.main()
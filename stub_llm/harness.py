@@ -0,0 +1,158 @@
+"""
+Measure the orchestration overhead of each agent framework by running many small tool-using agents against stub_server.py.
+
+Each run is a user message, one tool call and a final reply, so two LLM calls. The stub reports how long it spent
+simulating the model, so whatever else a run took is the framework's own overhead (plus the HTTP round trip to the stub).
+Run with: uv run harness.py [--runs 200] [--concurrency 20] [--latency fixed:0.05] [--stacks agents_chat,langchain]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+import warnings
+import httpx
+
+PORT = 8900
+MODEL = "gpt-4o-mini"
+PROMPT = "What's the latest price of AAPL?"
+STUB_SERVER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "stub_server.py")
+
+# AutoGen expects the dated model name back from the API, but the stub echoes the name it was asked for
+warnings.filterwarnings("ignore", message="Resolved model mismatch")
+
+
+def lookup_price(symbol: str) -> str:
+    """Look up the latest share price for a symbol"""
+    return f"The price of {symbol} is $100.00"
+
+
+def make_agents_runner(base_url: str, responses: bool):
+    from openai import AsyncOpenAI
+    from agents import Agent, Runner, function_tool, OpenAIChatCompletionsModel, OpenAIResponsesModel, set_tracing_disabled
+
+    set_tracing_disabled(True)
+    client = AsyncOpenAI(base_url=base_url, api_key="stub")
+    model = OpenAIResponsesModel(MODEL, client) if responses else OpenAIChatCompletionsModel(MODEL, client)
+    agent = Agent(name="Analyst", instructions="Answer questions about shares", tools=[function_tool(lookup_price)], model=model)
+
+    async def run():
+        await Runner.run(agent, PROMPT)
+
+    return run
+
+
+def make_langchain_runner(base_url: str):
+    from langchain_openai import ChatOpenAI
+    from langchain_core.messages import HumanMessage, ToolMessage
+    from langchain_core.tools import tool
+
+    lookup = tool(lookup_price)
+    llm = ChatOpenAI(model=MODEL, base_url=base_url, api_key="stub").bind_tools([lookup])
+
+    async def run():
+        messages = [HumanMessage(content=PROMPT)]
+        reply = await llm.ainvoke(messages)
+        while reply.tool_calls:
+            messages.append(reply)
+            for call in reply.tool_calls:
+                messages.append(ToolMessage(content=await lookup.ainvoke(call["args"]), tool_call_id=call["id"]))
+            reply = await llm.ainvoke(messages)
+
+    return run
+
+
+def make_autogen_runner(base_url: str):
+    from autogen_agentchat.agents import AssistantAgent
+    from autogen_ext.models.openai import OpenAIChatCompletionClient
+
+    client = OpenAIChatCompletionClient(model=MODEL, base_url=base_url, api_key="stub")
+
+    async def run():
+        agent = AssistantAgent("analyst", model_client=client, tools=[lookup_price], reflect_on_tool_use=True)
+        await agent.run(task=PROMPT)
+
+    return run
+
+
+STACKS = {
+    "agents_chat": lambda url: make_agents_runner(url, responses=False),
+    "agents_responses": lambda url: make_agents_runner(url, responses=True),
+    "langchain": make_langchain_runner,
+    "autogen": make_autogen_runner,
+}
+
+
+async def stub_stats(client: httpx.AsyncClient, base: str) -> dict:
+    return (await client.get(f"{base}/stats")).json()
+
+
+async def measure(name: str, run, base: str, runs: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    durations = []
+
+    async def timed():
+        async with semaphore:
+            start = time.perf_counter()
+            await run()
+            durations.append(time.perf_counter() - start)
+
+    async with httpx.AsyncClient() as client:
+        await run()
+        before = await stub_stats(client, base)
+        start = time.perf_counter()
+        await asyncio.gather(*[timed() for _ in range(runs)])
+        wall = time.perf_counter() - start
+        after = await stub_stats(client, base)
+    calls = after["requests"] - before["requests"]
+    simulated = after["simulated_seconds"] - before["simulated_seconds"]
+    return {
+        "stack": name,
+        "runs/s": runs / wall,
+        "calls/s": calls / wall,
+        "p50 run": statistics.median(durations),
+        "p95 run": statistics.quantiles(durations, n=20)[-1] if len(durations) > 1 else durations[0],
+        "overhead/call ms": 1000 * (sum(durations) - simulated) / calls if calls else 0.0,
+    }
+
+
+async def main(args):
+    base = f"http://127.0.0.1:{args.port}"
+    server = subprocess.Popen(
+        [sys.executable, STUB_SERVER, "--port", str(args.port), "--latency", args.latency],
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        async with httpx.AsyncClient() as client:
+            for _ in range(100):
+                try:
+                    await client.get(f"{base}/v1/models")
+                    break
+                except httpx.TransportError:
+                    await asyncio.sleep(0.1)
+        results = []
+        for name in args.stacks.split(","):
+            try:
+                run = STACKS[name](f"{base}/v1")
+            except ImportError as e:
+                print(f"Skipping {name}: {e}")
+                continue
+            results.append(await measure(name, run, base, args.runs, args.concurrency))
+        print(f"{'stack':<18}{'runs/s':>10}{'calls/s':>10}{'p50 run':>10}{'p95 run':>10}{'overhead/call ms':>18}")
+        for r in results:
+            print(f"{r['stack']:<18}{r['runs/s']:>10.1f}{r['calls/s']:>10.1f}{r['p50 run']:>10.3f}{r['p95 run']:>10.3f}{r['overhead/call ms']:>18.2f}")
+    finally:
+        server.terminate()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Orchestration overhead of each agent framework, against the stub model")
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency", default="fixed:0.05")
+    parser.add_argument("--stacks", default=",".join(STACKS))
+    parser.add_argument("--port", type=int, default=PORT)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,430 @@
+"""
+An offline stand-in for the OpenAI API, for load-testing and benchmarking the agent frameworks without paying for tokens.
+
+It speaks enough of the Chat Completions and Responses APIs for the OpenAI Agents SDK, LangChain and AutoGen:
+tool calls, structured outputs and streaming. Each reply is chosen like this:
+1. A transcript whose "match" pattern is found in the first user message plays its turns back in order,
+   one per assistant turn already in the conversation
+2. Otherwise the first rule whose "match" pattern is found in the latest message gives the reply
+3. Otherwise the reply is made up: call a tool (up to --tool-rounds times per user message), then fill in the
+   structured output schema if there is one, or else reply with some words
+
+A script is a JSON file like:
+{
+  "transcripts": [{"match": "Apple", "turns": [{"tool_calls": [{"name": "lookup", "arguments": {"symbol": "AAPL"}}]}, {"content": "Buy"}]}],
+  "rules": [{"match": "summar", "content": "A short summary", "latency": "fixed:0.5"}]
+}
+A reply is one of "content", "json" (an object, returned as the structured output) or "tool_calls"; or a rule may
+give a "status", such as 500, to fail the request with that error after its latency. A rule's "model" pattern,
+if it has one, must also be found in the requested model's name.
+
+Latency is given as a distribution: fixed:S, uniform:LOW,HIGH, normal:MEAN,SD or lognormal:MU,SIGMA (seconds);
+it is the time to the first token, after which tokens follow at --tokens-per-second.
+
+Run with: uv run stub_server.py [--port 8900] [--script script.json] [--latency lognormal:-1.5,0.5]
+and point clients at http://127.0.0.1:8900/v1 with any API key. GET /stats reports what has been served.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+import uuid
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+DEFAULT_TOOL_ROUNDS = 1
+DEFAULT_REPLY_WORDS = 60
+DEFAULT_TOKENS_PER_SECOND = 0.0
+WORDS = "the market moved on news of strong earnings while analysts revised their outlook for the sector".split()
+
+
+def parse_latency(spec: str):
+    """Turn a latency spec like lognormal:-1.5,0.5 into a function returning a delay in seconds"""
+    kind, _, args = spec.partition(":")
+    values = [float(a) for a in args.split(",")] if args else []
+    if kind == "fixed":
+        return lambda: values[0]
+    if kind == "uniform":
+        return lambda: random.uniform(values[0], values[1])
+    if kind == "normal":
+        return lambda: max(0.0, random.gauss(values[0], values[1]))
+    if kind == "lognormal":
+        return lambda: random.lognormvariate(values[0], values[1])
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+def example(schema: dict, defs: dict | None = None, name: str = "value"):
+    """Make up a value that satisfies a JSON schema, for tool arguments and structured outputs"""
+    defs = defs if defs is not None else schema.get("$defs", schema.get("definitions", {}))
+    if "$ref" in schema:
+        return example(defs[schema["$ref"].split("/")[-1]], defs, name)
+    if "enum" in schema:
+        return schema["enum"][0]
+    if "const" in schema:
+        return schema["const"]
+    if "default" in schema:
+        return schema["default"]
+    for key in ("anyOf", "oneOf", "allOf"):
+        if key in schema:
+            options = [option for option in schema[key] if option.get("type") != "null"] or schema[key]
+            return example(options[0], defs, name)
+    kind = schema.get("type", "object")
+    if isinstance(kind, list):
+        kind = next((k for k in kind if k != "null"), "string")
+    if kind == "object":
+        properties = schema.get("properties", {})
+        return {key: example(value, defs, key) for key, value in properties.items()}
+    if kind == "array":
+        return [example(schema.get("items", {"type": "string"}), defs, name) for _ in range(max(1, schema.get("minItems", 1)))]
+    if kind == "integer":
+        return int(schema.get("minimum", 1))
+    if kind == "number":
+        return float(schema.get("minimum", 1.0))
+    if kind == "boolean":
+        return True
+    return f"stub {name}"
+
+
+def text_of(content) -> str:
+    """The text in a message's content, which may be a string or a list of parts"""
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return " ".join(text_of(part.get("text", part.get("content", part.get("output", "")))) for part in content if isinstance(part, dict))
+    return "" if content is None else str(content)
+
+
+def tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+class Conversation:
+    """What the stub needs to know about a request, whichever API it came through"""
+
+    def __init__(self, model: str, first_user: str, last: str, assistant_turns: int, tool_results: int, tools: list[dict], schema: dict | None, prompt_text: str):
+        self.model = model
+        self.first_user = first_user
+        self.last = last
+        self.assistant_turns = assistant_turns
+        self.tool_results = tool_results
+        self.tools = tools
+        self.schema = schema
+        self.prompt_tokens = tokens(prompt_text)
+
+    @classmethod
+    def from_chat(cls, body: dict) -> "Conversation":
+        messages = body.get("messages", [])
+        users = [i for i, m in enumerate(messages) if m.get("role") == "user"]
+        last_user = users[-1] if users else -1
+        tools = [t["function"] for t in body.get("tools", []) if t.get("type") == "function"]
+        format = body.get("response_format") or {}
+        schema = format.get("json_schema", {}).get("schema") if format.get("type") == "json_schema" else None
+        if format.get("type") == "json_object":
+            schema = {"type": "object", "properties": {"result": {"type": "string"}}}
+        return cls(
+            model=body.get("model", "stub"),
+            first_user=text_of(messages[users[0]].get("content")) if users else "",
+            last=text_of(messages[-1].get("content")) if messages else "",
+            assistant_turns=sum(1 for m in messages if m.get("role") == "assistant"),
+            tool_results=sum(1 for m in messages[last_user + 1:] if m.get("role") == "tool"),
+            tools=tools,
+            schema=schema,
+            prompt_text=json.dumps(messages),
+        )
+
+    @classmethod
+    def from_responses(cls, body: dict) -> "Conversation":
+        items = body.get("input", [])
+        if isinstance(items, str):
+            items = [{"role": "user", "content": items}]
+        users = [i for i, item in enumerate(items) if item.get("role") == "user"]
+        last_user = users[-1] if users else -1
+        tools = [t for t in body.get("tools", []) if t.get("type") == "function"]
+        format = (body.get("text") or {}).get("format") or {}
+        schema = format.get("schema") if format.get("type") == "json_schema" else None
+        last = items[-1] if items else {}
+        return cls(
+            model=body.get("model", "stub"),
+            first_user=text_of(items[users[0]].get("content")) if users else "",
+            last=text_of(last.get("content", last.get("output", ""))),
+            assistant_turns=sum(1 for item in items if item.get("role") == "assistant" or item.get("type") == "function_call"),
+            tool_results=sum(1 for item in items[last_user + 1:] if item.get("type") == "function_call_output"),
+            tools=tools,
+            schema=schema,
+            prompt_text=json.dumps(items) + (body.get("instructions") or ""),
+        )
+
+
+class Stub:
+    def __init__(self, script: dict, latency, tool_rounds: int, reply_words: int, tokens_per_second: float):
+        self.transcripts = script.get("transcripts", [])
+        self.rules = script.get("rules", [])
+        self.latency = latency
+        self.tool_rounds = tool_rounds
+        self.reply_words = reply_words
+        self.tokens_per_second = tokens_per_second
+        self.stats = {"requests": 0, "streamed": 0, "tool_calls": 0, "in_flight": 0, "max_in_flight": 0, "simulated_seconds": 0.0}
+
+    def reply(self, conversation: Conversation) -> tuple[dict, float]:
+        """Choose the reply and how long to wait before it starts"""
+        for transcript in self.transcripts:
+            if re.search(transcript["match"], conversation.first_user):
+                turns = transcript["turns"]
+                turn = turns[min(conversation.assistant_turns, len(turns) - 1)]
+                return turn, self.delay(turn)
+        for rule in self.rules:
+            if re.search(rule.get("match", ""), conversation.last) and re.search(rule.get("model", ""), conversation.model):
+                return rule, self.delay(rule)
+        if conversation.tools and conversation.tool_results < self.tool_rounds:
+            tool = conversation.tools[conversation.tool_results % len(conversation.tools)]
+            reply = {"tool_calls": [{"name": tool["name"], "arguments": example(tool.get("parameters") or {})}]}
+        elif conversation.schema:
+            reply = {"json": example(conversation.schema)}
+        else:
+            reply = {"content": " ".join(random.choice(WORDS) for _ in range(self.reply_words))}
+        return reply, self.latency()
+
+    def delay(self, reply: dict) -> float:
+        return parse_latency(reply["latency"])() if "latency" in reply else self.latency()
+
+    def parts(self, reply: dict) -> tuple[str | None, list[dict]]:
+        """The text and the tool calls (with ids and JSON arguments) in a reply"""
+        if "tool_calls" in reply:
+            calls = [
+                {"id": f"call_{uuid.uuid4().hex[:24]}", "name": call["name"], "arguments": json.dumps(call.get("arguments", {}))}
+                for call in reply["tool_calls"]
+            ]
+            return None, calls
+        if "json" in reply:
+            return json.dumps(reply["json"]), []
+        return reply.get("content", ""), []
+
+    def output_tokens(self, text: str | None, calls: list[dict]) -> int:
+        return tokens((text or "") + "".join(call["arguments"] for call in calls))
+
+    async def wait(self, seconds: float) -> None:
+        self.stats["simulated_seconds"] += seconds
+        if seconds > 0:
+            await asyncio.sleep(seconds)
+
+    def generation_seconds(self, output_tokens: int) -> float:
+        return output_tokens / self.tokens_per_second if self.tokens_per_second else 0.0
+
+    def chunks(self, text: str) -> list[str]:
+        """Split text into token-sized pieces for streaming"""
+        return re.findall(r"\S*\s*", text)[:-1] or [text]
+
+    async def error(self, reply: dict, delay: float) -> JSONResponse:
+        await self.wait(delay)
+        message = reply.get("content", f"Stub error {reply['status']}")
+        return JSONResponse({"error": {"message": message, "type": "stub_error"}}, status_code=reply["status"])
+
+    async def chat(self, body: dict):
+        conversation = Conversation.from_chat(body)
+        reply, delay = self.reply(conversation)
+        if "status" in reply:
+            return await self.error(reply, delay)
+        text, calls = self.parts(reply)
+        self.stats["tool_calls"] += len(calls)
+        id, created = f"chatcmpl-{uuid.uuid4().hex}", int(time.time())
+        usage = {
+            "prompt_tokens": conversation.prompt_tokens,
+            "completion_tokens": self.output_tokens(text, calls),
+            "total_tokens": conversation.prompt_tokens + self.output_tokens(text, calls),
+        }
+        tool_calls = [
+            {"id": call["id"], "type": "function", "function": {"name": call["name"], "arguments": call["arguments"]}}
+            for call in calls
+        ]
+        finish_reason = "tool_calls" if calls else "stop"
+        if not body.get("stream"):
+            await self.wait(delay + self.generation_seconds(usage["completion_tokens"]))
+            message = {"role": "assistant", "content": text, "refusal": None}
+            if tool_calls:
+                message["tool_calls"] = tool_calls
+            return JSONResponse({
+                "id": id,
+                "object": "chat.completion",
+                "created": created,
+                "model": conversation.model,
+                "choices": [{"index": 0, "message": message, "finish_reason": finish_reason, "logprobs": None}],
+                "usage": usage,
+            })
+
+        def chunk(delta: dict, finish: str | None = None, usage: dict | None = None) -> str:
+            data = {
+                "id": id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": conversation.model,
+                "choices": [] if usage else [{"index": 0, "delta": delta, "finish_reason": finish, "logprobs": None}],
+            }
+            if usage:
+                data["usage"] = usage
+            return f"data: {json.dumps(data)}\n\n"
+
+        async def events():
+            await self.wait(delay)
+            yield chunk({"role": "assistant", "content": "" if text is not None else None})
+            per_token = 1 / self.tokens_per_second if self.tokens_per_second else 0.0
+            for piece in self.chunks(text or ""):
+                await self.wait(per_token)
+                yield chunk({"content": piece})
+            for index, call in enumerate(tool_calls):
+                await self.wait(per_token * tokens(call["function"]["arguments"]))
+                yield chunk({"tool_calls": [{"index": index, **call}]})
+            yield chunk({}, finish_reason)
+            if (body.get("stream_options") or {}).get("include_usage"):
+                yield chunk({}, usage=usage)
+            yield "data: [DONE]\n\n"
+
+        self.stats["streamed"] += 1
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    async def responses(self, body: dict):
+        conversation = Conversation.from_responses(body)
+        reply, delay = self.reply(conversation)
+        if "status" in reply:
+            return await self.error(reply, delay)
+        text, calls = self.parts(reply)
+        self.stats["tool_calls"] += len(calls)
+        id, created = f"resp_{uuid.uuid4().hex}", int(time.time())
+        output_tokens = self.output_tokens(text, calls)
+        message_id = f"msg_{uuid.uuid4().hex}"
+        output = [
+            {"type": "function_call", "id": f"fc_{call['id'][5:]}", "call_id": call["id"], "name": call["name"], "arguments": call["arguments"], "status": "completed"}
+            for call in calls
+        ]
+        if text is not None:
+            output.append({
+                "type": "message",
+                "id": message_id,
+                "role": "assistant",
+                "status": "completed",
+                "content": [{"type": "output_text", "text": text, "annotations": [], "logprobs": []}],
+            })
+
+        def response(status: str, output: list) -> dict:
+            return {
+                "id": id,
+                "object": "response",
+                "created_at": created,
+                "model": conversation.model,
+                "status": status,
+                "output": output,
+                "parallel_tool_calls": body.get("parallel_tool_calls", True),
+                "tool_choice": body.get("tool_choice", "auto"),
+                "tools": body.get("tools", []),
+                "text": body.get("text") or {"format": {"type": "text"}},
+                "usage": {
+                    "input_tokens": conversation.prompt_tokens,
+                    "input_tokens_details": {"cached_tokens": 0},
+                    "output_tokens": output_tokens,
+                    "output_tokens_details": {"reasoning_tokens": 0},
+                    "total_tokens": conversation.prompt_tokens + output_tokens,
+                },
+            }
+
+        if not body.get("stream"):
+            await self.wait(delay + self.generation_seconds(output_tokens))
+            return JSONResponse(response("completed", output))
+
+        async def events():
+            sequence = 0
+
+            def event(type: str, **data) -> str:
+                nonlocal sequence
+                sequence += 1
+                return f"event: {type}\ndata: {json.dumps({'type': type, 'sequence_number': sequence, **data})}\n\n"
+
+            per_token = 1 / self.tokens_per_second if self.tokens_per_second else 0.0
+            yield event("response.created", response=response("in_progress", []))
+            await self.wait(delay)
+            for index, item in enumerate(output):
+                if item["type"] == "function_call":
+                    yield event("response.output_item.added", output_index=index, item={**item, "arguments": "", "status": "in_progress"})
+                    await self.wait(per_token * tokens(item["arguments"]))
+                    yield event("response.function_call_arguments.delta", output_index=index, item_id=item["id"], delta=item["arguments"])
+                    yield event("response.function_call_arguments.done", output_index=index, item_id=item["id"], arguments=item["arguments"])
+                else:
+                    yield event("response.output_item.added", output_index=index, item={**item, "content": [], "status": "in_progress"})
+                    part = {"type": "output_text", "text": "", "annotations": [], "logprobs": []}
+                    yield event("response.content_part.added", output_index=index, item_id=item["id"], content_index=0, part=part)
+                    for piece in self.chunks(text):
+                        await self.wait(per_token)
+                        yield event("response.output_text.delta", output_index=index, item_id=item["id"], content_index=0, delta=piece, logprobs=[])
+                    yield event("response.output_text.done", output_index=index, item_id=item["id"], content_index=0, text=text, logprobs=[])
+                    yield event("response.content_part.done", output_index=index, item_id=item["id"], content_index=0, part={**part, "text": text})
+                yield event("response.output_item.done", output_index=index, item=item)
+            yield event("response.completed", response=response("completed", output))
+
+        self.stats["streamed"] += 1
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+
+def create_app(stub: Stub) -> FastAPI:
+    app = FastAPI()
+
+    @app.middleware("http")
+    async def count(request: Request, call_next):
+        """A request is in flight until the last byte of its body is sent, which for a stream is well after it returns"""
+        if request.method != "POST":
+            return await call_next(request)
+        stub.stats["requests"] += 1
+        stub.stats["in_flight"] += 1
+        stub.stats["max_in_flight"] = max(stub.stats["max_in_flight"], stub.stats["in_flight"])
+        try:
+            response = await call_next(request)
+        except BaseException:
+            stub.stats["in_flight"] -= 1
+            raise
+        body = response.body_iterator
+
+        async def counted():
+            try:
+                async for chunk in body:
+                    yield chunk
+            finally:
+                stub.stats["in_flight"] -= 1
+
+        response.body_iterator = counted()
+        return response
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        return await stub.chat(await request.json())
+
+    @app.post("/v1/responses")
+    async def responses(request: Request):
+        return await stub.responses(await request.json())
+
+    @app.get("/v1/models")
+    async def models():
+        return {"object": "list", "data": [{"id": "stub", "object": "model", "created": 0, "owned_by": "stub"}]}
+
+    @app.get("/stats")
+    async def stats():
+        return stub.stats
+
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline OpenAI-compatible stub model server")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--script", help="a JSON file of transcripts and rules")
+    parser.add_argument("--latency", default="fixed:0", help="time to first token, e.g. fixed:0.2 or lognormal:-1.5,0.5")
+    parser.add_argument("--tokens-per-second", type=float, default=DEFAULT_TOKENS_PER_SECOND, help="0 for no generation delay")
+    parser.add_argument("--tool-rounds", type=int, default=DEFAULT_TOOL_ROUNDS, help="made-up tool calls per user message")
+    parser.add_argument("--reply-words", type=int, default=DEFAULT_REPLY_WORDS)
+    args = parser.parse_args()
+    script = {}
+    if args.script:
+        with open(args.script) as f:
+            script = json.load(f)
+    stub = Stub(script, parse_latency(args.latency), args.tool_rounds, args.reply_words, args.tokens_per_second)
+    uvicorn.run(create_app(stub), host="127.0.0.1", port=args.port, log_level="warning")